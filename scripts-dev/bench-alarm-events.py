@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Throughput of create_alarm_event and of the document built to persist the event, the
+path taken by every alarm whether or not an email is rendered for it.
+"""
+
+import time
+
+from mailpy.entities.event import create_alarm_event
+
+EVENTS = 100000
+
+
+def create_events(count: int):
+    return [
+        create_alarm_event(
+            pvname=f"BENCH:PV{i}",
+            specified_value_message="from 0 to 10",
+            unit="mm",
+            warning="out of range",
+            subject="bench",
+            emails=["bench@example.com"],
+            condition="out of range",
+            value_measured=float(i),
+        )
+        for i in range(count)
+    ]
+
+
+def bench(label: str, count: int, run):
+    t0 = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<20} {count / elapsed:>14.0f} {elapsed * 1e6 / count:>10.3f}")
+    return result
+
+
+if __name__ == "__main__":
+    print(f"{'':<20} {'events/s':>14} {'us/event':>10}")
+    events = bench("create", EVENTS, lambda: create_events(EVENTS))
+    bench(
+        "persist document",
+        EVENTS,
+        lambda: [{**e.to_dict(), "ts": e.ts.ts} for e in events],
+    )
+    bench("render local_str", EVENTS, lambda: [e.ts.local_str for e in events])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Cost of the vectorized array conditions for waveforms from 1k to 100k elements,
+compared against checking each element with the scalar condition.
+"""
+
+import timeit
+
+import numpy
+
+from mailpy.entities.condition import ConditionEnums, create_condition
+
+CONDITIONS = [
+    (ConditionEnums.OutOfRange, "-3:3"),
+    (ConditionEnums.SuperiorThan, "3"),
+    (ConditionEnums.InferiorThan, "-3"),
+    (ConditionEnums.IncreasingStep, "1:2:3:4"),
+]
+
+
+def bench(name: str, alarm_values: str, size: int, number: int = 20):
+    rng = numpy.random.default_rng(seed=size)
+    value = rng.normal(size=size)
+    condition = create_condition(condition=name, alarm_values=alarm_values)
+
+    vectorized = timeit.timeit(lambda: condition.check_alarm(value), number=number)
+
+    scalar_condition = create_condition(condition=name, alarm_values=alarm_values)
+    elements = value.tolist()
+    scalar_number = max(1, number // 10)
+    scalar = timeit.timeit(
+        lambda: [scalar_condition.check_alarm(v) for v in elements],
+        number=scalar_number,
+    )
+
+    vectorized_us = vectorized / number * 1e6
+    scalar_us = scalar / scalar_number * 1e6
+    print(
+        f"{name:>16} {size:>8} {vectorized_us:>16.1f} {scalar_us:>16.1f} {scalar_us / vectorized_us:>8.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'condition':>16} {'elements':>8} {'vectorized (us)':>16} {'scalar loop (us)':>16} {'speedup':>9}"
+    )
+    for name, alarm_values in CONDITIONS:
+        for size in [1000, 10000, 100000]:
+            bench(name, alarm_values, size)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Evaluate one update of every threshold entry, one check_alarm call per entry against
+storing the values and comparing them all with a single BatchEvaluator.flush.
+"""
+
+import queue
+import random
+import time
+
+from mailpy.batch import BatchEvaluator
+from mailpy.entities import ConditionEnums, Entry, EntryData, Group, ValueChangedInfo
+
+CONDITIONS = [
+    (ConditionEnums.OutOfRange, "0:10"),
+    (ConditionEnums.SuperiorThan, "10"),
+    (ConditionEnums.InferiorThan, "0"),
+]
+
+
+def create_entries(total: int, event_queue: queue.Queue):
+    group = Group("1", "bench", True)
+    entries = []
+    for i in range(total):
+        condition, alarm_values = CONDITIONS[i % len(CONDITIONS)]
+        entries.append(
+            Entry(
+                entry_data=EntryData(
+                    id=str(i),
+                    pvname=f"BENCH:PV{i}",
+                    emails=["bench@example.com"],
+                    condition=condition,
+                    alarm_values=alarm_values,
+                    unit="",
+                    warning_message="",
+                    subject="",
+                    email_timeout=0,
+                    group="bench",
+                ),
+                group=group,
+                event_queue=event_queue,
+            )
+        )
+    return entries
+
+
+def bench(total: int, violating: float):
+    updates = [
+        ValueChangedInfo(
+            pvname=f"BENCH:PV{i}",
+            value=random.uniform(0, 10) if random.random() > violating else 20.0,
+            status=0,
+            host="",
+            severity=0,
+        )
+        for i in range(total)
+    ]
+
+    q: queue.Queue = queue.Queue()
+    entries = create_entries(total, q)
+    t0 = time.perf_counter()
+    for entry, data in zip(entries, updates):
+        entry.handle_value_change(data)
+    single = time.perf_counter() - t0
+    single_events = q.qsize()
+
+    q = queue.Queue()
+    entries = create_entries(total, q)
+    batch = BatchEvaluator()
+    for entry in entries:
+        batch.add_entry(entry)
+    t0 = time.perf_counter()
+    for entry, data in zip(entries, updates):
+        entry.handle_value_change(data)
+    store = time.perf_counter() - t0
+    report = batch.flush()
+
+    assert q.qsize() == single_events, f"{q.qsize()} != {single_events}"
+    print(
+        f"{total:>8} {violating:>6.1%} {single * 1e3:>12.1f} {store * 1e3:>10.1f} {report.duration * 1e3:>10.2f} {single_events:>8}"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'entries':>8} {'alarms':>6} {'single (ms)':>12} {'store (ms)':>10} {'flush (ms)':>10} {'events':>8}"
+    )
+    for total in [5000, 50000]:
+        for violating in [0.0, 0.01, 0.1]:
+            bench(total, violating)
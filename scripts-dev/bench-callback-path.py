@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Cost of Entry.handle_value_change as called from the Channel Access callbacks, for
+values within the limits and for values in alarm while the email_timeout is active.
+Both paths read the group state and check the cooldown, under a monitor storm this is
+paid on every update.
+"""
+
+import queue
+import threading
+import time
+
+from mailpy.entities.condition import ConditionEnums
+from mailpy.entities.entry import Entry, EntryData, ValueChangedInfo
+from mailpy.entities.group import Group
+
+UPDATES = 200000
+
+
+def create_entry(group: Group) -> Entry:
+    return Entry(
+        entry_data=EntryData(
+            id="1",
+            pvname="BENCH:PV",
+            emails=["bench@example.com"],
+            condition=ConditionEnums.OutOfRange,
+            alarm_values="0:10",
+            unit="",
+            warning_message="",
+            subject="",
+            email_timeout=3600,
+            group="bench",
+        ),
+        group=group,
+        event_queue=queue.Queue(),
+    )
+
+
+def bench(label: str, entry: Entry, data: ValueChangedInfo, threads: int):
+    def run():
+        for _ in range(UPDATES // threads):
+            entry.handle_value_change(data)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<12} {threads:>8} {elapsed * 1e9 / UPDATES:>10.0f}")
+
+
+def value(v: float) -> ValueChangedInfo:
+    return ValueChangedInfo(pvname="BENCH:PV", value=v, status=0, host="", severity=0)
+
+
+if __name__ == "__main__":
+    group = Group("1", "bench", True)
+
+    print(f"{'':<12} {'threads':>8} {'ns/update':>10}")
+    for threads in (1, 4):
+        bench("in limits", create_entry(group), value(5.0), threads)
+
+        entry = create_entry(group)
+        # The first update dispatches, the next ones fall within the email_timeout
+        entry.handle_value_change(value(20.0))
+        bench("cooldown", entry, value(20.0), threads)
+
+    t0 = time.perf_counter()
+    for _ in range(UPDATES):
+        group.enabled
+    print(f"group.enabled read {(time.perf_counter() - t0) * 1e9 / UPDATES:.0f} ns")
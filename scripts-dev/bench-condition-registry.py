@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Memory and latency of compiling the conditions of 100k entries, one instance per entry
+as create_condition used to do against the instances shared by the registry.
+"""
+
+import random
+import time
+import tracemalloc
+
+from mailpy.entities.condition import ConditionEnums, ConditionRegistry, registry
+
+ENTRIES = 100000
+
+
+def entries_conditions(distinct: int):
+    """Most installations reuse a handful of limits across many PVs"""
+    pairs = []
+    for i in range(distinct):
+        pairs.append((ConditionEnums.OutOfRange, f"{i}:{i + 10}"))
+        pairs.append((ConditionEnums.SuperiorThan, f"{i}"))
+    return [random.choice(pairs) for _ in range(ENTRIES)]
+
+
+def compile_per_entry(conditions):
+    return [registry._classes[name](limits=values) for name, values in conditions]
+
+
+def compile_shared(conditions):
+    shared = ConditionRegistry()
+    for name in registry.names:
+        shared.register(name, registry._classes[name])
+    return [shared.create(name, values) for name, values in conditions]
+
+
+def bench(label: str, compile, conditions):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    instances = compile(conditions)
+    elapsed = time.perf_counter() - t0
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    for instance in instances:
+        instance.check_alarm(5.0)
+    evaluation = time.perf_counter() - t0
+
+    print(
+        f"{label:>12} {len(set(map(id, instances))):>10} {current / 1024 / 1024:>10.2f} {elapsed * 1e3:>12.1f} {evaluation / len(instances) * 1e9:>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'mode':>12} {'instances':>10} {'MiB':>10} {'compile (ms)':>12} {'eval (ns)':>12}"
+    )
+    for distinct in [10, 1000]:
+        conditions = entries_conditions(distinct)
+        bench("per entry", compile_per_entry, conditions)
+        bench("shared", compile_shared, conditions)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Throughput of a consumer whose sink waits on I/O (a 5 ms round trip, about what an SMTP
+command or a database insert costs) against the number of workers, with and without
+ordering per PV.
+"""
+
+import time
+import typing
+
+from mailpy.consumer import BaseEventConsumer
+
+EVENTS = 400
+SINK_LATENCY = 0.005
+
+
+class Event(typing.NamedTuple):
+    pvname: str
+    value: int
+
+
+class SinkConsumer(BaseEventConsumer):
+    def handle(self, obj):
+        time.sleep(SINK_LATENCY)
+
+
+def bench(workers: int, pvs: int, ordered: bool):
+    consumer = SinkConsumer(
+        name="bench",
+        workers=workers,
+        order_key=(lambda e: e.pvname) if ordered else None,
+    )
+    for i in range(EVENTS):
+        consumer.add(Event(f"BENCH:PV{i % pvs}", i))
+
+    t0 = time.perf_counter()
+    consumer.start()
+    consumer.join()
+    elapsed = time.perf_counter() - t0
+    print(f"{workers:>8} {pvs:>6} {str(ordered):>8} {EVENTS / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    print(f"{'workers':>8} {'pvs':>6} {'ordered':>8} {'events/s':>10}")
+    for workers in (1, 2, 4, 8, 16):
+        bench(workers, 400, False)
+    for workers in (1, 4, 16):
+        bench(workers, 400, True)
+        bench(workers, 4, True)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Compare the cost of the former full re-dispatch sweep against the cooldown scheduler.
+The sweep cost grows with the number of PVs while the scheduler only pays for the
+entries whose email_timeout expired.
+"""
+
+import queue
+import time
+
+from mailpy.entities.condition import ConditionEnums
+from mailpy.entities.entry import Entry, EntryData, ValueChangedInfo
+from mailpy.entities.group import Group
+from mailpy.scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_entries(total: int, expiring: int, scheduler: DeadlineScheduler):
+    group = Group("1", "bench", True)
+    event_queue: queue.Queue = queue.Queue()
+    entries = []
+    for i in range(total):
+        entry = Entry(
+            entry_data=EntryData(
+                id=str(i),
+                pvname=f"BENCH:PV{i}",
+                emails=["bench@example.com"],
+                condition=ConditionEnums.OutOfRange,
+                alarm_values="0:10",
+                unit="",
+                warning_message="",
+                subject="",
+                email_timeout=10 if i < expiring else 3600,
+                group="bench",
+            ),
+            group=group,
+            event_queue=event_queue,
+            scheduler=scheduler,
+        )
+        # Every entry goes into alarm once and enters its cooldown
+        entry.handle_value_change(
+            ValueChangedInfo(
+                pvname=entry.pvname, value=20.0, status=0, host="", severity=0
+            )
+        )
+        entries.append(entry)
+    return entries, event_queue
+
+
+def bench(total: int, expiring: int):
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(clock=clock)
+    entries, event_queue = create_entries(total, expiring, scheduler)
+
+    # Former behaviour, every entry receives the latest value again
+    t0 = time.perf_counter()
+    for entry in entries:
+        entry.handle_value_change(entry._last_data)
+    sweep = time.perf_counter() - t0
+
+    # The email_timeout is measured on the scheduler clock as well
+    clock.now = 11
+
+    t0 = time.perf_counter()
+    executed = scheduler.run_pending()
+    timer = time.perf_counter() - t0
+
+    assert executed == expiring, f"{executed} != {expiring}"
+    print(
+        f"{total:>8} {expiring:>9} {sweep * 1e3:>12.3f} {timer * 1e3:>12.3f} {event_queue.qsize():>8}"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'pvs':>8} {'expiring':>9} {'sweep (ms)':>12} {'timer (ms)':>12} {'events':>8}"
+    )
+    for total in [1000, 10000, 50000]:
+        for expiring in [0, 10, 100, 1000]:
+            bench(total, expiring)
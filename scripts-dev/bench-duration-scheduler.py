@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Duration qualified entries schedule one deadline per violation and cancel it whenever the
+value recovers first. Flapping PVs cancel far more calls than ever expire, measure the
+cost of an update and the size of the shared heap with and without compaction.
+"""
+
+import queue
+import time
+
+import mailpy.scheduler
+from mailpy.entities.condition import ConditionEnums
+from mailpy.entities.entry import Entry, EntryData, ValueChangedInfo
+from mailpy.entities.group import Group
+from mailpy.scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_entries(total: int, scheduler: DeadlineScheduler):
+    group = Group("1", "bench", True)
+    event_queue: queue.Queue = queue.Queue()
+    entries = [
+        Entry(
+            entry_data=EntryData(
+                id=str(i),
+                pvname=f"BENCH:PV{i}",
+                emails=["bench@example.com"],
+                condition=ConditionEnums.OutOfRange,
+                alarm_values="0:10",
+                unit="",
+                warning_message="",
+                subject="",
+                email_timeout=3600,
+                group="bench",
+                duration=30.0,
+            ),
+            group=group,
+            event_queue=event_queue,
+            scheduler=scheduler,
+        )
+        for i in range(total)
+    ]
+    return entries, event_queue
+
+
+def bench(total: int, rounds: int, compact: bool):
+    mailpy.scheduler.COMPACT_MIN_SIZE = 64 if compact else float("inf")
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(clock=clock)
+    entries, event_queue = create_entries(total, scheduler)
+
+    # Every round violates then recovers, each entry flaps without ever qualifying
+    updates = [
+        [
+            ValueChangedInfo(pvname=e.pvname, value=20.0, status=0, host="", severity=0)
+            for e in entries
+        ],
+        [
+            ValueChangedInfo(pvname=e.pvname, value=5.0, status=0, host="", severity=0)
+            for e in entries
+        ],
+    ]
+
+    t0 = time.perf_counter()
+    for r in range(rounds):
+        clock.now = r
+        for entry, data in zip(entries, updates[r % 2]):
+            entry.handle_value_change(data)
+    elapsed = time.perf_counter() - t0
+
+    heap = len(scheduler)
+    clock.now = rounds + 60
+    t0 = time.perf_counter()
+    scheduler.run_pending()
+    drain = time.perf_counter() - t0
+
+    assert event_queue.qsize() == 0
+    print(
+        f"{total:>8} {rounds:>7} {str(compact):>8} {elapsed / (total * rounds) * 1e6:>10.3f} {heap:>10} {drain * 1e3:>10.3f}"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'entries':>8} {'rounds':>7} {'compact':>8} {'us/update':>10} {'heap':>10} {'drain ms':>10}"
+    )
+    for total in (1000, 5000, 20000):
+        for compact in (False, True):
+            bench(total, 40, compact)
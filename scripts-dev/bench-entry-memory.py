@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Bytes per entry of 100k synthetic entries, as loaded from the database, and of the
+objects allocated on the hot path (ValueChangedInfo per callback, AlarmEvent per alarm).
+Strings are built per document the way the database driver decodes them, so repeated
+emails are distinct objects unless the entry interns them.
+"""
+
+import queue
+import random
+import time
+import tracemalloc
+
+from mailpy.entities.condition import ConditionEnums
+from mailpy.entities.entry import Entry, EntryData, ValueChangedInfo
+from mailpy.entities.event import create_alarm_event
+from mailpy.entities.group import Group
+
+ENTRIES = 100000
+GROUPS = 50
+EMAILS = 40
+
+
+def entries_data():
+    rng = random.Random(0)
+    data = []
+    for i in range(ENTRIES):
+        data.append(
+            EntryData(
+                id="".join(["5f", f"{i:022x}"]),
+                pvname="".join(
+                    ["SI-", f"{i % 20:02d}", "C:DI-BPM-", f"{i}", ":PosX-Mon"]
+                ),
+                emails=[
+                    "".join(["operator", str(rng.randrange(EMAILS)), "@example.com"])
+                    for _ in range(3)
+                ],
+                condition=ConditionEnums.OutOfRange,
+                alarm_values=f"{rng.randrange(5)}:{rng.randrange(10, 15)}",
+                unit="mm",
+                warning_message="".join(["Orbit out of range"]),
+                subject="".join(["[SI] BPM"]),
+                email_timeout=1800,
+                group=str(i % GROUPS),
+            )
+        )
+    return data
+
+
+def measure(label: str, count: int, build):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - t0
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} {size / count:>12.1f} {elapsed * 1e6 / count:>10.3f}")
+    return objects
+
+
+if __name__ == "__main__":
+    print(f"{'':<20} {'bytes/obj':>12} {'us/obj':>10}")
+    groups = [Group(str(i), f"group{i}", True) for i in range(GROUPS)]
+    event_queue: queue.Queue = queue.Queue()
+
+    measure("EntryData", ENTRIES, entries_data)
+    # Only what the entries retain once the loaded documents are released
+    entries = measure(
+        "Entry",
+        ENTRIES,
+        lambda: [
+            Entry(
+                entry_data=d,
+                group=groups[int(d.group)],
+                event_queue=event_queue,
+            )
+            for d in entries_data()
+        ],
+    )
+    updates = measure(
+        "ValueChangedInfo",
+        ENTRIES,
+        lambda: [
+            ValueChangedInfo(
+                pvname=e.pvname,
+                value=float(i),
+                status=0,
+                host="IOC",
+                severity=0,
+                timestamp=float(i),
+            )
+            for i, e in enumerate(entries)
+        ],
+    )
+    events = measure(
+        "AlarmEvent",
+        ENTRIES // 10,
+        lambda: [
+            create_alarm_event(
+                pvname=e.pvname,
+                specified_value_message="",
+                unit=e.unit,
+                warning=e.warning_message,
+                subject=e.subject,
+                emails=e.emails,
+                condition=e.condition,
+                value_measured=1.0,
+            )
+            for e in entries[: ENTRIES // 10]
+        ],
+    )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Throughput of the durable event spool with alarm events: one thread appending while two
+readers (the email and persistence consumers) read and ack, against the fsync interval.
+The peak RSS shows the backlog stays on disk and the segment count shows the compaction.
+"""
+
+import resource
+import tempfile
+import threading
+import time
+
+from mailpy.entities.event import create_alarm_event
+from mailpy.spool import EventSpool
+
+EVENTS = 200000
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+def read(reader, count: int):
+    for _ in range(count):
+        offset, _ = reader.get()
+        reader.ack(offset)
+
+
+def bench(sync_interval: float):
+    event = create_alarm_event(
+        pvname="BENCH:PV",
+        condition="out of range",
+        emails=["a@example.com"],
+        specified_value_message="from 0 to 1",
+        subject="subject",
+        unit="V",
+        value_measured=2.0,
+        warning="warning",
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        spool = EventSpool(
+            directory, segment_bytes=SEGMENT_BYTES, sync_interval=sync_interval
+        )
+        readers = [
+            threading.Thread(target=read, args=(spool.reader(name), EVENTS))
+            for name in ("email", "persistence")
+        ]
+        for t in readers:
+            t.start()
+
+        t0 = time.perf_counter()
+        for _ in range(EVENTS):
+            spool.append(event)
+        appended = time.perf_counter() - t0
+        for t in readers:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        spool.sync()
+        stats = spool.stats
+        spool.close()
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{sync_interval:>8} {EVENTS / appended:>10.0f} {EVENTS / elapsed:>10.0f} {stats.segments:>9} {rss:>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    print(
+        f"{'sync (s)':>8} {'append/s':>10} {'read/s':>10} {'segments':>9} {'rss (MB)':>8}"
+    )
+    for sync_interval in (0.01, 0.1, 1.0):
+        bench(sync_interval)
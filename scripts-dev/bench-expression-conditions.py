@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Per update cost of the expression condition against the built-in conditions it can
+replace and against a bare Python comparison.
+"""
+
+import random
+import timeit
+
+from mailpy.entities import ValueChangedInfo
+from mailpy.entities.condition import ConditionEnums, create_condition
+
+UPDATES = 200000
+
+CASES = [
+    ("superior than", ConditionEnums.SuperiorThan, "10", "value > 10"),
+    ("out of range", ConditionEnums.OutOfRange, "0:10", "value < 0 or value > 10"),
+]
+
+
+def bench_case(label: str, name: str, alarm_values: str, expression_text: str, data):
+    builtin = create_condition(condition=name, alarm_values=alarm_values)
+    expression = create_condition(
+        condition=ConditionEnums.Expression, alarm_values=expression_text
+    )
+
+    native = timeit.timeit(lambda: [d.value > 10 for d in data], number=1)
+    builtin_time = timeit.timeit(lambda: [builtin.evaluate(d) for d in data], number=1)
+    expression_time = timeit.timeit(
+        lambda: [expression.evaluate(d) for d in data], number=1
+    )
+    print(
+        f"{label:>16} {native / UPDATES * 1e9:>12.0f} {builtin_time / UPDATES * 1e9:>12.0f} {expression_time / UPDATES * 1e9:>14.0f}"
+    )
+
+
+if __name__ == "__main__":
+    data = [
+        ValueChangedInfo(
+            pvname="BENCH:PV",
+            value=random.uniform(-1, 11),
+            status=0,
+            host="",
+            severity=random.choice([0, 1, 2]),
+        )
+        for _ in range(UPDATES)
+    ]
+    print(
+        f"{'condition':>16} {'native (ns)':>12} {'builtin (ns)':>12} {'expression (ns)':>14}"
+    )
+    for case in CASES:
+        bench_case(*case, data)
+
+    # Only expressible as an expression
+    combined = create_condition(
+        condition=ConditionEnums.Expression,
+        alarm_values="value < 3 or value > 7.5 and severity >= MAJOR",
+    )
+    elapsed = timeit.timeit(lambda: [combined.evaluate(d) for d in data], number=1)
+    print(f"{'combined':>16} {'':>12} {'':>12} {elapsed / UPDATES * 1e9:>14.0f}")
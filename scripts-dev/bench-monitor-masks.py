@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Count the CA monitor callbacks delivered for each subscription mask against the
+noisy PVs of tests/dummy_ioc.py, e.g.
+
+    python tests/dummy_ioc.py --count 1000 --noise 0.5 &
+    python scripts-dev/bench-monitor-masks.py --count 1000 --duration 10
+
+DBE_VALUE follows every update while DBE_LOG honours the archive deadband (adel)
+and DBE_ALARM only fires on severity changes.
+"""
+
+import argparse
+import threading
+import time
+
+import epics
+
+from mailpy.entities import MonitorMask
+
+# Rough size of a DBR_TIME_DOUBLE update with the CA message header
+BYTES_PER_UPDATE = 16 + 24
+
+
+def bench(pvnames, mask: int, duration: float):
+    lock = threading.Lock()
+    count = [0]
+
+    def callback(**kwargs):
+        with lock:
+            count[0] += 1
+
+    pvs = [epics.PV(name, callback=callback, auto_monitor=mask) for name in pvnames]
+    for pv in pvs:
+        pv.wait_for_connection(timeout=5.0)
+    with lock:
+        count[0] = 0
+
+    time.sleep(duration)
+
+    with lock:
+        callbacks = count[0]
+    for pv in pvs:
+        pv.disconnect()
+
+    rate = callbacks / duration
+    print(
+        f"{mask:>6} {callbacks:>10} {rate:>10.1f} {rate * BYTES_PER_UPDATE / 1024:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    pvnames = [f"MAILPY:DUMMY{i}" for i in range(args.count)]
+    print(f"{'mask':>6} {'callbacks':>10} {'cb/s':>10} {'KiB/s':>10}")
+    for mask in [
+        MonitorMask.Default,
+        MonitorMask.Alarm,
+        MonitorMask.Log | MonitorMask.Alarm,
+    ]:
+        bench(pvnames, mask, args.duration)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Push synthetic updates through the replay source, the entries and their conditions
+with no Channel Access involved, to find the throughput ceiling of the pipeline.
+Records can also be loaded from a JSON lines file, see mailpy.replay.load_records.
+"""
+
+import argparse
+import queue
+import random
+import threading
+import time
+
+from mailpy.coalescing import CoalescingDispatcher
+from mailpy.data_connector import DataConnector
+from mailpy.entities import ConditionEnums, Entry, EntryData, Group
+from mailpy.replay import ReplayDataSource, ReplayRecord, load_records
+
+
+def synthetic_records(pvs: int, updates: int):
+    return [
+        ReplayRecord(
+            timestamp=i * 1e-5,
+            pvname=f"BENCH:PV{i % pvs}",
+            # Roughly one update in a hundred is out of range
+            value=random.uniform(0, 10.1),
+        )
+        for i in range(updates)
+    ]
+
+
+def drain(event_queue: queue.Queue, stop: threading.Event, counter: list):
+    while not stop.is_set() or not event_queue.empty():
+        try:
+            event_queue.get(timeout=0.1)
+            counter[0] += 1
+        except queue.Empty:
+            pass
+
+
+def bench(records, workers: int):
+    pvnames = sorted(set(r.pvname for r in records))
+    source = ReplayDataSource(records, speedup=0)
+    dispatcher = CoalescingDispatcher(workers=workers) if workers else None
+    event_queue: queue.Queue = queue.Queue()
+    connector = DataConnector(
+        db=None, event_queue=event_queue, dispatcher=dispatcher, source=source
+    )
+
+    group = Group("1", "bench", True)
+    for pvname in pvnames:
+        connector.add_entry(
+            Entry(
+                entry_data=EntryData(
+                    id=pvname,
+                    pvname=pvname,
+                    emails=["bench@example.com"],
+                    condition=ConditionEnums.OutOfRange,
+                    alarm_values="0:10",
+                    unit="",
+                    warning_message="",
+                    subject="",
+                    email_timeout=0,
+                    group="bench",
+                ),
+                group=group,
+                event_queue=event_queue,
+            )
+        )
+
+    stop = threading.Event()
+    events = [0]
+    consumer = threading.Thread(target=drain, args=(event_queue, stop, events))
+    consumer.start()
+    if dispatcher:
+        dispatcher.start()
+
+    t0 = time.perf_counter()
+    stats = source.run()
+    if dispatcher:
+        # Wait for the workers to drain the slots
+        while dispatcher.stats.evaluated + dispatcher.stats.coalesced < stats.replayed:
+            time.sleep(0.001)
+        dispatcher.stop()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    consumer.join()
+
+    print(
+        f"{len(pvnames):>8} {workers:>8} {stats.replayed:>10} {stats.replayed / elapsed:>12.0f} {events[0]:>8}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", help="JSON lines file, synthetic when not set")
+    parser.add_argument("--pvs", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=200000)
+    args = parser.parse_args()
+
+    records = (
+        load_records(args.records)
+        if args.records
+        else synthetic_records(args.pvs, args.updates)
+    )
+    print(f"{'pvs':>8} {'workers':>8} {'updates':>10} {'updates/s':>12} {'events':>8}")
+    for workers in [0, 1, 4]:
+        bench(records, workers)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Emails per second sent to a local SMTP stand-in, one session per email (the previous
+EmailConsumer behaviour) against the SMTP connection pool. The stand-in waits
+SETUP_LATENCY before its greeting and before accepting the login, about what a TLS
+handshake and an AUTH round trip cost on a remote relay.
+"""
+
+import asyncio
+import threading
+import time
+
+from mailpy.entities.event import create_alarm_event
+from mailpy.mail.client import MailClient, MailClientArgs
+from mailpy.mail.pool import SMTPConnectionPool
+
+EMAILS = 200
+SETUP_LATENCY = 0.02
+
+
+class StandInServer:
+    def __init__(self, setup_latency: float):
+        self.setup_latency = setup_latency
+        self.sessions = 0
+        self.port = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._session, "127.0.0.1", 0)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _session(self, reader, writer):
+        self.sessions += 1
+        await asyncio.sleep(self.setup_latency)
+        writer.write(b"220 stand-in ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                writer.write(b"250-stand-in\r\n250 AUTH PLAIN\r\n")
+            elif command.startswith(b"AUTH"):
+                await asyncio.sleep(self.setup_latency)
+                writer.write(b"235 ok\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 go ahead\r\n")
+                await reader.readuntil(b"\r\n.\r\n")
+                writer.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def run(workers: int, send):
+    def worker(count: int):
+        for _ in range(count):
+            send()
+
+    threads = [
+        threading.Thread(target=worker, args=(EMAILS // workers,))
+        for _ in range(workers)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return EMAILS / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    event = create_alarm_event(
+        pvname="BENCH:PV",
+        condition="out of range",
+        emails=["a@example.com", "b@example.com"],
+        specified_value_message="from 0 to 1",
+        subject="subject",
+        unit="V",
+        value_measured=2.0,
+        warning="warning",
+    )
+    print(f"{'latency (s)':>11} {'workers':>8} {'per email':>10} {'pooled':>10}")
+    for latency in (0.0, SETUP_LATENCY):
+        server = StandInServer(latency)
+        args = MailClientArgs(
+            login="mailpy@example.com",
+            passwd="pass",
+            port=server.port,
+            host="127.0.0.1",
+            tls=True,
+        )
+        for workers in (1, 4):
+
+            def send_once():
+                with MailClient(args=args, debug_level=0, encryption=False) as client:
+                    client.send_email(event)
+
+            pool = SMTPConnectionPool(args=args, size=workers, encryption=False)
+            per_email = run(workers, send_once)
+            pooled = run(workers, lambda: pool.send_email(event))
+            pool.close()
+            print(f"{latency:>11} {workers:>8} {per_email:>10.0f} {pooled:>10.0f}")
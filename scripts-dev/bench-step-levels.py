@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Level lookup of the step conditions, the former linear scan against the binary search
+used by ConditionStep.find_level_for_value, for staircases of increasing size.
+"""
+
+import random
+import timeit
+
+from mailpy.entities.condition import ConditionEnums, create_condition
+
+LOOKUPS = 100000
+
+
+def find_level_linear(step_values, value) -> int:
+    level = 0
+    for min_value in step_values:
+        # Locate the next level we belong
+        if min_value > value:
+            return level
+        level += 1
+    return level
+
+
+def bench(levels: int):
+    condition = create_condition(
+        condition=ConditionEnums.IncreasingStep,
+        alarm_values=":".join(str(float(v)) for v in range(levels)),
+    )
+    values = [random.uniform(-1, levels + 1) for _ in range(LOOKUPS)]
+    step_values = condition.step_values
+
+    linear = timeit.timeit(
+        lambda: [find_level_linear(step_values, v) for v in values], number=1
+    )
+    binary = timeit.timeit(
+        lambda: [condition.find_level_for_value(v) for v in values], number=1
+    )
+    print(
+        f"{levels:>8} {linear / LOOKUPS * 1e9:>12.0f} {binary / LOOKUPS * 1e9:>12.0f} {linear / binary:>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{'levels':>8} {'linear (ns)':>12} {'bisect (ns)':>12} {'speedup':>8}")
+    for levels in [4, 16, 100, 500, 2000]:
+        bench(levels)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Per update cost of the rolling window conditions for growing window sizes, against
+recomputing the statistics of the whole window with NumPy on every update.
+"""
+
+import random
+import timeit
+
+import numpy
+
+from mailpy.entities import ValueChangedInfo
+from mailpy.entities.condition import ConditionEnums, create_condition
+
+UPDATES = 50000
+
+
+def bench(size: int, updates):
+    conditions = {
+        "average": create_condition(
+            condition=ConditionEnums.MovingAverage, alarm_values=f"{size}:-100:100"
+        ),
+        "rate": create_condition(
+            condition=ConditionEnums.RateOfChange, alarm_values=f"{size}:1000"
+        ),
+        "stddev": create_condition(
+            condition=ConditionEnums.RollingStd, alarm_values=f"{size}:100"
+        ),
+    }
+    results = []
+    for condition in conditions.values():
+        elapsed = timeit.timeit(
+            lambda: [condition.evaluate(d) for d in updates], number=1
+        )
+        results.append(elapsed / len(updates) * 1e9)
+
+    buffer = numpy.zeros(size)
+
+    def recompute(i, value):
+        buffer[i % size] = value
+        return buffer.std()
+
+    elapsed = timeit.timeit(
+        lambda: [recompute(i, d.value) for i, d in enumerate(updates)], number=1
+    )
+    results.append(elapsed / len(updates) * 1e9)
+    print(f"{size:>8} " + " ".join(f"{r:>12.0f}" for r in results))
+
+
+if __name__ == "__main__":
+    updates = [
+        ValueChangedInfo(
+            pvname="BENCH:PV",
+            value=random.gauss(0, 1),
+            status=0,
+            host="",
+            severity=0,
+            timestamp=i * 0.1,
+        )
+        for i in range(UPDATES)
+    ]
+    print(
+        f"{'window':>8} {'average (ns)':>12} {'rate (ns)':>12} {'stddev (ns)':>12} {'numpy (ns)':>12}"
+    )
+    for size in [10, 600, 36000]:
+        bench(size, updates)
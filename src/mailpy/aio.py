@@ -0,0 +1,258 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import typing
+
+import mailpy.entities as entities
+import mailpy.logging as logging
+from mailpy.coalescing import BaseDispatcher, CoalescingStats
+from mailpy.mail.async_client import AsyncMailClient
+from mailpy.mail.client import MailClientArgs
+
+if typing.TYPE_CHECKING:
+    from mailpy.db import DBManager
+
+logger = logging.getLogger()
+
+# Concurrent SMTP sessions, smtplib has no asyncio API, each one is sent by an executor thread
+EMAIL_CONCURRENCY = 100
+# pymongo has no asyncio API, the inserts run on this many executor threads
+PERSISTENCE_CONCURRENCY = 8
+
+
+class RuntimeEnums(object):
+    Threads = "threads"
+    Asyncio = "asyncio"
+
+    @staticmethod
+    def get_runtimes() -> typing.List[str]:
+        return [RuntimeEnums.Threads, RuntimeEnums.Asyncio]
+
+
+class AsyncEvaluationDispatcher(BaseDispatcher):
+    """
+    Same interface as CoalescingDispatcher, the CA callbacks only store the latest value
+    of their target and schedule its evaluation on the event loop thread-safely.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._slots: typing.Dict[typing.Any, typing.Any] = {}
+        self._received = 0
+        self._coalesced = 0
+        self._evaluated = 0
+
+    @property
+    def stats(self) -> CoalescingStats:
+        with self._lock:
+            return CoalescingStats(
+                received=self._received,
+                coalesced=self._coalesced,
+                evaluated=self._evaluated,
+            )
+
+    def start(self):
+        """The loop is owned by the runtime"""
+
+    def stop(self):
+        """The loop is owned by the runtime"""
+
+    def submit(self, target: typing.Any, data: typing.Any):
+        with self._lock:
+            self._received += 1
+            pending = target in self._slots
+            self._slots[target] = data
+            if pending:
+                self._coalesced += 1
+                return
+        self._loop.call_soon_threadsafe(self._evaluate, target)
+
+    def _evaluate(self, target: typing.Any):
+        with self._lock:
+            data = self._slots.pop(target)
+            self._evaluated += 1
+        try:
+            target.evaluate(data)
+        except Exception as e:
+            logger.exception(f"Failed to evaluate {target} with {data}, error {e}")
+
+
+class LoopEventQueue:
+    """
+    The put side of queue.Queue used by the entries, hands the events to the loop
+    thread-safely. Bounded by the events not fully handled yet, in flight included.
+    """
+
+    def __init__(self, runtime: "AsyncRuntime", maxsize: int):
+        self._runtime = runtime
+        self._maxsize = maxsize
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def qsize(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def put(
+        self,
+        obj: typing.Any,
+        block: bool = True,
+        timeout: typing.Optional[float] = None,
+    ):
+        with self._lock:
+            if self._pending >= self._maxsize:
+                raise queue.Full
+            self._pending += 1
+        self._runtime._loop.call_soon_threadsafe(self._runtime._handle_event, obj)
+
+    def task_done(self):
+        with self._lock:
+            self._pending -= 1
+
+
+class AsyncRuntimeStats(typing.NamedTuple):
+    pending: int
+    sent: int
+    persisted: int
+    failed: int
+
+
+class AsyncRuntime:
+    """
+    Event loop running in its own thread, replaces the consumer threads and the event
+    dispatcher. Every event becomes a task sending the email and persisting it
+    concurrently, bounded by the email_concurrency SMTP threads and the
+    persistence_concurrency database threads.
+    """
+
+    def __init__(
+        self,
+        db_manager: "DBManager",
+        mail_client_args: MailClientArgs,
+        queue_size: int,
+        email_concurrency: int = EMAIL_CONCURRENCY,
+        persistence_concurrency: int = PERSISTENCE_CONCURRENCY,
+        mail_client: typing.Optional[AsyncMailClient] = None,
+    ):
+        if email_concurrency < 1 or persistence_concurrency < 1:
+            raise ValueError(
+                f"Invalid concurrency limits {email_concurrency} {persistence_concurrency}"
+            )
+
+        self._loop = asyncio.new_event_loop()
+        self._db_manager = db_manager
+        self._mail_client = (
+            mail_client
+            if mail_client is not None
+            else AsyncMailClient(args=mail_client_args, concurrency=email_concurrency)
+        )
+        self._email_concurrency = email_concurrency
+        # The executor threads bound the concurrent writes, the waiting ones are queued
+        self._db_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=persistence_concurrency, thread_name_prefix="Persistence"
+        )
+        self._persistence_concurrency = persistence_concurrency
+        self._tasks: typing.Set[asyncio.Task] = set()
+
+        self.event_queue = LoopEventQueue(self, maxsize=queue_size)
+        self.dispatcher = AsyncEvaluationDispatcher(self._loop)
+
+        self._sent = 0
+        self._persisted = 0
+        self._failed = 0
+
+        self._started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, daemon=True, name="Asyncio Runtime"
+        )
+
+    @property
+    def stats(self) -> AsyncRuntimeStats:
+        return AsyncRuntimeStats(
+            pending=self.event_queue.qsize(),
+            sent=self._sent,
+            persisted=self._persisted,
+            failed=self._failed,
+        )
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+            self._started.wait()
+            logger.info(
+                f"Asyncio runtime started, {self._email_concurrency} SMTP sessions and {self._persistence_concurrency} database writes at most"
+            )
+
+    def stop(self, timeout: typing.Optional[float] = None):
+        """Wait for the events already received to be handled, then stop the loop"""
+        if not self._thread.is_alive():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._drain(), self._loop)
+        try:
+            future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"{len(self._tasks)} events still pending at shutdown")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._db_executor.shutdown(wait=True)
+        self._mail_client.close()
+
+    def join(self):
+        self._thread.join()
+
+    def publish(self, event: typing.Any):
+        """Thread-safe, used to forward the events of the monitor processes"""
+        try:
+            self.event_queue.put(event, block=False)
+        except queue.Full:
+            logger.exception(
+                f"Failed to publish event {event}. Queue is full, something wrong is happening..."
+            )
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._started.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _drain(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _handle_event(self, event: typing.Any):
+        if type(event) != entities.AlarmEvent:
+            logger.warning(f"Unknown event type {event} obtained from queue.")
+            self.event_queue.task_done()
+            return
+
+        task = self._loop.create_task(self._process(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, event: entities.AlarmEvent):
+        try:
+            await asyncio.gather(self._persist(event), self._send_email(event))
+        finally:
+            self.event_queue.task_done()
+
+    async def _persist(self, event: entities.AlarmEvent):
+        try:
+            await self._loop.run_in_executor(
+                self._db_executor, self._db_manager.persist_event, event
+            )
+            self._persisted += 1
+        except Exception as e:
+            self._failed += 1
+            logger.exception(f"Failed to persist event {event} to database. Error {e}")
+
+    async def _send_email(self, event: entities.AlarmEvent):
+        try:
+            await self._mail_client.send_email(event)
+            self._sent += 1
+        except Exception as e:
+            self._failed += 1
+            logger.exception(f"Failed to send email for event '{event}'. Error {e}")
@@ -0,0 +1,134 @@
+import threading
+import time
+import typing
+
+import numpy
+
+import mailpy.logging as logging
+
+if typing.TYPE_CHECKING:
+    from mailpy.entities import Entry, ValueChangedInfo
+
+logger = logging.getLogger()
+
+INITIAL_CAPACITY = 1024
+
+
+class BatchReport(typing.NamedTuple):
+    pending: int
+    violations: int
+    duration: float
+
+
+class BatchEvaluator:
+    """
+    Struct of arrays holding the allowed [low, high] range of every stateless threshold
+    entry (out of range, superior than and inferior than) indexed by entry slot.
+    Scalar updates only store the latest value of their slot, flush compares all of the
+    pending values at once and hands the violating slots back to their entries, which
+    build the AlarmEvent through the usual path.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self._lock = threading.Lock()
+        self._size = 0
+        self._free: typing.List[int] = []
+        self._slots: typing.Dict["Entry", int] = {}
+
+        self._low: numpy.ndarray = numpy.empty(0, dtype=numpy.float64)
+        self._high: numpy.ndarray = numpy.empty(0, dtype=numpy.float64)
+        self._values: numpy.ndarray = numpy.empty(0, dtype=numpy.float64)
+        self._pending: numpy.ndarray = numpy.empty(0, dtype=bool)
+        self._data: typing.List[typing.Optional["ValueChangedInfo"]] = []
+        self._entries: typing.List[typing.Optional["Entry"]] = []
+        self._grow(max(capacity, 1))
+
+    def _grow(self, capacity: int):
+        extra = capacity - self._low.size
+        self._low = numpy.concatenate([self._low, numpy.full(extra, -numpy.inf)])
+        self._high = numpy.concatenate([self._high, numpy.full(extra, numpy.inf)])
+        self._values = numpy.concatenate([self._values, numpy.full(extra, numpy.nan)])
+        self._pending = numpy.concatenate([self._pending, numpy.zeros(extra, bool)])
+        self._data.extend([None] * extra)
+        self._entries.extend([None] * extra)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add_entry(self, entry: "Entry") -> bool:
+        """Batch the entry if its condition is a plain threshold, returns whether it was"""
+        threshold = entry.threshold_range
+        if threshold is None:
+            return False
+
+        with self._lock:
+            if entry in self._slots:
+                return True
+
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._size == self._low.size:
+                    self._grow(self._low.size * 2)
+                slot = self._size
+                self._size += 1
+
+            self._low[slot], self._high[slot] = threshold
+            self._values[slot] = numpy.nan
+            self._pending[slot] = False
+            self._data[slot] = None
+            self._entries[slot] = entry
+            self._slots[entry] = slot
+
+        entry.attach_batch(self, slot)
+        return True
+
+    def remove_entry(self, entry: "Entry"):
+        with self._lock:
+            slot = self._slots.pop(entry, None)
+            if slot is None:
+                return
+
+            self._low[slot], self._high[slot] = -numpy.inf, numpy.inf
+            self._pending[slot] = False
+            self._data[slot] = None
+            self._entries[slot] = None
+            self._free.append(slot)
+        entry.attach_batch(None)
+
+    def update(self, slot: int, data: "ValueChangedInfo"):
+        """Called from the callback thread with a scalar value, only stores it"""
+        with self._lock:
+            self._values[slot] = data.value
+            self._pending[slot] = True
+            self._data[slot] = data
+
+    def flush(self) -> BatchReport:
+        """Compare every pending value in one vectorized operation"""
+        start = time.perf_counter()
+        with self._lock:
+            size = self._size
+            pending = self._pending[:size]
+            values = self._values[:size]
+            violated = numpy.flatnonzero(
+                pending & ((values < self._low[:size]) | (values > self._high[:size]))
+            )
+            pending_count = int(numpy.count_nonzero(pending))
+            pending[:] = False
+            alarms = [(self._entries[i], self._data[i]) for i in violated]
+
+        for entry, data in alarms:
+            if entry is None or data is None:
+                continue
+            try:
+                entry.handle_batch_violation(data)
+            except Exception as e:
+                logger.exception(
+                    f"Failed to dispatch batched event '{data}' for entry '{entry}', error {e}"
+                )
+
+        return BatchReport(
+            pending=pending_count,
+            violations=len(alarms),
+            duration=time.perf_counter() - start,
+        )
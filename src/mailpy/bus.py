@@ -0,0 +1,297 @@
+import collections
+import itertools
+import pickle
+import queue
+import tempfile
+import threading
+import time
+import typing
+
+import mailpy.logging as logging
+
+if typing.TYPE_CHECKING:
+    from mailpy.consumer import BaseEventConsumer
+
+logger = logging.getLogger()
+
+CONSUMER_QUEUE_SIZE = 10000
+
+# Block only waits this long for the consumer, then the event is dropped
+BLOCK_TIMEOUT = 5.0
+
+
+class OverflowPolicy(object):
+    """What a full consumer queue does with a new event"""
+
+    # Wait for the consumer, up to block_timeout
+    Block = "block"
+    # Discard the oldest pending event
+    DropOldest = "drop-oldest"
+    # Replace the pending event of the same PV, discard the oldest one otherwise
+    Coalesce = "coalesce"
+    # Append to a file on disk, read back in order once the queue drains
+    Spill = "spill"
+
+    @staticmethod
+    def get_policies() -> typing.List[str]:
+        return [
+            OverflowPolicy.Block,
+            OverflowPolicy.DropOldest,
+            OverflowPolicy.Coalesce,
+            OverflowPolicy.Spill,
+        ]
+
+
+class ConsumerQueueStats(typing.NamedTuple):
+    # Pending events, in memory and spilled
+    depth: int
+    spilled: int
+    published: int
+    delivered: int
+    dropped: int
+    coalesced: int
+    # Age in seconds of the oldest pending event
+    lag: float
+
+
+class BoundedEventQueue:
+    """
+    Bounded FIFO of a single consumer, a drop-in for the queue.Queue put/get interface.
+    Memory is bounded by maxsize whatever the policy, a full queue applies its
+    OverflowPolicy instead of growing.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = CONSUMER_QUEUE_SIZE,
+        policy: str = OverflowPolicy.Block,
+        block_timeout: float = BLOCK_TIMEOUT,
+        spill_dir: typing.Optional[str] = None,
+        name: str = "",
+    ):
+        if maxsize < 1:
+            raise ValueError(f"Invalid queue size {maxsize}")
+        if policy not in OverflowPolicy.get_policies():
+            raise ValueError(
+                f"Invalid overflow policy '{policy}', expected one of {OverflowPolicy.get_policies()}"
+            )
+
+        self.name = name
+        self.policy = policy
+        self._maxsize = maxsize
+        self._block_timeout = block_timeout
+        self._spill_dir = spill_dir
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        # token -> (pvname, event, enqueued at), ordered by arrival
+        self._items: typing.OrderedDict[
+            int, typing.Tuple[typing.Optional[str], typing.Any, float]
+        ] = collections.OrderedDict()
+        self._tokens = itertools.count()
+        # Latest pending token of every PV, only maintained by Coalesce
+        self._index: typing.Dict[str, int] = {}
+
+        self._spill_file: typing.Optional[typing.BinaryIO] = None
+        self._spilled = 0
+        self._spill_read_pos = 0
+
+        self._shutdown = False
+        self._overflowing = False
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._coalesced = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items) + self._spilled
+
+    def qsize(self) -> int:
+        return len(self)
+
+    @property
+    def stats(self) -> ConsumerQueueStats:
+        with self._lock:
+            lag = 0.0
+            if self._items:
+                _, _, enqueued = next(iter(self._items.values()))
+                lag = time.monotonic() - enqueued
+            return ConsumerQueueStats(
+                depth=len(self._items) + self._spilled,
+                spilled=self._spilled,
+                published=self._published,
+                delivered=self._delivered,
+                dropped=self._dropped,
+                coalesced=self._coalesced,
+                lag=lag,
+            )
+
+    def put(
+        self,
+        obj: typing.Any,
+        block: bool = True,
+        timeout: typing.Optional[float] = None,
+    ):
+        """Never raises queue.Full, events that cannot be queued are counted as dropped"""
+        enqueued = time.monotonic()
+        with self._lock:
+            self._published += 1
+            if not self._spilled and len(self._items) < self._maxsize:
+                self._append(obj, enqueued)
+                return
+
+            if not self._overflowing:
+                self._overflowing = True
+                logger.warning(
+                    f"Consumer queue {self.name} is full with {self._maxsize} events, applying policy '{self.policy}'"
+                )
+
+            if self.policy == OverflowPolicy.Spill:
+                self._spill(obj, enqueued)
+            elif self.policy == OverflowPolicy.Coalesce:
+                self._coalesce(obj, enqueued)
+            elif self.policy == OverflowPolicy.DropOldest:
+                self._drop_oldest()
+                self._append(obj, enqueued)
+            else:
+                if block:
+                    wait = (
+                        self._block_timeout
+                        if timeout is None
+                        else min(timeout, self._block_timeout)
+                    )
+                    self._not_full.wait_for(
+                        lambda: len(self._items) < self._maxsize, timeout=wait
+                    )
+                if len(self._items) < self._maxsize:
+                    self._append(obj, enqueued)
+                else:
+                    self._dropped += 1
+
+    def get(self, block: bool = True, timeout: typing.Optional[float] = None):
+        """Raises queue.Empty on timeout, or right away once shut down and drained"""
+        with self._lock:
+            if block and not self._shutdown:
+                self._not_empty.wait_for(
+                    lambda: self._items or self._shutdown, timeout=timeout
+                )
+            if not self._items:
+                raise queue.Empty
+
+            token, (pvname, obj, _) = self._items.popitem(last=False)
+            if pvname is not None and self._index.get(pvname) == token:
+                del self._index[pvname]
+            self._delivered += 1
+
+            if self._spilled:
+                self._unspill()
+            if self._overflowing and len(self._items) <= self._maxsize // 2:
+                self._overflowing = False
+                logger.info(
+                    f"Consumer queue {self.name} drained, {self._dropped} events dropped and {self._coalesced} coalesced so far"
+                )
+            self._not_full.notify()
+            return obj
+
+    def _append(self, obj: typing.Any, enqueued: float):
+        token = next(self._tokens)
+        pvname = getattr(obj, "pvname", None)
+        self._items[token] = (pvname, obj, enqueued)
+        if self.policy == OverflowPolicy.Coalesce and pvname is not None:
+            self._index[pvname] = token
+        self._not_empty.notify()
+
+    def _drop_oldest(self):
+        token, (pvname, _, _) = self._items.popitem(last=False)
+        if pvname is not None and self._index.get(pvname) == token:
+            del self._index[pvname]
+        self._dropped += 1
+
+    def _coalesce(self, obj: typing.Any, enqueued: float):
+        pvname = getattr(obj, "pvname", None)
+        token = self._index.get(pvname) if pvname is not None else None
+        if token is None:
+            self._drop_oldest()
+            self._append(obj, enqueued)
+            return
+
+        # Keeps the position and the age of the event it replaces
+        _, _, first_enqueued = self._items[token]
+        self._items[token] = (pvname, obj, first_enqueued)
+        self._coalesced += 1
+
+    def _spill(self, obj: typing.Any, enqueued: float):
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(
+                prefix="mailpy-spill-", dir=self._spill_dir
+            )
+        try:
+            self._spill_file.seek(0, 2)
+            pickle.dump((obj, enqueued), self._spill_file)
+        except (OSError, pickle.PicklingError) as e:
+            logger.error(
+                f"Failed to spill event '{obj}' of queue {self.name}. Error {e}"
+            )
+            self._dropped += 1
+            return
+        self._spilled += 1
+
+    def _unspill(self):
+        """Move spilled events back into memory, in the order they were spilled"""
+        self._spill_file.seek(self._spill_read_pos)
+        while self._spilled and len(self._items) < self._maxsize:
+            obj, enqueued = pickle.load(self._spill_file)
+            self._spilled -= 1
+            self._append(obj, enqueued)
+        self._spill_read_pos = self._spill_file.tell()
+
+        if not self._spilled:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+
+    def shutdown(self):
+        """Wake up the blocked getters, they return the pending events then raise queue.Empty"""
+        with self._lock:
+            self._shutdown = True
+            self._not_empty.notify_all()
+
+    def close(self):
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+
+class EventBus:
+    """
+    Fans the events out to the consumers, each one reading from its own bounded queue.
+    Publishing only applies the overflow policy of a full queue, so a stalled consumer
+    keeps a bounded amount of memory and the others keep receiving their events. Only
+    the Block policy can hold the publisher, at most block_timeout per event.
+    """
+
+    def __init__(self, consumers: typing.Iterable["BaseEventConsumer"] = ()):
+        self.consumers: typing.List["BaseEventConsumer"] = list(consumers)
+
+    def subscribe(self, consumer: "BaseEventConsumer"):
+        self.consumers.append(consumer)
+
+    def publish(self, event: typing.Any):
+        for c in self.consumers:
+            c.add(event)
+
+    def stats(self) -> typing.Dict[str, ConsumerQueueStats]:
+        return {c.name: c.queue.stats for c in self.consumers}
+
+    def start(self):
+        for c in self.consumers:
+            c.start()
+
+    def join(self, timeout: typing.Optional[float] = None):
+        """Let every consumer handle its pending events and stop"""
+        for c in self.consumers:
+            c.join(timeout=timeout)
@@ -0,0 +1,125 @@
+import collections
+import threading
+import typing
+
+import mailpy.logging as logging
+
+logger = logging.getLogger()
+
+
+class CoalescingStats(typing.NamedTuple):
+    received: int
+    coalesced: int
+    evaluated: int
+
+
+class BaseDispatcher:
+    """Hands the value changes of the connectors over to the entries evaluation"""
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def submit(self, target: typing.Any, data: typing.Any):
+        raise NotImplementedError("Parent should implement this method")
+
+
+class CoalescingDispatcher(BaseDispatcher):
+    """
+    Latest value slots between the CA callbacks and the condition evaluation.
+    Callbacks only overwrite the slot of their PV, evaluator workers drain the dirty slots
+    so a burst of updates from the same PV collapses into a single evaluation.
+    Targets are hashable objects implementing evaluate(data).
+    """
+
+    def __init__(self, workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"Invalid number of evaluation workers {workers}")
+
+        self._slots: typing.Dict[typing.Any, typing.Any] = {}
+        self._dirty: typing.Deque[typing.Any] = collections.deque()
+        self._in_progress: typing.Set[typing.Any] = set()
+        self._condition = threading.Condition()
+        self._running = False
+
+        self._received = 0
+        self._coalesced = 0
+        self._evaluated = 0
+
+        self._threads = [
+            threading.Thread(
+                target=self._work, daemon=True, name=f"Evaluation Worker {i}"
+            )
+            for i in range(workers)
+        ]
+
+    @property
+    def stats(self) -> CoalescingStats:
+        with self._condition:
+            return CoalescingStats(
+                received=self._received,
+                coalesced=self._coalesced,
+                evaluated=self._evaluated,
+            )
+
+    def start(self):
+        with self._condition:
+            self._running = True
+        for t in self._threads:
+            if not t.is_alive():
+                t.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for t in self._threads:
+            if t.is_alive():
+                t.join()
+
+    def submit(self, target: typing.Any, data: typing.Any):
+        """Called from the CA callback thread, only stores the latest value"""
+        with self._condition:
+            self._received += 1
+            if target in self._slots:
+                self._coalesced += 1
+            elif target not in self._in_progress:
+                # Targets being evaluated are queued again once their worker finishes
+                self._dirty.append(target)
+                self._condition.notify()
+            self._slots[target] = data
+
+    def _next(self) -> typing.Optional[typing.Tuple[typing.Any, typing.Any]]:
+        with self._condition:
+            while self._running and not self._dirty:
+                self._condition.wait()
+            if not self._running:
+                return None
+
+            target = self._dirty.popleft()
+            self._in_progress.add(target)
+            return target, self._slots.pop(target)
+
+    def _done(self, target: typing.Any):
+        with self._condition:
+            self._evaluated += 1
+            self._in_progress.discard(target)
+            if target in self._slots:
+                self._dirty.append(target)
+                self._condition.notify()
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+
+            target, data = item
+            try:
+                target.evaluate(data)
+            except Exception as e:
+                logger.exception(f"Failed to evaluate '{data}' for {target}, error {e}")
+            finally:
+                self._done(target)
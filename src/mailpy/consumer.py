@@ -1,58 +1,219 @@
+import collections
+import functools
 import queue
 import threading
+import typing
 
 import mailpy.entities as entities
 import mailpy.logging as logging
+from mailpy.bus import CONSUMER_QUEUE_SIZE, BoundedEventQueue, OverflowPolicy
 from mailpy.db import DBManager
+from mailpy.spool import SpoolReader
 
-from .mail.client import MailClient, MailClientArgs
+from .mail.client import MailClientArgs
+from .mail.pool import SESSION_MAX_IDLE, SESSION_MAX_MESSAGES, SMTPConnectionPool
 
 logger = logging.getLogger()
 
 
+def _event_pvname(event: typing.Any) -> typing.Optional[str]:
+    return getattr(event, "pvname", None)
+
+
 class BaseEventConsumer:
-    def __init__(self, name="EventConsumer") -> None:
-        self.queue: queue.Queue = queue.Queue()
-        self._thread = threading.Thread(target=self._consume, daemon=True, name=name)
+    """
+    Pool of workers sharing the consumer queue. When order_key is given, the events with
+    the same key are handled one at a time in the order they were queued: a worker that
+    takes an event whose key is being handled parks it for the worker handling the key.
+    The key is claimed or the event parked while the event is dequeued, so the events of
+    a key keep the queue order whichever worker takes them.
+    Once a spool reader is attached the workers read the events from the spool instead
+    of the queue and acknowledge each one after handling it.
+    """
+
+    def __init__(
+        self,
+        name="EventConsumer",
+        maxsize: int = CONSUMER_QUEUE_SIZE,
+        policy: str = OverflowPolicy.Block,
+        spill_dir: typing.Optional[str] = None,
+        workers: int = 1,
+        order_key: typing.Optional[
+            typing.Callable[[typing.Any], typing.Hashable]
+        ] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError(f"Invalid number of consumer workers {workers}")
+
+        self.name = name
+        self.queue = BoundedEventQueue(
+            maxsize=maxsize, policy=policy, spill_dir=spill_dir, name=name
+        )
+        self._order_key = order_key
+        # Events parked per key being handled, bounded by the queue size
+        self._in_progress: typing.Dict[typing.Hashable, typing.Deque] = {}
+        self._parked = 0
+        self._max_parked = maxsize
+        self._keys_condition = threading.Condition()
+        self._dequeue_lock = threading.Lock()
+        self._spool: typing.Optional[SpoolReader] = None
+
+        self._threads = [
+            threading.Thread(
+                target=self._consume,
+                daemon=True,
+                name=name if workers == 1 else f"{name} {i}",
+            )
+            for i in range(workers)
+        ]
         self._running = False
 
-    def join(self):
+    def join(self, timeout: typing.Optional[float] = None):
+        """Stop once the pending events are handled, waits at most timeout per worker"""
         self._running = False
-        self._thread.join()
+        self.queue.shutdown()
+        if self._spool is not None:
+            self._spool.shutdown()
+        for t in self._threads:
+            if t.is_alive():
+                t.join(timeout=timeout)
+        self.queue.close()
+        if self._spool is not None:
+            self._spool.close()
+
+    def attach_spool(self, reader: SpoolReader):
+        """Must be called before start"""
+        self._spool = reader
 
     def start(self):
-        if not self._thread.is_alive():
-            self._running = True
-            self._thread.start()
-            logger.info(f"Consumer {self} {self._thread.name} starting")
+        self._running = True
+        for t in self._threads:
+            if not t.is_alive():
+                t.start()
+        logger.info(f"Consumer {self.name} starting {len(self._threads)} workers")
 
     def handle(self, obj):
         raise NotImplementedError("Parent should implement this method")
 
     def _consume(self):
-        while self._running:
-            try:
-                self.handle(self.queue.get(block=True))
-            except Exception as e:
-                logger.exception(f"Failed to consume event. Error '{e}'")
+        while True:
+            done = None
+            # Dequeue and claim the key as one step, the workers see the events of a key
+            # in the order they were queued
+            with self._dequeue_lock:
+                try:
+                    if self._spool is None:
+                        obj = self.queue.get(block=True)
+                    else:
+                        offset, obj = self._spool.get(block=True)
+                        done = functools.partial(self._spool.ack, offset)
+                except queue.Empty:
+                    # Shut down and drained
+                    return
+                except Exception as e:
+                    # Unreadable spool records are already skipped and acked
+                    logger.exception(
+                        f"Consumer {self.name} failed to get an event. Error {e}"
+                    )
+                    continue
 
-    def add(self, obj):
+                key = None
+                if self._order_key is not None:
+                    key = self._order_key(obj)
+                    if not self._claim(key, obj, done):
+                        continue
+
+            if self._order_key is None:
+                self._handle(obj, done)
+            else:
+                self._handle_claimed(key, obj, done)
+
+    def _handle(self, obj, done: typing.Optional[typing.Callable[[], None]]):
         try:
-            self.queue.put(obj)
-        except queue.Full:
-            logger.exception(
-                f"Failed to add object '{obj}' to queue. Is the consumer still running?"
-            )
+            self.handle(obj)
+        except Exception as e:
+            logger.exception(f"Failed to consume event. Error '{e}'")
+        if done is not None:
+            done()
+
+    def _claim(
+        self,
+        key: typing.Hashable,
+        obj,
+        done: typing.Optional[typing.Callable[[], None]],
+    ) -> bool:
+        """True when the caller owns the key, otherwise the event is parked for its owner"""
+        with self._keys_condition:
+            if key in self._in_progress:
+                # Bounds the parked events. The dequeue lock is held meanwhile so no
+                # later event can overtake this one
+                self._keys_condition.wait_for(
+                    lambda: self._parked < self._max_parked
+                    or key not in self._in_progress
+                )
+            pending = self._in_progress.get(key)
+            if pending is not None:
+                # Another worker owns the key, it handles the event after its current one
+                pending.append((obj, done))
+                self._parked += 1
+                return False
+            self._in_progress[key] = collections.deque()
+            return True
+
+    def _handle_claimed(
+        self,
+        key: typing.Hashable,
+        obj,
+        done: typing.Optional[typing.Callable[[], None]],
+    ):
+        while True:
+            self._handle(obj, done)
+            with self._keys_condition:
+                pending = self._in_progress[key]
+                if not pending:
+                    del self._in_progress[key]
+                    self._keys_condition.notify_all()
+                    return
+                obj, done = pending.popleft()
+                self._parked -= 1
+                self._keys_condition.notify_all()
+
+    def add(self, obj):
+        """Never blocks longer than the Block policy timeout, see mailpy.bus"""
+        self.queue.put(obj)
 
 
 class EmailConsumer(BaseEventConsumer):
-    def __init__(self, mail_client_args: MailClientArgs) -> None:
-        super().__init__(name="EmailConsumer")
-        self.mail_client = MailClient(
+    def __init__(
+        self,
+        mail_client_args: MailClientArgs,
+        maxsize: int = CONSUMER_QUEUE_SIZE,
+        policy: str = OverflowPolicy.Coalesce,
+        workers: int = 1,
+        session_max_messages: int = SESSION_MAX_MESSAGES,
+        session_max_idle: float = SESSION_MAX_IDLE,
+    ) -> None:
+        # A stalled SMTP server only keeps the latest alarm of each PV, the emails of a
+        # PV are sent in order
+        super().__init__(
+            name="EmailConsumer",
+            maxsize=maxsize,
+            policy=policy,
+            workers=workers,
+            order_key=_event_pvname,
+        )
+        # One session per worker at most, kept open across the emails
+        self.smtp_pool = SMTPConnectionPool(
             args=mail_client_args,
-            debug_level=0,
+            size=workers,
+            max_messages=session_max_messages,
+            max_idle=session_max_idle,
         )
 
+    def join(self, timeout: typing.Optional[float] = None):
+        super().join(timeout=timeout)
+        self.smtp_pool.close()
+
     def handle(self, obj):
         if type(obj) == entities.AlarmEvent:
             self.send_email(obj)
@@ -63,15 +224,28 @@ class EmailConsumer(BaseEventConsumer):
 
     def send_email(self, event: entities.AlarmEvent):
         try:
-            with self.mail_client:
-                self.mail_client.send_email(event)
+            self.smtp_pool.send_email(event)
         except Exception as e:
             logger.exception(f"Failed to send email for event '{event}'. Error {e}")
 
 
 class PersistenceConsumer(BaseEventConsumer):
-    def __init__(self, db_manager: DBManager) -> None:
-        super().__init__(name="PersistenceConsumer")
+    def __init__(
+        self,
+        db_manager: DBManager,
+        maxsize: int = CONSUMER_QUEUE_SIZE,
+        policy: str = OverflowPolicy.Spill,
+        spill_dir: typing.Optional[str] = None,
+        workers: int = 1,
+    ) -> None:
+        # Every event is persisted, the backlog of a slow database goes to disk
+        super().__init__(
+            name="PersistenceConsumer",
+            maxsize=maxsize,
+            policy=policy,
+            spill_dir=spill_dir,
+            workers=workers,
+        )
         self.db_manager = db_manager
 
     def handle(self, obj):
@@ -1,4 +1,6 @@
+import concurrent.futures
 import queue
+import time
 import typing
 
 import epics
@@ -7,30 +9,83 @@ import mailpy.db as db
 import mailpy.entities as entities
 import mailpy.helpers as helpers
 import mailpy.logging as logging
+from mailpy.batch import BatchEvaluator
+from mailpy.coalescing import BaseDispatcher
 from mailpy.entities.group import Group
+from mailpy.scheduler import DeadlineScheduler
 
 logger = logging.getLogger()
 
 
-class EpicsConnector:
-    def __init__(self, pvname: str):
-        self._pv = epics.PV(
-            pvname,
-            connection_callback=self._dispatch_connection_changed_event,
-            callback=self._dispatch_value_changed_event,
-        )
-        if not self._pv.connected:
-            logger.warning(f"Epics PV {self._pv} is disconnected")
+# Interval between connection checks during the bulk startup
+CONNECTION_POLL_INTERVAL = 0.05
+
+
+class BaseConnector:
+    """
+    Fans the updates of a single PV out to its entries.
+    Data sources subclass it and call dispatch_value_changed/dispatch_connection_changed.
+    """
+
+    def __init__(
+        self,
+        pvname: str,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ):
+        """
+        :param dispatcher: when set, value changes are coalesced and evaluated by its workers
+            instead of the thread delivering them.
+        """
+        self._pvname = pvname
+        self._dispatcher = dispatcher
+        self._mask: int = entities.MonitorMask.Default
         self._entries: typing.Set[entities.Entry] = set()
+        # Derived entries using this PV as one of their inputs
+        self._dependents: typing.Set[entities.Entry] = set()
 
-    def _dispatch_value_changed_event(self, *_args, **kwargs):
-        data = entities.ValueChangedInfo(
-            pvname=kwargs.get("pvname", None),
-            value=kwargs.get("value", None),
-            status=kwargs.get("status", None),
-            host=kwargs.get("host", None),
-            severity=kwargs.get("severity", None),
-        )
+    @property
+    def pvname(self) -> str:
+        return self._pvname
+
+    @property
+    def connected(self) -> bool:
+        raise NotImplementedError("Parent should implement this method")
+
+    @property
+    def monitor_mask(self) -> int:
+        return self._mask
+
+    def start_monitor(self):
+        """Start delivering the updates of a connector created with monitor=False"""
+        pass
+
+    def _apply_monitor_mask(self, mask: int):
+        """Called when the entries require a different subscription mask"""
+        pass
+
+    def _update_subscription(self):
+        """Subscribe only to the events required by the entries of this PV"""
+        mask = 0
+        for entry in self._entries:
+            mask |= entry.monitor_mask
+        for entry in self._dependents:
+            mask |= entry.monitor_mask
+        mask = mask or entities.MonitorMask.Default
+
+        if mask == self._mask:
+            return
+
+        logger.info(f"PV {self.pvname} subscription mask {self._mask} -> {mask}")
+        self._mask = mask
+        self._apply_monitor_mask(mask)
+
+    def dispatch_value_changed(self, data: entities.ValueChangedInfo):
+        if self._dispatcher is None:
+            self.evaluate(data)
+        else:
+            self._dispatcher.submit(self, data)
+
+    def evaluate(self, data: entities.ValueChangedInfo):
         for entry in self._entries:
             try:
                 entry.handle_value_change(data)
@@ -38,12 +93,16 @@ class EpicsConnector:
                 logger.exception(
                     f"Failed to dispatch event '{data}' for entry '{entry}', error {e}"
                 )
+        # Only the derived entries depending on this PV are recomputed
+        for entry in self._dependents:
+            try:
+                entry.handle_input_change(data)
+            except Exception as e:
+                logger.exception(
+                    f"Failed to dispatch input '{data}' for derived entry '{entry}', error {e}"
+                )
 
-    def _dispatch_connection_changed_event(self, *_args, **kwargs):
-        data = entities.ConnectionChangedInfo(
-            pvname=kwargs["pvname"],
-            conn=kwargs["conn"],
-        )
+    def dispatch_connection_changed(self, data: entities.ConnectionChangedInfo):
         for entry in self._entries:
             entry.handle_connection_change(data)
 
@@ -57,28 +116,277 @@ class EpicsConnector:
             return
 
         self._entries.add(entry)
+        self._update_subscription()
+
+    def remove_entry(self, entry: entities.Entry):
+        if not self._has_entry(entry):
+            return
+
+        self._entries.discard(entry)
+        self._update_subscription()
+
+    def add_dependent(self, entry: entities.Entry):
+        if type(entry) != entities.Entry:
+            raise ValueError(f"Invalid type for entry {type(entry)}")
+        if entry in self._dependents:
+            return
+
+        self._dependents.add(entry)
+        self._update_subscription()
+
+    def remove_dependent(self, entry: entities.Entry):
+        if entry not in self._dependents:
+            return
+
+        self._dependents.discard(entry)
+        self._update_subscription()
+
+    def tick(self):
+        """Re-dispatch the current value"""
+        pass
+
+
+class EpicsConnector(BaseConnector):
+    def __init__(
+        self,
+        pvname: str,
+        monitor: bool = True,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ):
+        """
+        :param monitor: subscribe as soon as the channel connects. When False the channel
+            is only created and start_monitor must be called later.
+        """
+        super().__init__(pvname, dispatcher=dispatcher)
+        self._monitoring = monitor
+        self._pv = epics.PV(
+            pvname,
+            connection_callback=self._dispatch_connection_changed_event,
+            callback=self._dispatch_value_changed_event,
+            # Waveforms larger than AUTOMONITOR_MAXLENGTH are monitored as well
+            auto_monitor=self._mask if monitor else False,
+        )
+        if monitor and not self._pv.connected:
+            logger.warning(f"Epics PV {self._pv} is disconnected")
+
+    @property
+    def connected(self) -> bool:
+        return self._pv.connected
+
+    def start_monitor(self):
+        """Subscribe now if connected, otherwise as soon as the channel connects"""
+        self._monitoring = True
+        self._pv.auto_monitor = self._mask
+
+    def _apply_monitor_mask(self, mask: int):
+        if self._monitoring:
+            # pyepics clears and recreates the subscription when the mask changes
+            self._pv.auto_monitor = mask
+
+    def _dispatch_value_changed_event(self, *_args, **kwargs):
+        self.dispatch_value_changed(
+            entities.ValueChangedInfo(
+                pvname=kwargs.get("pvname", None),
+                value=kwargs.get("value", None),
+                status=kwargs.get("status", None),
+                host=kwargs.get("host", None),
+                severity=kwargs.get("severity", None),
+                timestamp=kwargs.get("timestamp", None),
+            )
+        )
+
+    def _dispatch_connection_changed_event(self, *_args, **kwargs):
+        self.dispatch_connection_changed(
+            entities.ConnectionChangedInfo(
+                pvname=kwargs["pvname"],
+                conn=kwargs["conn"],
+            )
+        )
 
     def tick(self):
         self._pv.run_callbacks()
 
 
+class BaseDataSource:
+    """Creates the connectors of the monitored PVs, DataConnector only talks to this interface"""
+
+    def create_connector(
+        self,
+        pvname: str,
+        monitor: bool = True,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ) -> BaseConnector:
+        raise NotImplementedError("Parent should implement this method")
+
+    def wait_connections(
+        self, connectors: typing.List[BaseConnector], deadline: float
+    ) -> typing.List[BaseConnector]:
+        """Wait until time.monotonic() reaches deadline, returns the connectors still pending"""
+        return [c for c in connectors if not c.connected]
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class EpicsDataSource(BaseDataSource):
+    """Channel Access PVs"""
+
+    def create_connector(
+        self,
+        pvname: str,
+        monitor: bool = True,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ) -> BaseConnector:
+        return EpicsConnector(pvname, monitor=monitor, dispatcher=dispatcher)
+
+    def wait_connections(
+        self, connectors: typing.List[BaseConnector], deadline: float
+    ) -> typing.List[BaseConnector]:
+        # Send every search request at once
+        epics.ca.flush_io()
+
+        pending = [c for c in connectors if not c.connected]
+        while pending and time.monotonic() < deadline:
+            epics.ca.pend_event(CONNECTION_POLL_INTERVAL)
+            pending = [c for c in pending if not c.connected]
+        return pending
+
+
+class StartupReport(typing.NamedTuple):
+    connected: typing.List[str]
+    pending: typing.List[str]
+    duration: float
+
+
+class ShardTickReport(typing.NamedTuple):
+    shard: int
+    connectors: int
+    duration: float
+
+
 class DataConnector:
-    def __init__(self, db: db.DBManager, event_queue: queue.Queue):
-        self._connectors: typing.Dict[str, EpicsConnector] = {}
+    def __init__(
+        self,
+        db: db.DBManager,
+        event_queue: queue.Queue,
+        scheduler: typing.Optional[DeadlineScheduler] = None,
+        tick_workers: int = 1,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+        source: typing.Optional[BaseDataSource] = None,
+        batch: typing.Optional[BatchEvaluator] = None,
+    ):
+        """
+        :param source: where the PV updates come from, Channel Access when None.
+        :param batch: when set, threshold entries are evaluated by its periodic flush.
+        """
+        if tick_workers < 1:
+            raise ValueError(f"Invalid number of tick workers {tick_workers}")
+
+        self._source = source if source is not None else EpicsDataSource()
+        self._connectors: typing.Dict[str, BaseConnector] = {}
         self._groups: typing.Dict[str, entities.Group] = {}
         self._db = db
         self._queue = event_queue
+        self._scheduler = scheduler
+        self._dispatcher = dispatcher
+        self._batch = batch
+
+        self._tick_workers = tick_workers
+        self._tick_executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = (
+            concurrent.futures.ThreadPoolExecutor(
+                max_workers=tick_workers, thread_name_prefix="Tick Shard"
+            )
+            if tick_workers > 1
+            else None
+        )
 
-    def _add_connector(self, pvname: str):
+    def _add_connector(self, pvname: str, monitor: bool = True):
         if not (pvname in self._connectors):
-            self._connectors[pvname] = EpicsConnector(pvname)
+            self._connectors[pvname] = self._source.create_connector(
+                pvname, monitor=monitor, dispatcher=self._dispatcher
+            )
         return self._connectors[pvname]
 
-    def tick(self):
-        for _, c in self._connectors.items():
-            c.tick()
+    @staticmethod
+    def _tick_shard(
+        shard: int, connectors: typing.List[BaseConnector]
+    ) -> ShardTickReport:
+        start = time.perf_counter()
+        for c in connectors:
+            try:
+                c.tick()
+            except Exception as e:
+                logger.exception(f"Failed to tick connector {c}, error {e}")
+        return ShardTickReport(
+            shard=shard,
+            connectors=len(connectors),
+            duration=time.perf_counter() - start,
+        )
+
+    def tick(self) -> typing.List[ShardTickReport]:
+        """
+        Re-dispatch the current value of every PV, cooldown expiration is handled by the scheduler.
+        Connectors are split into one shard per tick worker so a slow PV only delays its own shard.
+        """
+        connectors = list(self._connectors.values())
+        shards = [
+            connectors[i :: self._tick_workers] for i in range(self._tick_workers)
+        ]
+
+        if self._tick_executor is None:
+            reports = [self._tick_shard(0, shards[0])]
+        else:
+            futures = [
+                self._tick_executor.submit(self._tick_shard, i, shard)
+                for i, shard in enumerate(shards)
+            ]
+            reports = [f.result() for f in futures]
 
-    def create_entry(self, entry_data: entities.EntryData):
+        for report in reports:
+            logger.debug(
+                f"Tick shard {report.shard}: {report.connectors} connectors in {report.duration:.4f}s"
+            )
+        return reports
+
+    def create_entries(
+        self,
+        entries_data: typing.Iterable[entities.EntryData],
+        connection_timeout: float = 5.0,
+    ) -> StartupReport:
+        """
+        Bulk startup: create every channel without waiting, let the source wait for all of
+        them under a single deadline and only then attach the monitors.
+        """
+        start = time.monotonic()
+        known = set(self._connectors)
+        for entry_data in entries_data:
+            self.create_entry(entry_data=entry_data, monitor=False)
+        connectors = [c for name, c in self._connectors.items() if name not in known]
+
+        pending = self._source.wait_connections(
+            connectors, deadline=start + connection_timeout
+        )
+
+        for c in connectors:
+            c.start_monitor()
+
+        pending_names = set(c.pvname for c in pending)
+        report = StartupReport(
+            connected=[c.pvname for c in connectors if c.pvname not in pending_names],
+            pending=sorted(pending_names),
+            duration=time.monotonic() - start,
+        )
+        logger.info(
+            f"Startup of {len(connectors)} PVs took {report.duration:.3f}s, {len(report.connected)} connected and {len(report.pending)} pending"
+        )
+        if report.pending:
+            logger.warning(f"PVs still pending connection: {report.pending}")
+        return report
+
+    def create_entry(self, entry_data: entities.EntryData, monitor: bool = True):
         # Create group if needed
         if not (entry_data.group in self._groups):
             group_data: db.GroupData = self._db.get_group(entry_data.group)
@@ -93,17 +401,36 @@ class DataConnector:
                     group=self._groups[entry_data.group],
                     entry_data=entry_data,
                     event_queue=self._queue,
-                )
+                    scheduler=self._scheduler,
+                ),
+                monitor=monitor,
             )
             logger.info(f"Creating entry {entry_data}")
         except helpers.EntryException:
             logger.exception("Failed to create entry")
 
-    def add_entry(self, entry: entities.Entry):
-        connector = self._add_connector(pvname=entry.pvname)
-        connector.add_entry(entry)
+    def add_entry(self, entry: entities.Entry, monitor: bool = True):
+        if entry.derived:
+            # Fanned out from the connectors of its inputs
+            for pvname in entry.inputs:
+                self._add_connector(pvname=pvname, monitor=monitor).add_dependent(entry)
+        else:
+            connector = self._add_connector(pvname=entry.pvname, monitor=monitor)
+            connector.add_entry(entry)
+        if self._batch is not None:
+            self._batch.add_entry(entry)
         self.add_group(entry.group)
 
+    def remove_entry(self, entry: entities.Entry):
+        if self._batch is not None:
+            self._batch.remove_entry(entry)
+        if entry.derived:
+            for pvname in entry.inputs:
+                if pvname in self._connectors:
+                    self._connectors[pvname].remove_dependent(entry)
+        elif entry.pvname in self._connectors:
+            self._connectors[entry.pvname].remove_entry(entry)
+
     def add_group(self, group: entities.Group):
         if type(group) == Group and not (group.name in self._groups):
             self._groups[group.name] = group
@@ -6,6 +6,7 @@ import pymongo.database
 
 import mailpy.logging as logging
 from mailpy.entities import ConditionEnums
+from mailpy.entities.deadband import DeadbandEnums
 from mailpy.entities.entry import EntryData
 from mailpy.entities.event import Event
 from mailpy.entities.group import GroupData
@@ -54,6 +55,12 @@ class DBManager:
             subject=data["subject"].strip(),
             email_timeout=data["email_timeout"],
             group=data["group"],
+            deadband=float(data.get("deadband") or 0.0),
+            deadband_mode=(data.get("deadband_mode") or DeadbandEnums.Absolute).strip(),
+            hysteresis=float(data.get("hysteresis") or 0.0),
+            notify_normal=bool(data.get("notify_normal", False)),
+            duration=float(data.get("duration") or 0.0),
+            formula=(data.get("formula") or "").strip(),
         )
 
     def get_entries(self) -> typing.List[EntryData]:
@@ -74,8 +81,7 @@ class DBManager:
         events_collection: pymongo.collection.Collection = self.db[
             DBManager.EVENTS_COLLECTION
         ]
-        data = {**event.__dict__, "ts": event.ts.ts}
-        data["ts"] = event.ts.ts
+        data = {**event.to_dict(), "ts": event.ts.ts}
 
         events_collection.insert_one(data)
 
@@ -1,6 +1,13 @@
-from .condition import ConditionEnums
-from .entry import ConnectionChangedInfo, Entry, EntryData, ValueChangedInfo
-from .event import AlarmEvent, Event
+from . import expression, window  # noqa: F401 register their conditions
+from .condition import ConditionEnums, MonitorMask
+from .entry import (
+    AlarmState,
+    ConnectionChangedInfo,
+    Entry,
+    EntryData,
+    ValueChangedInfo,
+)
+from .event import AlarmEvent, Event, EventType
 from .group import Group
 
 __all__ = [
@@ -9,7 +16,10 @@ __all__ = [
     "EntryData",
     "Group",
     "ConditionEnums",
+    "MonitorMask",
     "AlarmEvent",
+    "AlarmState",
+    "EventType",
     "ValueChangedInfo",
     "ConnectionChangedInfo",
 ]
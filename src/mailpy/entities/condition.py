@@ -1,11 +1,57 @@
+import bisect
+import threading
 import typing
 
+import numpy
+
 import mailpy.logging as logging
 
 from ..helpers.exceptions import EntryException
 
 logger = logging.getLogger()
 
+# Upper bound of violated indices reported by array conditions
+MAX_REPORTED_INDICES = 20
+
+if typing.TYPE_CHECKING:
+    from .entry import ValueChangedInfo
+
+
+class MonitorMask(object):
+    """Channel Access subscription masks, same values as epics.dbr.DBE_*"""
+
+    Value = 1
+    Log = 2
+    Alarm = 4
+    Default = Value | Alarm
+
+
+class AlarmSeverity(object):
+    """EPICS alarm severities"""
+
+    NoAlarm = 0
+    Minor = 1
+    Major = 2
+    Invalid = 3
+
+    @staticmethod
+    def from_str(severity: str) -> int:
+        names = {
+            "NO_ALARM": AlarmSeverity.NoAlarm,
+            "MINOR": AlarmSeverity.Minor,
+            "MAJOR": AlarmSeverity.Major,
+            "INVALID": AlarmSeverity.Invalid,
+        }
+        name = severity.strip().upper()
+        if name in names:
+            return names[name]
+        return int(name)
+
+    @staticmethod
+    def to_str(severity: int) -> str:
+        names = ["NO_ALARM", "MINOR", "MAJOR", "INVALID"]
+        return names[severity] if 0 <= severity < len(names) else str(severity)
+
 
 class ConditionEnums(object):
     """Alarm  conditions"""
@@ -15,6 +61,11 @@ class ConditionEnums(object):
     InferiorThan = "inferior than"
     IncreasingStep = "increasing step"
     DecreasingStep = "decreasing step"
+    AlarmSeverity = "alarm severity"
+    Expression = "expression"
+    MovingAverage = "moving average"
+    RateOfChange = "rate of change"
+    RollingStd = "rolling stddev"
     Disconnected = "disconnected"
 
     @staticmethod
@@ -40,6 +91,26 @@ class ConditionEnums(object):
                 "name": ConditionEnums.DecreasingStep,
                 "desc": "Each decreasing step triggers an alarm.",
             },
+            {
+                "name": ConditionEnums.AlarmSeverity,
+                "desc": "EPICS alarm severity must remain lower than (MINOR, MAJOR or INVALID).",
+            },
+            {
+                "name": ConditionEnums.Expression,
+                "desc": "Expression of value, severity and status that must remain false, e.g. 'value < 3 or value > 7.5 and severity >= MAJOR'.",
+            },
+            {
+                "name": ConditionEnums.MovingAverage,
+                "desc": "Average of the last samples must remain within the range, 'window:min:max'.",
+            },
+            {
+                "name": ConditionEnums.RateOfChange,
+                "desc": "Change per second across the last samples must remain lower than, 'window:max_rate'.",
+            },
+            {
+                "name": ConditionEnums.RollingStd,
+                "desc": "Standard deviation of the last samples must remain lower than, 'window:max_std'.",
+            },
         ]
 
 
@@ -52,7 +123,50 @@ class ConditionCheckResponse(typing.NamedTuple):
     extras: dict = {}
 
 
+def _check_array(condition, value: numpy.ndarray):
+    if value.dtype.kind not in "iuf":
+        raise ConditionException(
+            f"Condition {condition} requires a numeric array, received dtype {value.dtype}"
+        )
+
+
+def _array_response(
+    message: str,
+    value: numpy.ndarray,
+    violated: numpy.ndarray,
+    worst_index: int,
+) -> typing.Optional[ConditionCheckResponse]:
+    """Summarize the violations of an array condition, violated is a boolean mask"""
+    indices = numpy.flatnonzero(violated)
+    if not indices.size:
+        return None
+
+    return ConditionCheckResponse(
+        message=f"{message}, {indices.size} of {value.size} elements violated",
+        extras={
+            "violations": int(indices.size),
+            "indices": indices[:MAX_REPORTED_INDICES].tolist(),
+            "worst_index": int(worst_index),
+            "worst_value": value.flat[worst_index].item(),
+        },
+    )
+
+
 class Condition:
+    """
+    Stateless conditions only read their parsed limits in check_alarm, a single instance
+    is shared by every entry with the same limits. Conditions keeping track of previous
+    values must set stateful so each entry gets its own instance.
+    """
+
+    __slots__ = ("_limits",)
+
+    # Channel Access events required by the condition
+    monitor_mask: int = MonitorMask.Default
+    stateful: bool = False
+    # Only reports the sample that crossed a level, not every sample beyond it
+    edge_triggered: bool = False
+
     def __init__(self, limits: str) -> None:
         self._limits = limits
 
@@ -67,8 +181,45 @@ class Condition:
     def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
         raise NotImplementedError("Child class must impplement this method")
 
+    def evaluate(
+        self, data: "ValueChangedInfo"
+    ) -> typing.Optional[ConditionCheckResponse]:
+        """Check the PV update, conditions that only use the value rely on check_alarm"""
+        return self.check_alarm(data.value)
+
+    def observe(self, data: "ValueChangedInfo"):
+        """
+        Receives every sample of the entry, including the ones not evaluated because of
+        the email_timeout or a disabled group. Conditions keeping history record it here.
+        """
+
+    @property
+    def threshold_range(self) -> typing.Optional[typing.Tuple[float, float]]:
+        """Allowed [low, high] range of stateless threshold conditions, used by the batch evaluation"""
+        return None
+
+    def is_cleared(self, data: "ValueChangedInfo", hysteresis: float = 0.0) -> bool:
+        """Whether an alarm raised by this condition is over, hysteresis narrows the threshold range"""
+        threshold = self.threshold_range
+        value = data.value
+        if not hysteresis or threshold is None:
+            return self.evaluate(data) is None
+
+        low, high = threshold[0] + hysteresis, threshold[1] - hysteresis
+        if isinstance(value, numpy.ndarray):
+            _check_array(self, value)
+            return bool(numpy.all((value >= low) & (value <= high)))
+
+        if type(value) != int and type(value) != float:
+            raise ConditionException(
+                f"Condition {self} requires a numeric input, received {type(value)}"
+            )
+        return low <= value <= high
+
 
 class ConditionDisconnected(Condition):
+    __slots__ = ()
+
     @property
     def name(self) -> str:
         return ConditionEnums.Disconnected
@@ -82,6 +233,8 @@ class ConditionDisconnected(Condition):
 
 
 class ConditionInferiorThan(Condition):
+    __slots__ = ("alarm_limit",)
+
     @property
     def name(self) -> str:
         return ConditionEnums.InferiorThan
@@ -98,6 +251,9 @@ class ConditionInferiorThan(Condition):
         self.alarm_limit = float(limits)
 
     def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
+        if isinstance(value, numpy.ndarray):
+            return self.check_alarm_array(value)
+
         if type(value) != int and type(value) != float:
             raise ConditionException(
                 f"Condition {self} requires a numeric input, received {type(value)}"
@@ -109,8 +265,25 @@ class ConditionInferiorThan(Condition):
             )
         return None
 
+    @property
+    def threshold_range(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return (self.alarm_limit, numpy.inf)
+
+    def check_alarm_array(
+        self, value: numpy.ndarray
+    ) -> typing.Optional[ConditionCheckResponse]:
+        _check_array(self, value)
+        return _array_response(
+            message=f"values required to be higher than {self.alarm_limit}",
+            value=value,
+            violated=value < self.alarm_limit,
+            worst_index=int(numpy.argmin(value)) if value.size else 0,
+        )
+
 
 class ConditionSuperiorThan(Condition):
+    __slots__ = ("alarm_limit",)
+
     def __init__(self, limits: str) -> None:
         super().__init__(limits)
         self.alarm_limit: float
@@ -127,6 +300,9 @@ class ConditionSuperiorThan(Condition):
         self.alarm_limit = float(limits)
 
     def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
+        if isinstance(value, numpy.ndarray):
+            return self.check_alarm_array(value)
+
         if type(value) != int and type(value) != float:
             raise ConditionException(
                 f"Condition {self} requires a numeric input, received {type(value)}"
@@ -138,8 +314,25 @@ class ConditionSuperiorThan(Condition):
             )
         return None
 
+    @property
+    def threshold_range(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return (-numpy.inf, self.alarm_limit)
+
+    def check_alarm_array(
+        self, value: numpy.ndarray
+    ) -> typing.Optional[ConditionCheckResponse]:
+        _check_array(self, value)
+        return _array_response(
+            message=f"values required to be lower than {self.alarm_limit}",
+            value=value,
+            violated=value > self.alarm_limit,
+            worst_index=int(numpy.argmax(value)) if value.size else 0,
+        )
+
 
 class ConditionOutOfRange(Condition):
+    __slots__ = ("alarm_min", "alarm_max")
+
     def __init__(self, limits: str) -> None:
         super().__init__(limits)
         self.alarm_min: float
@@ -167,6 +360,9 @@ class ConditionOutOfRange(Condition):
         self.alarm_max = _max
 
     def check_alarm(self, value: float) -> typing.Optional[ConditionCheckResponse]:
+        if isinstance(value, numpy.ndarray):
+            return self.check_alarm_array(value)
+
         if type(value) != int and type(value) != float:
             raise ConditionException(
                 f"Condition {self} requires a numeric input, received {type(value)}"
@@ -179,38 +375,35 @@ class ConditionOutOfRange(Condition):
 
         return None
 
+    @property
+    def threshold_range(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return (self.alarm_min, self.alarm_max)
 
-class ConditionIncreasingStep(Condition):
+    def check_alarm_array(
+        self, value: numpy.ndarray
+    ) -> typing.Optional[ConditionCheckResponse]:
+        _check_array(self, value)
+        # Distance outside the range, negative for the values within it
+        distance = numpy.maximum(self.alarm_min - value, value - self.alarm_max)
+        return _array_response(
+            message=f"from {self.alarm_min} to {self.alarm_max}",
+            value=value,
+            violated=distance > 0,
+            worst_index=int(numpy.argmax(distance)) if value.size else 0,
+        )
+
+
+class ConditionStep(Condition):
+    """
+    Stair of levels shared by the increasing and decreasing step conditions.
+    The level of a value is the number of step values lower or equal to it, found
+    with a binary search so staircases with hundreds of levels stay cheap.
     """
-    create two dictionaries, "step_level" and "step":Levels change when its equal to  the limit.
-     -------------------------------------------------------------------------
-     * step_level:
-         - keys: [int] indexes that contain the 'increasing step' condition
-         - values: [int] represent the current step in the stair, where 0 is
-                   the lowest level, and len(step[i]) is highest level
-        e.g.:
-           value = '1.5:2.0:2.5:3.0'
-           step  = [1.5,2.0,2.5,3.0]
-           len(step) = 4
-
-           3.0 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _  ___Level_4___
-           2.5 _ _ _ _ _ _ _ _ _ _ _ _ _ _ __L3__|
-           2.0 _ _ _ _ _ _ _ _ _ _  __L2__|
-           1.5 _ _ _ _ _ _ _ __L1__|
-                            |
-                            |
-             0 ___Level_0___|
 
-          -Level 0: lowest level, 0 ~ 1.5 u (normal operation)
-             ...
-          -Level 4: highest level, 3.0+
+    __slots__ = ("step_values", "step_level", "min_level", "max_level")
 
-      obs.: emails are only sent when moving from any level to a higher one
-     -------------------------------------------------------------------------
-     * step:
-         - keys: [int] indexes that contain the 'increasing step' condition
-         - values: [array of float] represent the steps that triggers mailing
-    """
+    stateful = True
+    edge_triggered = True
 
     def __init__(self, limits: str) -> None:
         super().__init__(limits)
@@ -224,13 +417,13 @@ class ConditionIncreasingStep(Condition):
         self.max_level = -1
 
         self._parse_limits(limits=limits)
+        self.step_level = self.initial_level
 
     @property
-    def name(self) -> str:
-        return ConditionEnums.IncreasingStep
+    def initial_level(self) -> int:
+        raise NotImplementedError("Child class must impplement this method")
 
     def _parse_limits(self, limits: str):
-        self.step_level = 0  # Current step level
         try:
             self.step_values = [
                 float(val) for val in limits.split(":")
@@ -258,55 +451,252 @@ class ConditionIncreasingStep(Condition):
 
         return f"level ({level}), values between {self.step_values[level -1]} and {self.step_values[level]}"
 
+    def _worst_index(self, value: numpy.ndarray) -> int:
+        """Element of an array that sets its level"""
+        raise NotImplementedError("Child class must impplement this method")
+
+    def _is_alarm(self, new_level: int) -> bool:
+        raise NotImplementedError("Child class must impplement this method")
+
     def check_alarm(
-        self, value: typing.Union[int, float]
+        self, value: typing.Union[int, float, numpy.ndarray]
     ) -> typing.Optional[ConditionCheckResponse]:
-
-        if type(value) != int and type(value) != float:
+        extras: dict = {}
+        if isinstance(value, numpy.ndarray):
+            _check_array(self, value)
+            if not value.size:
+                return None
+
+            worst_index = self._worst_index(value)
+            extras = {
+                "worst_index": worst_index,
+                "worst_value": value.flat[worst_index].item(),
+            }
+            value = extras["worst_value"]
+
+        elif type(value) != int and type(value) != float:
             raise ConditionException(
                 f"Condition {self} requires a numeric input, received {type(value)}"
             )
 
         new_value_level = self.find_level_for_value(value)
-        if new_value_level > self.step_level:
-            # We are going up levels
+        if self._is_alarm(new_value_level):
             response = ConditionCheckResponse(
-                message=self.get_level_str(new_value_level)
+                message=self.get_level_str(new_value_level), extras=extras
             )
             self.step_level = new_value_level
             return response
 
-        if new_value_level < self.step_level:
+        if new_value_level != self.step_level:
             logger.info(
-                f"{self} going down from level {self.step_level} to {new_value_level}. {self.get_level_str(new_value_level)}"
+                f"{self} moving from level {self.step_level} to {new_value_level}. {self.get_level_str(new_value_level)}"
             )
 
         self.step_level = new_value_level
         return None
 
     def find_level_for_value(self, value) -> int:
-        level = 0
-        for min_value in self.step_values:
-            # Locate the next level we belong
-            if min_value > value:
-                return level
-            level += 1
-        return level
+        return bisect.bisect_right(self.step_values, value)
 
 
-def create_condition(condition: str, alarm_values: str) -> Condition:
-    if condition == ConditionEnums.OutOfRange:
-        return ConditionOutOfRange(limits=alarm_values)
+class ConditionIncreasingStep(ConditionStep):
+    """
+    create two dictionaries, "step_level" and "step":Levels change when its equal to  the limit.
+     -------------------------------------------------------------------------
+     * step_level:
+         - keys: [int] indexes that contain the 'increasing step' condition
+         - values: [int] represent the current step in the stair, where 0 is
+                   the lowest level, and len(step[i]) is highest level
+        e.g.:
+           value = '1.5:2.0:2.5:3.0'
+           step  = [1.5,2.0,2.5,3.0]
+           len(step) = 4
+
+           3.0 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _  ___Level_4___
+           2.5 _ _ _ _ _ _ _ _ _ _ _ _ _ _ __L3__|
+           2.0 _ _ _ _ _ _ _ _ _ _  __L2__|
+           1.5 _ _ _ _ _ _ _ __L1__|
+                            |
+                            |
+             0 ___Level_0___|
+
+          -Level 0: lowest level, 0 ~ 1.5 u (normal operation)
+             ...
+          -Level 4: highest level, 3.0+
+
+      obs.: emails are only sent when moving from any level to a higher one
+     -------------------------------------------------------------------------
+     * step:
+         - keys: [int] indexes that contain the 'increasing step' condition
+         - values: [array of float] represent the steps that triggers mailing
+    """
 
-    elif condition == ConditionEnums.SuperiorThan:
-        return ConditionSuperiorThan(limits=alarm_values)
+    __slots__ = ()
 
-    elif condition == ConditionEnums.InferiorThan:
-        return ConditionInferiorThan(limits=alarm_values)
+    @property
+    def name(self) -> str:
+        return ConditionEnums.IncreasingStep
 
-    elif condition == ConditionEnums.IncreasingStep:
-        return ConditionIncreasingStep(limits=alarm_values)
+    @property
+    def initial_level(self) -> int:
+        return self.min_level
 
-    raise ConditionException(
-        f"Invalid condition '{condition}, factory does not support this."
-    )
+    def _worst_index(self, value: numpy.ndarray) -> int:
+        # The stair level of an array is given by its highest element
+        return int(numpy.argmax(value))
+
+    def _is_alarm(self, new_level: int) -> bool:
+        # We are going up levels
+        return new_level > self.step_level
+
+
+class ConditionDecreasingStep(ConditionStep):
+    """
+    Same stair as ConditionIncreasingStep upside down, the highest level is the normal
+    operation and emails are only sent when moving from any level to a lower one.
+    """
+
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.DecreasingStep
+
+    @property
+    def initial_level(self) -> int:
+        return self.max_level
+
+    def _worst_index(self, value: numpy.ndarray) -> int:
+        # The stair level of an array is given by its lowest element
+        return int(numpy.argmin(value))
+
+    def _is_alarm(self, new_level: int) -> bool:
+        # We are going down levels
+        return new_level < self.step_level
+
+
+class ConditionAlarmSeverity(Condition):
+    """Alarm based on the severity computed by the IOC, only alarm events are subscribed"""
+
+    __slots__ = ("alarm_severity",)
+
+    monitor_mask = MonitorMask.Alarm
+
+    def __init__(self, limits: str) -> None:
+        super().__init__(limits)
+        self.alarm_severity: int
+        self._parse_limits(limits)
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.AlarmSeverity
+
+    def _parse_limits(self, limits):
+        if not limits or type(limits) != str:
+            raise ConditionException(f"Cannot create condition with limits '{limits}'")
+        try:
+            self.alarm_severity = AlarmSeverity.from_str(limits)
+        except ValueError as e:
+            raise ConditionException(
+                f"Cannot create condition, invalid severity '{limits}'. {e}"
+            ) from e
+
+        if not AlarmSeverity.Minor <= self.alarm_severity <= AlarmSeverity.Invalid:
+            raise ConditionException(
+                f"Cannot create condition, severity '{limits}' out of range"
+            )
+
+    def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
+        """The value is the alarm severity of the PV"""
+        if type(value) != int:
+            raise ConditionException(
+                f"Condition {self} requires an integer severity, received {type(value)}"
+            )
+
+        if value >= self.alarm_severity:
+            return ConditionCheckResponse(
+                message=f"severity {AlarmSeverity.to_str(value)}, required to be lower than {AlarmSeverity.to_str(self.alarm_severity)}"
+            )
+        return None
+
+    def evaluate(
+        self, data: "ValueChangedInfo"
+    ) -> typing.Optional[ConditionCheckResponse]:
+        return self.check_alarm(data.severity)
+
+
+class ConditionRegistry:
+    """
+    Condition classes by name, plugins add their own with register_condition.
+    Stateless conditions are compiled once per (condition, alarm_values) pair.
+    """
+
+    def __init__(self) -> None:
+        self._classes: typing.Dict[str, typing.Type[Condition]] = {}
+        self._shared: typing.Dict[typing.Tuple[str, str], Condition] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> typing.List[str]:
+        return list(self._classes)
+
+    @property
+    def shared(self) -> int:
+        """Number of distinct stateless conditions compiled so far"""
+        return len(self._shared)
+
+    def register(self, name: str, cls: typing.Type[Condition]):
+        if not issubclass(cls, Condition):
+            raise ConditionException(f"Cannot register {cls}, not a Condition")
+        with self._lock:
+            if name in self._classes and self._classes[name] is not cls:
+                raise ConditionException(f"Condition '{name}' is already registered")
+            self._classes[name] = cls
+
+    def create(self, condition: str, alarm_values: str) -> Condition:
+        cls = self._classes.get(condition)
+        if cls is None:
+            raise ConditionException(
+                f"Invalid condition '{condition}, factory does not support this."
+            )
+
+        if cls.stateful or type(alarm_values) != str:
+            return cls(limits=alarm_values)
+
+        key = (condition, alarm_values)
+        with self._lock:
+            instance = self._shared.get(key)
+            if instance is None:
+                instance = cls(limits=alarm_values)
+                self._shared[key] = instance
+            return instance
+
+    def clear(self):
+        """Drop the shared instances, entries keep the ones they already hold"""
+        with self._lock:
+            self._shared.clear()
+
+
+registry = ConditionRegistry()
+
+
+def register_condition(name: str):
+    """Class decorator adding a condition to the registry"""
+
+    def decorator(cls: typing.Type[Condition]) -> typing.Type[Condition]:
+        registry.register(name, cls)
+        return cls
+
+    return decorator
+
+
+registry.register(ConditionEnums.OutOfRange, ConditionOutOfRange)
+registry.register(ConditionEnums.SuperiorThan, ConditionSuperiorThan)
+registry.register(ConditionEnums.InferiorThan, ConditionInferiorThan)
+registry.register(ConditionEnums.IncreasingStep, ConditionIncreasingStep)
+registry.register(ConditionEnums.DecreasingStep, ConditionDecreasingStep)
+registry.register(ConditionEnums.AlarmSeverity, ConditionAlarmSeverity)
+
+
+def create_condition(condition: str, alarm_values: str) -> Condition:
+    return registry.create(condition, alarm_values)
@@ -0,0 +1,72 @@
+import numbers
+import typing
+
+from ..helpers.exceptions import EntryException
+
+
+class DeadbandEnums(object):
+    """Deadband modes"""
+
+    Absolute = "absolute"
+    Relative = "relative"
+
+
+class DeadbandException(EntryException):
+    pass
+
+
+def _is_real(value: typing.Any) -> bool:
+    """Python and numpy scalars, bool is not a measurement"""
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+class Deadband:
+    """
+    Client side deadband, drops the updates that moved less than the deadband since the
+    last value that went through. Relative deadbands are a fraction of that value.
+    Only scalar values are filtered, anything else always goes through.
+    """
+
+    __slots__ = ("deadband", "mode", "last_value", "skipped", "passed")
+
+    def __init__(self, deadband: float, mode: str = DeadbandEnums.Absolute) -> None:
+        if mode not in (DeadbandEnums.Absolute, DeadbandEnums.Relative):
+            raise DeadbandException(f"Invalid deadband mode '{mode}'")
+
+        if not _is_real(deadband) or deadband < 0:
+            raise DeadbandException(f"Invalid deadband '{deadband}'")
+
+        self.deadband: float = deadband
+        self.mode = mode
+        self.last_value: typing.Optional[float] = None
+
+        self.skipped = 0
+        self.passed = 0
+
+    def accept(self, value: typing.Any) -> bool:
+        if not _is_real(value):
+            return True
+
+        if self.last_value is not None:
+            limit = (
+                self.deadband
+                if self.mode == DeadbandEnums.Absolute
+                else self.deadband * abs(self.last_value)
+            )
+            if abs(value - self.last_value) < limit:
+                self.skipped += 1
+                return False
+
+        self.last_value = value
+        self.passed += 1
+        return True
+
+    def __str__(self):
+        return f"Deadband({self.deadband},{self.mode})"
+
+
+def create_deadband(deadband: float, mode: str) -> typing.Optional[Deadband]:
+    """No deadband is used when it is zero"""
+    if not deadband:
+        return None
+    return Deadband(deadband=deadband, mode=mode.lower().strip())
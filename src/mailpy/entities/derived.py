@@ -0,0 +1,81 @@
+import re
+import threading
+import typing
+
+from .condition import ConditionException
+from .expression import compile_expression
+
+if typing.TYPE_CHECKING:
+    from .entry import ValueChangedInfo
+
+# Input PVs are referenced as {PV:NAME} within the formula
+_INPUT_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+DERIVED_HOST = "derived"
+
+
+def parse_formula(formula: str) -> typing.Tuple[str, typing.List[str]]:
+    """Replace the {PV} references by identifiers, returns the expression and the input PVs"""
+    inputs: typing.List[str] = []
+
+    def replace(match: typing.Match) -> str:
+        pvname = match.group(1).strip()
+        if pvname not in inputs:
+            inputs.append(pvname)
+        return f"in{inputs.index(pvname)}"
+
+    text = _INPUT_PATTERN.sub(replace, formula)
+    if not inputs:
+        raise ConditionException(
+            f"Invalid formula '{formula}', no input PV referenced as {{PV}}"
+        )
+    return text, inputs
+
+
+class DerivedValue:
+    """
+    Latest value of every input of a derived entry. Each input update recomputes the
+    compiled formula with the cached values of the other inputs.
+    """
+
+    __slots__ = ("formula", "inputs", "_function", "_index", "_latest", "_lock")
+
+    def __init__(self, formula: str) -> None:
+        self.formula = formula
+        text, self.inputs = parse_formula(formula)
+        self._function, _names = compile_expression(
+            text, variables=[f"in{i}" for i in range(len(self.inputs))]
+        )
+        self._index = {pvname: i for i, pvname in enumerate(self.inputs)}
+        self._latest: typing.List[typing.Optional["ValueChangedInfo"]] = [None] * len(
+            self.inputs
+        )
+        self._lock = threading.Lock()
+
+    def update(
+        self, data: "ValueChangedInfo"
+    ) -> typing.Optional[typing.Tuple[typing.Any, int, int]]:
+        """Returns (value, severity, status) once every input has a value"""
+        with self._lock:
+            self._latest[self._index[data.pvname]] = data
+            cached = list(self._latest)
+
+        latest: typing.List["ValueChangedInfo"] = []
+        for d in cached:
+            if d is None or d.value is None:
+                return None
+            latest.append(d)
+
+        try:
+            value = self._function(*(d.value for d in latest))
+        except (ArithmeticError, TypeError) as e:
+            raise ConditionException(
+                f"Failed to evaluate formula '{self.formula}'. {e}"
+            ) from e
+
+        # The derived PV is as bad as its worst input
+        return (
+            value,
+            max(d.severity or 0 for d in latest),
+            max(d.status or 0 for d in latest),
+        )
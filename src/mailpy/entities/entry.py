@@ -1,16 +1,45 @@
 import queue
+import sys
 import threading
 import time
 import typing
 
 import mailpy.logging as logging
-
-from .condition import Condition, create_condition
-from .event import AlarmEvent, create_alarm_event
+from mailpy.scheduler import DeadlineScheduler, ScheduledCall
+
+from .condition import (
+    Condition,
+    ConditionCheckResponse,
+    ConditionException,
+    MonitorMask,
+    create_condition,
+)
+from .deadband import Deadband, DeadbandEnums, create_deadband
+from .derived import DERIVED_HOST, DerivedValue
+from .event import AlarmEvent, EventType, create_alarm_event
 from .group import Group
 
+if typing.TYPE_CHECKING:
+    from mailpy.batch import BatchEvaluator
+
 logger = logging.getLogger()
 
+# Lower bound for the cooldown re-evaluation, avoids busy looping entries without email_timeout
+MIN_REEVALUATION_DELAY = 1.0
+
+# Entries pick their dispatch lock from this pool instead of owning one, a lock is only
+# held while an event is dispatched so the stripes see little contention
+DISPATCH_LOCK_STRIPES = 64
+_dispatch_locks = tuple(threading.RLock() for _ in range(DISPATCH_LOCK_STRIPES))
+
+
+class AlarmState(object):
+    """Alarm state of the entries with stateless conditions"""
+
+    Ok = "ok"
+    Alarm = "alarm"
+    Cleared = "cleared"
+
 
 class ConnectionChangedInfo(typing.NamedTuple):
     pvname: str
@@ -45,6 +74,8 @@ class ValueChangedInfo(typing.NamedTuple):
     status: int
     host: str
     severity: int
+    # Source timestamp in seconds since the epoch, when known
+    timestamp: typing.Optional[float] = None
 
 
 class EntryData(typing.NamedTuple):
@@ -58,38 +89,125 @@ class EntryData(typing.NamedTuple):
     subject: str
     email_timeout: float
     group: str
+    deadband: float = 0.0
+    deadband_mode: str = DeadbandEnums.Absolute
+    # Threshold alarms stay latched until the value is this far inside the limits
+    hysteresis: float = 0.0
+    # Send an event when the alarm is cleared
+    notify_normal: bool = False
+    # Only alarm once the condition has held for this many seconds
+    duration: float = 0.0
+    # Derived entries compute their value from other PVs, e.g. "{PV:SUPPLY} - {PV:RETURN}",
+    # pvname is then only the name reported in the events
+    formula: str = ""
 
 
 class Entry:
+    __slots__ = (
+        "_batch",
+        "_batch_slot",
+        "_condition",
+        "_connection_callback_id",
+        "_cooldown_call",
+        "_id",
+        "_last_data",
+        "_pvname",
+        "_scheduler",
+        "_sms_queue_dispatch_lock",
+        "_value_callback_id",
+        "_violation_call",
+        "_violation_event",
+        "_violation_since",
+        "deadband",
+        "derived",
+        "duration",
+        "email_timeout",
+        "emails",
+        "event_queue",
+        "group",
+        "hysteresis",
+        "last_event_time",
+        "notify_normal",
+        "state",
+        "subject",
+        "unit",
+        "warning_message",
+    )
+
     def __init__(
         self,
         group: Group,
         entry_data: EntryData,
         event_queue: queue.Queue,
+        scheduler: typing.Optional[DeadlineScheduler] = None,
     ):
         self._value_callback_id: typing.Optional[int] = None
         self._connection_callback_id: typing.Optional[int] = None
 
         self._id = entry_data.id
-        self._pvname = entry_data.pvname
+        # Loaded documents hold their own copy of every string, most are repeated
+        self._pvname = sys.intern(entry_data.pvname)
 
         self._condition: Condition = create_condition(
             condition=entry_data.condition.lower().strip(),
             alarm_values=entry_data.alarm_values,
         )
 
-        self._sms_queue_dispatch_lock = threading.RLock()
+        self.deadband: typing.Optional[Deadband] = create_deadband(
+            deadband=entry_data.deadband, mode=entry_data.deadband_mode
+        )
+
+        self.hysteresis: float = entry_data.hysteresis
+        if self.hysteresis < 0 or (
+            self.hysteresis and self._condition.threshold_range is None
+        ):
+            raise ConditionException(
+                f"Invalid hysteresis '{self.hysteresis}' for condition '{self._condition.name}', only threshold conditions support it"
+            )
+        self.notify_normal = entry_data.notify_normal
+        self.state = AlarmState.Ok
+
+        self.duration: float = entry_data.duration
+        if self.duration < 0:
+            raise ConditionException(f"Invalid duration '{self.duration}'")
+        if self.duration and self._condition.edge_triggered:
+            raise ConditionException(
+                f"Condition '{self._condition.name}' only reports level transitions, it does not support a duration"
+            )
+        # Start of the violation being qualified and the call firing at its deadline
+        self._violation_since: typing.Optional[float] = None
+        self._violation_call: typing.Optional[ScheduledCall] = None
+        self._violation_event: typing.Optional[AlarmEvent] = None
+
+        self.derived: typing.Optional[DerivedValue] = (
+            DerivedValue(entry_data.formula) if entry_data.formula else None
+        )
+
+        self._sms_queue_dispatch_lock = _dispatch_locks[
+            hash(self._id) % DISPATCH_LOCK_STRIPES
+        ]
+
+        # Latest value received, re-evaluated when the email_timeout expires
+        self._last_data: typing.Optional[ValueChangedInfo] = None
+        self._scheduler = scheduler
+        self._cooldown_call: typing.Optional[ScheduledCall] = None
+
+        # Set when the threshold is evaluated along with other entries, see mailpy.batch
+        self._batch: typing.Optional["BatchEvaluator"] = None
+        self._batch_slot = -1
 
         self.email_timeout = entry_data.email_timeout
-        self.emails = entry_data.emails
+        self.emails = [sys.intern(email) for email in entry_data.emails]
         self.group = group
         self.event_queue = event_queue
-        self.subject = entry_data.subject
-        self.unit = entry_data.unit
-        self.warning_message = entry_data.warning_message
+        self.subject = sys.intern(entry_data.subject)
+        self.unit = sys.intern(entry_data.unit)
+        self.warning_message = sys.intern(entry_data.warning_message)
 
-        # reset last_event_time for all PVs, so it start monitoring right away
-        self.last_event_time = time.time() - self.email_timeout
+        # reset last_event_time for all PVs, so it start monitoring right away.
+        # Taken from the scheduler clock (monotonic by default), wall clock steps must
+        # neither extend nor skip the email_timeout
+        self.last_event_time = self._now() - self.email_timeout
 
     @property
     def pvname(self):
@@ -107,11 +225,51 @@ class Entry:
     def id(self):
         return self._id
 
-    def handle_condition(self, value) -> typing.Optional[AlarmEvent]:
+    @property
+    def monitor_mask(self) -> int:
+        """Channel Access events required by this entry"""
+        if self.derived:
+            # The formula needs every value change of the inputs
+            return MonitorMask.Default
+
+        mask = self._condition.monitor_mask
+        if self.deadband and mask & MonitorMask.Value:
+            # Let the IOC apply its archive deadband (ADEL) as well
+            mask = (mask & ~MonitorMask.Value) | MonitorMask.Log
+        return mask
+
+    @property
+    def inputs(self) -> typing.List[str]:
+        """PVs this entry is evaluated from"""
+        return self.derived.inputs if self.derived else [self.pvname]
+
+    @property
+    def threshold_range(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return self._condition.threshold_range
+
+    def attach_batch(self, batch: typing.Optional["BatchEvaluator"], slot: int = -1):
+        self._batch = batch
+        self._batch_slot = slot
+
+    @property
+    def deadband_skipped(self) -> int:
+        """Number of condition evaluations saved by the deadband"""
+        return self.deadband.skipped if self.deadband else 0
+
+    def handle_condition(
+        self,
+        data: ValueChangedInfo,
+        cond_res: typing.Optional[ConditionCheckResponse] = None,
+        now: typing.Optional[float] = None,
+    ) -> typing.Optional[AlarmEvent]:
         """
         Handle the alarm condition and return an post a request to the SMS queue.
+        :param cond_res: violation already found for data, the condition is not evaluated again.
+        :param now: entry clock reading of this update, stored in the event timestamp.
         """
-        cond_res = self._condition.check_alarm(value)
+        value = data.value
+        if cond_res is None:
+            cond_res = self._condition.evaluate(data)
         if not cond_res:
             return None
 
@@ -123,13 +281,18 @@ class Entry:
             subject=self.subject,
             emails=self.emails,
             condition=self.condition,
-            value_measured=value,
+            # Array conditions report their worst element
+            value_measured=cond_res.extras.get("worst_value", value),
+            extras=cond_res.extras,
+            monotonic=now,
         )
 
-    def is_timeout_active(self):
-        timestamp = time.time()
-        timedelta = timestamp - self.last_event_time
-        return timedelta < self.email_timeout
+    def is_timeout_active(self, now: typing.Optional[float] = None):
+        # No lock, last_event_time is a float replaced by a single store under the
+        # dispatch lock, a stale read only delays the event to the cooldown expiry
+        if now is None:
+            now = self._now()
+        return now - self.last_event_time < self.email_timeout
 
     def handle_connection_change(self, data: ConnectionChangedInfo):
         if self.pvname != data.pvname:
@@ -146,35 +309,186 @@ class Entry:
 
         # @todo: Consider dispatching an alarm to the queue
 
+    def handle_input_change(self, data: ValueChangedInfo):
+        """An input of a derived entry changed, recompute the derived value from the cached inputs"""
+        if self.derived is None:
+            logger.warning(f"{self} is not derived, ignoring input {data.pvname}")
+            return
+
+        result = self.derived.update(data)
+        if result is None:
+            return
+
+        value, severity, status = result
+        self.handle_value_change(
+            ValueChangedInfo(
+                pvname=self.pvname,
+                value=value,
+                status=status,
+                host=DERIVED_HOST,
+                severity=severity,
+                timestamp=data.timestamp,
+            )
+        )
+
     def handle_value_change(self, data: ValueChangedInfo):
         """
         Define if an alarm check should be performed. Disconnected PVs will are not checked.
         Trigger this function as a callback and within a timer due to the sms timeout. e.g.: Callback may be ignored.
         :return bool: Perform or not the alarm check.
         """
-        if not self.group.enabled:
-            logger.debug(f"Ignoring {self} due to disabled group")
+        self._last_data = data
+
+        if self.deadband and not self.deadband.accept(data.value):
             return
 
-        if self.is_timeout_active():
-            logger.info(f"Ignoring event from {self}, timeout still active.")
+        # Window conditions need every sample, evaluated or not, see Condition.observe
+        self._condition.observe(data)
+
+        if (
+            self._batch is not None
+            and self.state != AlarmState.Alarm
+            and self._violation_since is None
+            and (type(data.value) == int or type(data.value) == float)
+        ):
+            # Compared with the other batched thresholds on the next flush
+            self._batch.update(self._batch_slot, data)
             return
 
-        if data.value is None:
+        self._evaluate_value_change(data)
+
+    def handle_batch_violation(self, data: ValueChangedInfo):
+        """The batch flush found the value out of the threshold, gating and event creation stay here"""
+        self._evaluate_value_change(data)
+
+    def _evaluate_value_change(self, data: ValueChangedInfo):
+        # Called on every update, the messages are only formatted when debug is enabled
+        if not self.group.enabled:
+            logger.debug("Ignoring %s due to disabled group", self)
             return
 
-        event = self.handle_condition(data.value)
-        if not event:
+        # Read once, the cooldown, the duration and the event share it
+        now = self._now()
+        cond_res = None
+        if self.state == AlarmState.Alarm and data.value is not None:
+            if self.hysteresis:
+                if self._condition.is_cleared(data, self.hysteresis):
+                    self._handle_alarm_cleared(data)
+                # Latched until the value goes back inside the hysteresis band
+                return
+
+            # Over once the condition no longer holds, a violation is reused for the event
+            cond_res = self._condition.evaluate(data)
+            if cond_res is None:
+                self._handle_alarm_cleared(data)
+                return
+
+        if self.is_timeout_active(now):
+            logger.debug("Ignoring event from %s, timeout still active.", self)
             return
 
-        if data.pvname != self.pvname:
+        if data.value is None:
+            return
+
+        event = self.handle_condition(data, cond_res, now)
+        if event and data.pvname != self.pvname:
             raise ValueError(
                 f"Cannot complete eveent handling, received valud changed event PV ({data}) differs from entry PV ({self})"
             )
 
-        self.dispatch_alarm_event(event)
+        if self.duration:
+            event = self._qualify_duration(event)
+        if not event:
+            return
+
+        self._raise_alarm(event)
+
+    def _raise_alarm(self, event: AlarmEvent, now: typing.Optional[float] = None):
+        self.dispatch_alarm_event(event, now)
+        if not self._condition.stateful:
+            self.state = AlarmState.Alarm
+
+    def _now(self) -> float:
+        return (
+            self._scheduler.now() if self._scheduler is not None else time.monotonic()
+        )
+
+    def _qualify_duration(
+        self, event: typing.Optional[AlarmEvent]
+    ) -> typing.Optional[AlarmEvent]:
+        """Hold the violation until it persists for duration seconds, returns the event once it did"""
+        with self._sms_queue_dispatch_lock:
+            if event is None:
+                self._cancel_violation()
+                return None
+
+            now = event.ts.monotonic
+            self._violation_event = event
+            if self._violation_since is None:
+                self._violation_since = now
+                if self._scheduler is not None:
+                    self._violation_call = self._scheduler.call_later(
+                        self.duration, self._handle_violation_deadline
+                    )
+
+            if now - self._violation_since < self.duration:
+                return None
+
+            self._cancel_violation()
+            return event
+
+    def _cancel_violation(self):
+        if self._violation_call is not None:
+            self._violation_call.cancel()
+        self._violation_call = None
+        self._violation_since = None
+        self._violation_event = None
+
+    def _handle_violation_deadline(self):
+        """The violation was still active when its duration elapsed"""
+        with self._sms_queue_dispatch_lock:
+            self._violation_call = None
+            event = self._violation_event
+            if event is None:
+                return
+
+            now = self._now()
+            if not self.group.enabled or self.is_timeout_active(now):
+                self._cancel_violation()
+                return
+
+            self._cancel_violation()
+            # Raised at the deadline, not when the violation was captured
+            self._raise_alarm(event, now)
+
+    def _handle_alarm_cleared(self, data: ValueChangedInfo):
+        self.state = AlarmState.Cleared
+        logger.info(f"{self} returned to normal, value {data.value}")
+        if not self.notify_normal:
+            return
+
+        event = create_alarm_event(
+            pvname=self.pvname,
+            specified_value_message=f"{self.condition} {self.alarm_values}",
+            unit=self.unit,
+            warning=f"Returned to normal: {self.warning_message}",
+            subject=f"[Normal] {self.subject}",
+            emails=self.emails,
+            condition=self.condition,
+            value_measured=data.value,
+            event_type=EventType.NORMAL,
+        )
+        try:
+            self.event_queue.put(event, block=False, timeout=None)
+        except queue.Full:
+            logger.exception(
+                f"Failed to put entry in queue {self} {event}. Queue is full, something wrong is happening..."
+            )
 
-    def dispatch_alarm_event(self, event: AlarmEvent):
+    def dispatch_alarm_event(
+        self, event: AlarmEvent, now: typing.Optional[float] = None
+    ):
+        """:param now: entry clock reading of the dispatch, the event capture time when None"""
         if not event:
             logger.error(f"Cannot dispatch empty event {event} from entry {self}")
             return
@@ -183,12 +497,49 @@ class Entry:
             with self._sms_queue_dispatch_lock:  # Lock used to maintain the last_event_time in sync with the queue
                 logger.info(f"New event '{event}' being dispatched from {self}")
                 self.event_queue.put(event, block=False, timeout=None)
-                self.last_event_time = time.time()
+                self.last_event_time = event.ts.monotonic if now is None else now
+                self._schedule_cooldown_expiry()
 
         except queue.Full:
             logger.exception(
                 f"Failed to put entry in queue {self} {event}. Queue is full, something wrong is happening..."
             )
 
+    def _schedule_cooldown_expiry(self, delay: typing.Optional[float] = None):
+        """Ask the scheduler to re-evaluate the latest value once the email_timeout expires"""
+        if self._scheduler is None:
+            return
+
+        if self._cooldown_call is not None:
+            self._cooldown_call.cancel()
+
+        if delay is None:
+            delay = self.email_timeout
+        self._cooldown_call = self._scheduler.call_later(
+            max(delay, MIN_REEVALUATION_DELAY), self._handle_cooldown_expired
+        )
+
+    def _handle_cooldown_expired(self):
+        self._cooldown_call = None
+
+        if self.is_timeout_active():
+            # Dispatched again since the expiry was scheduled, wait for the remaining time
+            self._schedule_cooldown_expiry(
+                delay=self.email_timeout - (self._now() - self.last_event_time)
+            )
+            return
+
+        data = self._last_data
+        if data is None:
+            return
+
+        if not self.group.enabled:
+            # No new value may come once the group is enabled again, keep checking
+            self._schedule_cooldown_expiry()
+            return
+
+        logger.debug(f"Cooldown expired for {self}, re-evaluating {data}")
+        self._evaluate_value_change(data)
+
     def __str__(self):
         return f'Entry({self.id},"{self.pvname}","{self.condition}",{self.group.name},"{self.alarm_values}",{self.emails}>'
@@ -8,18 +8,47 @@ from .timestamp import Timestamp
 @enum.unique
 class EventType(int, enum.Enum):
     ALARM = 0
+    # The entry returned to normal after an alarm
+    NORMAL = 1
 
 
 @dataclasses.dataclass(frozen=True)
 class Event:
+    # Slots are declared by hand, dataclass(slots=True) requires Python 3.10
+    __slots__ = ("type", "ts")
+
     type: EventType
     ts: Timestamp
 
+    def to_dict(self) -> dict:
+        """Shallow mapping of the fields, slotted events have no __dict__"""
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
+    def __getstate__(self):
+        return [getattr(self, f.name) for f in dataclasses.fields(self)]
+
+    def __setstate__(self, state):
+        # Events are sent pickled by the monitor processes, the frozen __setattr__ would raise
+        for f, value in zip(dataclasses.fields(self), state):
+            object.__setattr__(self, f.name, value)
+
 
 @dataclasses.dataclass(frozen=True)
 class AlarmEvent(Event):
     """Email event sent by entry to the SMS queue to signal alarms"""
 
+    __slots__ = (
+        "pvname",
+        "specified_value_message",
+        "unit",
+        "subject",
+        "emails",
+        "warning",
+        "condition",
+        "value_measured",
+        "extras",
+    )
+
     pvname: str
     specified_value_message: str
     unit: str
@@ -28,6 +57,9 @@ class AlarmEvent(Event):
     warning: str
     condition: str
     value_measured: str
+    # Condition details, e.g. the violated indices of an array PV. No default, a class
+    # level default would conflict with the slot
+    extras: dict
 
 
 def _value_to_string(value):
@@ -52,10 +84,13 @@ def create_alarm_event(
     emails: typing.List[str],
     condition: str,
     value_measured: typing.Any,
+    extras: typing.Optional[dict] = None,
+    event_type: EventType = EventType.ALARM,
+    monotonic: typing.Optional[float] = None,
 ) -> AlarmEvent:
 
     return AlarmEvent(
-        type=EventType.ALARM,
+        type=event_type,
         pvname=pvname,
         specified_value_message=specified_value_message,
         unit=unit,
@@ -64,5 +99,6 @@ def create_alarm_event(
         emails=_check_emails(emails),
         condition=condition,
         value_measured=_value_to_string(value_measured),
-        ts=Timestamp(),
+        extras=extras if extras else {},
+        ts=Timestamp(monotonic=monotonic),
     )
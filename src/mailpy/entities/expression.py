@@ -0,0 +1,191 @@
+import ast
+import typing
+
+from .condition import (
+    AlarmSeverity,
+    Condition,
+    ConditionCheckResponse,
+    ConditionEnums,
+    ConditionException,
+    MonitorMask,
+    register_condition,
+)
+
+if typing.TYPE_CHECKING:
+    from .entry import ValueChangedInfo
+
+# Variables bound to every PV update, in the order of the compiled function arguments
+EXPRESSION_VARIABLES = ("value", "severity", "status")
+
+EXPRESSION_CONSTANTS = {
+    "NO_ALARM": AlarmSeverity.NoAlarm,
+    "MINOR": AlarmSeverity.Minor,
+    "MAJOR": AlarmSeverity.Major,
+    "INVALID": AlarmSeverity.Invalid,
+}
+
+EXPRESSION_FUNCTIONS = {"abs": abs, "min": min, "max": max}
+
+# Exponentiation is left out on purpose, 9 ** 9 ** 9 would stall the evaluation
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.USub,
+    ast.UAdd,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Mod,
+    ast.Compare,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.Eq,
+    ast.NotEq,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+)
+
+
+def _validate(
+    tree: ast.AST, text: str, variables: typing.Sequence[str]
+) -> typing.Set[str]:
+    """Reject anything that is not plain arithmetic or logic, returns the names used"""
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ConditionException(
+                f"Invalid expression '{text}', {type(node).__name__} is not supported"
+            )
+
+        if isinstance(node, ast.Constant) and type(node.value) not in (
+            int,
+            float,
+            bool,
+        ):
+            raise ConditionException(
+                f"Invalid expression '{text}', constant {node.value!r} is not a number"
+            )
+
+        if isinstance(node, ast.Call):
+            if (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in EXPRESSION_FUNCTIONS
+                or node.keywords
+            ):
+                raise ConditionException(
+                    f"Invalid expression '{text}', only {sorted(EXPRESSION_FUNCTIONS)} can be called"
+                )
+
+        if isinstance(node, ast.Name):
+            if (
+                node.id not in variables
+                and node.id not in EXPRESSION_CONSTANTS
+                and node.id not in EXPRESSION_FUNCTIONS
+            ):
+                raise ConditionException(
+                    f"Invalid expression '{text}', unknown name '{node.id}'"
+                )
+            names.add(node.id)
+    return names
+
+
+def compile_expression(
+    text: str, variables: typing.Sequence[str] = EXPRESSION_VARIABLES
+) -> typing.Tuple[typing.Callable, typing.Set[str]]:
+    """
+    Parse and validate the expression once and compile it into a plain function taking
+    the variables as positional arguments, so the hot path is a single Python call.
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ConditionException(f"Invalid expression '{text}', {e.msg}") from e
+
+    names = _validate(tree, text, variables)
+
+    function = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=name) for name in variables],
+                vararg=None,
+                kwonlyargs=[],
+                kw_defaults=[],
+                kwarg=None,
+                defaults=[],
+            ),
+            body=tree.body,
+        )
+    )
+    ast.fix_missing_locations(function)
+    namespace: typing.Dict[str, typing.Any] = {
+        "__builtins__": {},
+        **EXPRESSION_CONSTANTS,
+        **EXPRESSION_FUNCTIONS,
+    }
+    return eval(compile(function, "<expression>", "eval"), namespace), names
+
+
+@register_condition(ConditionEnums.Expression)
+class ConditionExpression(Condition):
+    """
+    Alarm while a restricted arithmetic/boolean expression of value, severity and status
+    is true, e.g. 'value < 3 or value > 7.5 and severity >= MAJOR'.
+    """
+
+    __slots__ = ("_function", "monitor_mask")
+
+    def __init__(self, limits: str) -> None:
+        super().__init__(limits)
+        if not limits or type(limits) != str:
+            raise ConditionException(f"Cannot create condition with limits '{limits}'")
+
+        self._function, names = compile_expression(limits)
+        # Expressions on the severity alone only need the alarm events
+        self.monitor_mask = (
+            MonitorMask.Default if "value" in names else MonitorMask.Alarm
+        )
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.Expression
+
+    def _check(
+        self, value: typing.Any, severity: int, status: int
+    ) -> typing.Optional[ConditionCheckResponse]:
+        if type(value) != int and type(value) != float:
+            raise ConditionException(
+                f"Condition {self} requires a numeric input, received {type(value)}"
+            )
+
+        try:
+            result = self._function(value, severity, status)
+        except (ArithmeticError, TypeError) as e:
+            raise ConditionException(
+                f"Failed to evaluate expression '{self.alarm_values}' for value {value}. {e}"
+            ) from e
+
+        if result:
+            return ConditionCheckResponse(
+                message=f"expression '{self.alarm_values}' required to be false"
+            )
+        return None
+
+    def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
+        """Without the PV update the severity and status are taken as NO_ALARM"""
+        return self._check(value, AlarmSeverity.NoAlarm, 0)
+
+    def evaluate(
+        self, data: "ValueChangedInfo"
+    ) -> typing.Optional[ConditionCheckResponse]:
+        return self._check(data.value, data.severity, data.status)
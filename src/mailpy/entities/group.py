@@ -9,14 +9,34 @@ class GroupData(typing.NamedTuple):
     description: str
 
 
+class GroupState(typing.NamedTuple):
+    """Immutable snapshot of the mutable group fields"""
+
+    version: int
+    enabled: bool
+    description: str
+
+
 class Group:
-    """Group of PVs"""
+    """
+    Group of PVs
+
+    The mutable fields live in an immutable GroupState that is replaced as a whole
+    (copy-on-write). Readers, the CA callbacks of every entry, only load the state
+    reference and take no lock. Writers serialize on lock and publish the new snapshot
+    with a single reference assignment, which is atomic in CPython, so a reader observes
+    either the previous or the new snapshot and never a mix of both. A reader racing a
+    writer may still act on the previous snapshot, an update being evaluated while the
+    group is disabled can dispatch once more. The version is bumped on every change for
+    callers that need to detect it.
+    """
+
+    __slots__ = ("_id", "_state", "lock", "name")
 
     def __init__(self, id: str, name: str, enabled: bool = True, description: str = ""):
-        self._enabled: bool = enabled
         self._id = id
-        self.description = description
-        self.lock = threading.RLock()
+        self._state = GroupState(version=0, enabled=enabled, description=description)
+        self.lock = threading.Lock()
         self.name: str = name
 
     @property
@@ -24,14 +44,31 @@ class Group:
         return self._id
 
     @property
-    def enabled(self):
+    def state(self) -> GroupState:
+        return self._state
+
+    def update(self, **changes) -> GroupState:
+        """Publish a new snapshot with the given fields changed"""
         with self.lock:
-            return self._enabled
+            state = self._state
+            self._state = state._replace(version=state.version + 1, **changes)
+            return self._state
+
+    @property
+    def enabled(self) -> bool:
+        return self._state.enabled
 
     @enabled.setter
     def enabled(self, value: bool):
-        with self.lock:
-            self._enabled = value
+        self.update(enabled=value)
+
+    @property
+    def description(self) -> str:
+        return self._state.description
+
+    @description.setter
+    def description(self, value: str):
+        self.update(description=value)
 
     def __str__(self):
         return f'Group(id={self._id},name="{self.name}",enabled="{self.enabled}")'
@@ -1,16 +1,45 @@
 import datetime
+import time
 import typing
 
 
 class Timestamp:
-    def __init__(self, now: typing.Optional[datetime.datetime] = None) -> None:
-        if not (now is None) and type(now) != datetime.date:
+    """
+    Wall clock time of an event. Only the epoch seconds and the monotonic clock are read
+    when it is created, the datetime and the formatted strings are built on first use
+    and cached, most events are persisted without ever being rendered.
+    """
+
+    __slots__ = ("_time", "_monotonic", "_ts", "_local_str", "_utc_str")
+
+    def __init__(
+        self,
+        now: typing.Optional[datetime.datetime] = None,
+        monotonic: typing.Optional[float] = None,
+    ) -> None:
+        """
+        :param monotonic: monotonic clock reading the caller already took for this event,
+            the clock is only read when it is None.
+        """
+        if not (now is None) and type(now) != datetime.datetime:
             raise ValueError(
                 f"Invalid input now '{now}', required type {datetime.datetime}"
             )
-        self._ts = datetime.datetime.now(datetime.timezone.utc) if now is None else now
-        self._local_str = self.format_for_readers(self._ts)
-        self._utc_str = self.format_for_archiver(self._ts)
+        self._time: float = time.time() if now is None else now.timestamp()
+        # Measures intervals between events, unaffected by wall clock steps
+        self._monotonic: float = time.monotonic() if monotonic is None else monotonic
+        self._ts: typing.Optional[datetime.datetime] = now
+        self._local_str: typing.Optional[str] = None
+        self._utc_str: typing.Optional[str] = None
+
+    def __getstate__(self):
+        # The cached strings are rebuilt on the other side if needed
+        return (self._time, self._monotonic, self._ts)
+
+    def __setstate__(self, state):
+        self._time, self._monotonic, self._ts = state
+        self._local_str = None
+        self._utc_str = None
 
     @staticmethod
     def format_for_archiver(ts: datetime.datetime):
@@ -22,15 +51,32 @@ class Timestamp:
 
     @property
     def local_str(self):
+        if self._local_str is None:
+            self._local_str = self.format_for_readers(self.ts)
         return self._local_str
 
     @property
     def utc_str(self):
+        if self._utc_str is None:
+            self._utc_str = self.format_for_archiver(self.ts)
         return self._utc_str
 
     @property
-    def ts(self):
+    def ts(self) -> datetime.datetime:
+        if self._ts is None:
+            self._ts = datetime.datetime.fromtimestamp(
+                self._time, datetime.timezone.utc
+            )
         return self._ts
 
+    @property
+    def time(self) -> float:
+        """Seconds since the epoch"""
+        return self._time
+
+    @property
+    def monotonic(self) -> float:
+        return self._monotonic
+
     def __str__(self):
         return f"Ts(utc={self.utc_str},local={self.local_str})"
@@ -0,0 +1,244 @@
+import array
+import math
+import time
+import typing
+
+from .condition import (
+    Condition,
+    ConditionCheckResponse,
+    ConditionEnums,
+    ConditionException,
+    register_condition,
+)
+
+if typing.TYPE_CHECKING:
+    from .entry import ValueChangedInfo
+
+# Upper bound of the window size, one hour of samples at 10 Hz is 36000 * 16 bytes
+MAX_WINDOW_SIZE = 36000
+
+
+class RollingWindow:
+    """
+    Preallocated ring buffer of the latest values and timestamps. The running mean and
+    sum of squared deviations are updated in O(1) per sample (sliding Welford), memory is
+    bounded by the window size. They are recomputed once per turn of the buffer so the
+    rounding errors do not pile up, which keeps the amortized cost O(1).
+    """
+
+    __slots__ = ("size", "values", "timestamps", "count", "index", "mean", "m2")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.values = array.array("d", bytes(8 * size))
+        self.timestamps = array.array("d", bytes(8 * size))
+        self.count = 0
+        # Position of the next sample, also the oldest one once the window is full
+        self.index = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values within the window"""
+        if self.count < 2:
+            return 0.0
+        return max(self.m2, 0.0) / (self.count - 1)
+
+    @property
+    def oldest(self) -> typing.Tuple[float, float]:
+        """(value, timestamp) of the oldest sample"""
+        i = self.index if self.full else 0
+        return self.values[i], self.timestamps[i]
+
+    def push(self, value: float, timestamp: float):
+        i = self.index
+        if self.full:
+            old = self.values[i]
+            mean = self.mean + (value - old) / self.size
+            self.m2 += (value - old) * (value - mean + old - self.mean)
+            self.mean = mean
+        else:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+        self.values[i] = value
+        self.timestamps[i] = timestamp
+        self.index = i + 1 if i + 1 < self.size else 0
+        if self.index == 0:
+            self._recompute()
+
+    def _recompute(self):
+        self.mean = math.fsum(self.values) / self.size
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in self.values)
+
+
+class ConditionWindow(Condition):
+    """
+    Base of the rolling window conditions, alarm_values starts with the number of samples
+    of the window followed by the condition limits, e.g. '50:0:10'.
+    The entry feeds every sample through observe, evaluate only pushes the ones it did
+    not see yet: a sample is never pushed twice, neither the same update re-evaluated
+    after the email_timeout nor a sweep of a value with the same source timestamp.
+    """
+
+    __slots__ = ("window", "limits", "_last_sample", "_last_timestamp")
+
+    stateful = True
+
+    # Number of limits following the window size
+    limits_count = 1
+
+    def __init__(self, limits: str) -> None:
+        super().__init__(limits)
+        if not limits or type(limits) != str:
+            raise ConditionException(f"Cannot create condition with limits '{limits}'")
+
+        fields = limits.split(":")
+        if len(fields) != self.limits_count + 1:
+            raise ConditionException(
+                f"Cannot create condition with limits '{limits}', expected the window size and {self.limits_count} limits"
+            )
+        try:
+            size = int(fields[0])
+            self.limits: typing.List[float] = [float(v) for v in fields[1:]]
+        except ValueError as e:
+            raise ConditionException(
+                f"Cannot create condition, only numeric values are supported. {e}"
+            ) from e
+
+        if not 2 <= size <= MAX_WINDOW_SIZE:
+            raise ConditionException(
+                f"Cannot create condition, window size {size} must be between 2 and {MAX_WINDOW_SIZE}"
+            )
+        self.window = RollingWindow(size)
+        self._last_sample: typing.Optional["ValueChangedInfo"] = None
+        self._last_timestamp: typing.Optional[float] = None
+
+    def check_window(self) -> typing.Optional[ConditionCheckResponse]:
+        raise NotImplementedError("Child class must impplement this method")
+
+    def _push(self, value: typing.Any, timestamp: typing.Optional[float]):
+        if type(value) != int and type(value) != float:
+            raise ConditionException(
+                f"Condition {self} requires a numeric input, received {type(value)}"
+            )
+        self.window.push(value, time.time() if timestamp is None else timestamp)
+
+    def check_alarm(self, value: typing.Any) -> typing.Optional[ConditionCheckResponse]:
+        """Samples without a source timestamp are taken at the time they are received"""
+        self._push(value, None)
+        return self.check_window()
+
+    def observe(self, data: "ValueChangedInfo"):
+        """Samples not newer than the last one pushed are ignored"""
+        if data is self._last_sample or (
+            data.timestamp is not None
+            and self._last_timestamp is not None
+            and data.timestamp <= self._last_timestamp
+        ):
+            return
+        if data.value is None:
+            return
+
+        self._push(data.value, data.timestamp)
+        self._last_sample = data
+        if data.timestamp is not None:
+            self._last_timestamp = data.timestamp
+
+    def evaluate(
+        self, data: "ValueChangedInfo"
+    ) -> typing.Optional[ConditionCheckResponse]:
+        self.observe(data)
+        return self.check_window()
+
+
+@register_condition(ConditionEnums.MovingAverage)
+class ConditionMovingAverage(ConditionWindow):
+    """Average of the window must remain within 'window:min:max'"""
+
+    __slots__ = ()
+
+    limits_count = 2
+
+    def __init__(self, limits: str) -> None:
+        super().__init__(limits)
+        if self.limits[0] >= self.limits[1]:
+            raise ConditionException(
+                f"Cannot create condition with limits '{limits}', condition '{self.limits[0]}<{self.limits[1]}' must be valid"
+            )
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.MovingAverage
+
+    def check_window(self) -> typing.Optional[ConditionCheckResponse]:
+        if not self.window.full:
+            return None
+
+        mean = self.window.mean
+        if mean < self.limits[0] or mean > self.limits[1]:
+            return ConditionCheckResponse(
+                message=f"average of {self.window.size} samples from {self.limits[0]} to {self.limits[1]}, average {mean:.4}",
+                extras={"average": mean},
+            )
+        return None
+
+
+@register_condition(ConditionEnums.RateOfChange)
+class ConditionRateOfChange(ConditionWindow):
+    """Change per second across the window must remain lower than 'window:max_rate'"""
+
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.RateOfChange
+
+    def check_window(self) -> typing.Optional[ConditionCheckResponse]:
+        if self.window.count < 2:
+            return None
+
+        last = self.window.index - 1
+        value, timestamp = self.window.values[last], self.window.timestamps[last]
+        old_value, old_timestamp = self.window.oldest
+        elapsed = timestamp - old_timestamp
+        if elapsed <= 0:
+            return None
+
+        rate = (value - old_value) / elapsed
+        if abs(rate) > self.limits[0]:
+            return ConditionCheckResponse(
+                message=f"rate of change required to be lower than {self.limits[0]}/s, measured {rate:.4}/s over {elapsed:.4}s",
+                extras={"rate": rate},
+            )
+        return None
+
+
+@register_condition(ConditionEnums.RollingStd)
+class ConditionRollingStd(ConditionWindow):
+    """Standard deviation of the window must remain lower than 'window:max_std'"""
+
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return ConditionEnums.RollingStd
+
+    def check_window(self) -> typing.Optional[ConditionCheckResponse]:
+        if not self.window.full:
+            return None
+
+        std = math.sqrt(self.window.variance)
+        if std > self.limits[0]:
+            return ConditionCheckResponse(
+                message=f"standard deviation of {self.window.size} samples required to be lower than {self.limits[0]}, measured {std:.4}",
+                extras={"stddev": std},
+            )
+        return None
@@ -0,0 +1,60 @@
+import asyncio
+import concurrent.futures
+
+import mailpy.entities as entities
+import mailpy.logging as logging
+
+from .client import MailClientArgs
+from .pool import (
+    SESSION_MAX_IDLE,
+    SESSION_MAX_MESSAGES,
+    SMTPConnectionPool,
+    SMTPPoolStats,
+)
+
+logger = logging.getLogger()
+
+
+class AsyncMailClient:
+    """
+    Awaitable front of SMTPConnectionPool for the asyncio runtime. smtplib negotiates the
+    EHLO extensions, STARTTLS and the AUTH mechanism, the emails are sent over the pooled
+    sessions by at most concurrency executor threads and the loop never blocks on SMTP.
+    """
+
+    def __init__(
+        self,
+        args: MailClientArgs,
+        concurrency: int = 1,
+        max_messages: int = SESSION_MAX_MESSAGES,
+        max_idle: float = SESSION_MAX_IDLE,
+        encryption: bool = True,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"Invalid SMTP concurrency {concurrency}")
+
+        # One session per executor thread at most
+        self._pool = SMTPConnectionPool(
+            args=args,
+            size=concurrency,
+            max_messages=max_messages,
+            max_idle=max_idle,
+            encryption=encryption,
+        )
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="SMTP"
+        )
+
+    @property
+    def stats(self) -> SMTPPoolStats:
+        return self._pool.stats
+
+    async def send_email(self, event: entities.AlarmEvent):
+        """Raises the smtplib exceptions of the failed email"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._pool.send_email, event)
+
+    def close(self):
+        """Wait for the emails being sent and close the sessions"""
+        self._executor.shutdown(wait=True)
+        self._pool.close()
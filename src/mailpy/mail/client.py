@@ -3,13 +3,12 @@ import dataclasses
 import smtplib
 import typing
 from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 
 import mailpy.entities as entities
 import mailpy.logging as logging
 
 from ..utils import check_required_fields
-from .message import compose_msg_content
+from .message import compose_msg
 
 logger = logging.getLogger()
 
@@ -39,6 +38,11 @@ class MailClientArgs:
 
 
 class MailClient:
+    """
+    Holds a single SMTP session. encryption=False talks plain SMTP and is only meant for
+    local stand-in servers.
+    """
+
     REQUIRED_FIELDS = [
         "_login",
         "_passwd",
@@ -50,6 +54,7 @@ class MailClient:
         self,
         args: MailClientArgs,
         debug_level: int = 1,
+        encryption: bool = True,
     ):
 
         self._login: str = args.login
@@ -60,6 +65,7 @@ class MailClient:
 
         self._server: typing.Optional[smtplib.SMTP] = None
         self._debug_level = debug_level
+        self._encryption = encryption
 
         check_required_fields(self, self.REQUIRED_FIELDS)
 
@@ -81,14 +87,36 @@ class MailClient:
             raise ValueError(f"CNPEM requires tls and port {Settings.CNPEM_TLS_PORT}")
 
     def __enter__(self):
-        self._authenticate()
+        self.connect()
         return self
 
     def __exit__(self, *args, **kwargs):
+        self.disconnect()
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def connect(self):
+        self._authenticate()
+
+    def disconnect(self):
         self._disconnect()
 
+    def noop(self) -> bool:
+        """Keeps the session alive, False once the server dropped it"""
+        if not self._server:
+            return False
+        try:
+            code, _ = self._server.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    # Without a host the constructors do not connect, the session is only opened once
+    # by connect with the configured port
     def _create_server_tls(self):
-        self._server = smtplib.SMTP(self._host, timeout=10)
+        self._server = smtplib.SMTP(timeout=10)
         response = self._server.connect(host=self._host, port=self._port)
         self._server.ehlo()
         self._server.starttls()
@@ -96,14 +124,20 @@ class MailClient:
         return response
 
     def _create_server_ssl(self):
-        self._server = smtplib.SMTP_SSL(self._host)
+        self._server = smtplib.SMTP_SSL(timeout=10)
+        return self._server.connect(host=self._host, port=self._port)
+
+    def _create_server_plain(self):
+        self._server = smtplib.SMTP(timeout=10)
         return self._server.connect(host=self._host, port=self._port)
 
     def _create_server(self):
-        if self._tls:
-            (code, msg) = self._create_server_tls()
+        if not self._encryption:
+            code, msg = self._create_server_plain()
+        elif self._tls:
+            code, msg = self._create_server_tls()
         else:
-            (code, msg) = self._create_server_ssl()
+            code, msg = self._create_server_ssl()
 
         self._server.set_debuglevel(self._debug_level)
         logger.info(f"SMTP server connected with code {code} {msg}")
@@ -112,9 +146,14 @@ class MailClient:
         if not self._server:
             return
 
-        self._server.quit()
-        self._server.close()
-        self._server = None
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError) as e:
+            # The server may have dropped an idle session already
+            logger.debug("SMTP session closed without QUIT: %s", e)
+        finally:
+            self._server.close()
+            self._server = None
 
     def _authenticate(self):
         self._create_server()
@@ -127,24 +166,7 @@ class MailClient:
         logger.info(f"logged successfully with {self._login}")
 
     def _compose_msg(self, event: entities.AlarmEvent) -> MIMEMultipart:
-        """
-        :return: body of the e-mail that will be sent
-        """
-        msg = MIMEMultipart("alternative")
-        msg["From"] = self._login
-        msg["To"] = ", ".join(event.emails)
-        msg["Cc"] = ""
-        msg["Bcc"] = ""
-        msg["Subject"] = event.subject
-
-        content = compose_msg_content(event)
-
-        text_part = MIMEText(content.text, "plain")
-        html_part = MIMEText(content.html, "html")
-        # The email client will try to render the last part first (in this case the html)
-        msg.attach(text_part)
-        msg.attach(html_part)
-        return msg
+        return compose_msg(self._login, event)
 
     def send_email(self, event: entities.AlarmEvent):
         if not self._server:
@@ -1,4 +1,6 @@
 import typing
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 
 import mailpy.entities as entities
 import mailpy.info
@@ -9,11 +11,26 @@ class MessageContent(typing.NamedTuple):
     html: str
 
 
+def _violated_indices_str(event: entities.AlarmEvent) -> str:
+    """Violated elements reported by the array conditions"""
+    if "indices" not in event.extras:
+        return ""
+
+    indices = ", ".join(str(i) for i in event.extras["indices"])
+    if event.extras.get("violations", 0) > len(event.extras["indices"]):
+        indices += ", ..."
+    return f"{indices} (worst at {event.extras.get('worst_index')})"
+
+
 def _compose_text(event: entities.AlarmEvent):
+    violated_indices = _violated_indices_str(event)
+    violated_indices_line = (
+        f"\n     - Violated indices: {violated_indices}" if violated_indices else ""
+    )
     return f"""{event.warning}\n
      - PV name:         {event.pvname}
      - Specified range: {event.specified_value_message}
-     - Value measured:  {event.value_measured} {event.unit}
+     - Value measured:  {event.value_measured} {event.unit}{violated_indices_line}
      - Timestamp:       {event.ts.local_str}
 
      Archiver link:
@@ -27,6 +44,12 @@ def _compose_text(event: entities.AlarmEvent):
 
 
 def _compose_html(event: entities.AlarmEvent):
+    violated_indices = _violated_indices_str(event)
+    violated_indices_item = (
+        f"<li><b>Violated indices:</b> {violated_indices}<br></li>"
+        if violated_indices
+        else ""
+    )
     return f"""\
         <html>
             <body>
@@ -37,6 +60,7 @@ def _compose_html(event: entities.AlarmEvent):
                         <li><b>PV name:         </b> {event.pvname} <br></li>
                         <li><b>Specified range: </b> {event.specified_value_message}<br></li>
                         <li><b>Value measured:  </b> {event.value_measured} {event.unit}<br></li>
+                        {violated_indices_item}
                         <li><b>Timestamp:       </b> {event.ts.local_str}<br></li>
                     </ul>
                     <h4>Archiver links:</h4>
@@ -76,3 +100,24 @@ def compose_msg_content(event: entities.AlarmEvent) -> MessageContent:
 
     html = _compose_html(event)
     return MessageContent(text, html)
+
+
+def compose_msg(sender: str, event: entities.AlarmEvent) -> MIMEMultipart:
+    """
+    :return: body of the e-mail that will be sent
+    """
+    msg = MIMEMultipart("alternative")
+    msg["From"] = sender
+    msg["To"] = ", ".join(event.emails)
+    msg["Cc"] = ""
+    msg["Bcc"] = ""
+    msg["Subject"] = event.subject
+
+    content = compose_msg_content(event)
+
+    text_part = MIMEText(content.text, "plain")
+    html_part = MIMEText(content.html, "html")
+    # The email client will try to render the last part first (in this case the html)
+    msg.attach(text_part)
+    msg.attach(html_part)
+    return msg
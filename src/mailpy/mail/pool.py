@@ -0,0 +1,212 @@
+import collections
+import smtplib
+import threading
+import time
+import typing
+
+import mailpy.entities as entities
+import mailpy.logging as logging
+
+from .client import MailClient, MailClientArgs
+
+logger = logging.getLogger()
+
+# A session is closed and replaced after this many emails, relays often cap them
+SESSION_MAX_MESSAGES = 100
+# Idle sessions older than this are closed instead of kept alive
+SESSION_MAX_IDLE = 300.0
+# Idle sessions are sent a NOOP this often, servers drop silent sessions after a while
+KEEPALIVE_INTERVAL = 30.0
+
+# The server refused this email but the session is still usable
+_REFUSED = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+class SMTPPoolStats(typing.NamedTuple):
+    idle: int
+    connects: int
+    reconnects: int
+    recycled: int
+    sent: int
+
+
+class _Session:
+    __slots__ = ("client", "messages", "last_used")
+
+    def __init__(self, client: MailClient):
+        self.client = client
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    At most size authenticated SMTP sessions shared by the threads sending emails, so the
+    connect, TLS handshake and login are paid once per session and not once per email.
+    A session dropped by the server is reopened and the email sent again once, sessions
+    are recycled after max_messages emails or max_idle seconds without use and the idle
+    ones are kept alive with a NOOP every keepalive_interval.
+    """
+
+    def __init__(
+        self,
+        args: MailClientArgs,
+        size: int = 1,
+        max_messages: int = SESSION_MAX_MESSAGES,
+        max_idle: float = SESSION_MAX_IDLE,
+        keepalive_interval: float = KEEPALIVE_INTERVAL,
+        encryption: bool = True,
+    ):
+        if size < 1 or max_messages < 1:
+            raise ValueError(f"Invalid SMTP pool limits {size} {max_messages}")
+
+        self._args = args
+        self._encryption = encryption
+        self._max_messages = max_messages
+        self._max_idle = max_idle
+        self._keepalive_interval = keepalive_interval
+
+        # Checks the settings right away
+        self._new_client()
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        # The most recently used session is reused first, the others age out
+        self._idle: typing.Deque[_Session] = collections.deque()
+        self._connects = 0
+        self._reconnects = 0
+        self._recycled = 0
+        self._sent = 0
+
+        self._stop_event = threading.Event()
+        self._keepalive_thread = threading.Thread(
+            target=self._do_keepalive, daemon=True, name="SMTP Keepalive"
+        )
+
+    @property
+    def stats(self) -> SMTPPoolStats:
+        with self._lock:
+            return SMTPPoolStats(
+                idle=len(self._idle),
+                connects=self._connects,
+                reconnects=self._reconnects,
+                recycled=self._recycled,
+                sent=self._sent,
+            )
+
+    def _new_client(self) -> MailClient:
+        return MailClient(args=self._args, debug_level=0, encryption=self._encryption)
+
+    def _connect(self) -> _Session:
+        client = self._new_client()
+        client.connect()
+        with self._lock:
+            self._connects += 1
+            if not self._keepalive_thread.is_alive() and not self._stop_event.is_set():
+                self._keepalive_thread.start()
+        return _Session(client)
+
+    def _close(self, session: _Session):
+        try:
+            session.client.disconnect()
+        except Exception as e:
+            logger.debug("Failed to close SMTP session: %s", e)
+
+    def _expired(self, session: _Session, now: float) -> bool:
+        return (
+            session.messages >= self._max_messages
+            or now - session.last_used > self._max_idle
+        )
+
+    def _acquire(self) -> _Session:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                session = self._idle.pop()
+            now = time.monotonic()
+            if self._expired(session, now):
+                self._recycle(session)
+            elif now - session.last_used > self._keepalive_interval and not (
+                session.client.noop()
+            ):
+                self._recycle(session)
+            else:
+                return session
+        return self._connect()
+
+    def _recycle(self, session: _Session):
+        self._close(session)
+        with self._lock:
+            self._recycled += 1
+
+    def _release(self, session: _Session):
+        session.last_used = time.monotonic()
+        if session.messages >= self._max_messages or self._stop_event.is_set():
+            self._recycle(session)
+            return
+        with self._lock:
+            self._idle.append(session)
+
+    def send_email(self, event: entities.AlarmEvent):
+        """Blocks while size emails are being sent"""
+        with self._slots:
+            session = self._acquire()
+            try:
+                try:
+                    session.client.send_email(event)
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    logger.info(f"SMTP session dropped ({e}), reconnecting")
+                    self._close(session)
+                    with self._lock:
+                        self._reconnects += 1
+                    session = self._connect()
+                    session.client.send_email(event)
+            except _REFUSED:
+                session.messages += 1
+                self._release(session)
+                raise
+            except Exception:
+                # Unknown session state
+                self._close(session)
+                raise
+
+            session.messages += 1
+            with self._lock:
+                self._sent += 1
+            self._release(session)
+
+    def _do_keepalive(self):
+        while not self._stop_event.wait(self._keepalive_interval):
+            self.keepalive()
+
+    def keepalive(self):
+        """NOOP the sessions idle for keepalive_interval, close the expired ones"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                s for s in self._idle if now - s.last_used > self._keepalive_interval
+            ]
+            for session in stale:
+                self._idle.remove(session)
+
+        for session in stale:
+            if self._expired(session, now) or not session.client.noop():
+                self._recycle(session)
+            else:
+                # Kept at the cold end, the sessions in use stay first
+                with self._lock:
+                    self._idle.appendleft(session)
+
+    def close(self):
+        self._stop_event.set()
+        if self._keepalive_thread.is_alive():
+            self._keepalive_thread.join()
+        with self._lock:
+            idle, self._idle = list(self._idle), collections.deque()
+        for session in idle:
+            self._close(session)
@@ -4,16 +4,27 @@ import threading
 import time
 import typing
 
+import mailpy.aio as aio
+import mailpy.batch as batch
+import mailpy.bus as bus
+import mailpy.coalescing as coalescing
 import mailpy.consumer as consumer
 import mailpy.data_connector as data_connector
 import mailpy.db as db
 import mailpy.entities as entities
 import mailpy.logging as logging
+import mailpy.mail.pool as pool
+import mailpy.multiprocess as multiprocess
+import mailpy.replay as replay
+import mailpy.spool as spool
 from mailpy.mail.client import MailClientArgs
+from mailpy.scheduler import DeadlineScheduler
 
 logger = logging.getLogger()
 
 EVENT_QUEUE_SIZE = 50000
+# Period of the consumer queue statistics log
+STATS_PERIOD = 60.0
 
 
 @dataclasses.dataclass(frozen=True)
@@ -24,79 +35,353 @@ class Config:
     email_server_host: str
     email_server_port: int
     email_tls_enabled: bool = False
+    # Optional full re-dispatch of every PV, disabled when None
+    sweep_period: typing.Optional[float] = None
+    sweep_workers: int = 1
+    connection_timeout: float = 5.0
+    # Evaluate conditions in the CA callback thread when 0
+    evaluation_workers: int = 0
+    # Evaluate entries in this process when 0, otherwise partition them by PV name
+    monitor_processes: int = 0
+    # Logging config used by the monitor processes
+    logging_config: typing.Optional[str] = None
+    # Replay recorded updates from this file instead of connecting to the PVs
+    replay_file: typing.Optional[str] = None
+    # Replay speed-up factor, 0 replays as fast as possible
+    replay_speedup: float = 1.0
+    # Period of the vectorized threshold evaluation, entries are evaluated one by one when None
+    batch_period: typing.Optional[float] = None
+    # Bounded queue of every consumer and what each one does once it is full
+    consumer_queue_size: int = bus.CONSUMER_QUEUE_SIZE
+    email_overflow_policy: str = bus.OverflowPolicy.Coalesce
+    persistence_overflow_policy: str = bus.OverflowPolicy.Spill
+    email_workers: int = 1
+    # Each email worker keeps its SMTP session open, recycled after this many emails or
+    # seconds without use
+    smtp_session_messages: int = pool.SESSION_MAX_MESSAGES
+    smtp_session_idle: float = pool.SESSION_MAX_IDLE
+    persistence_workers: int = 1
+    # Directory of the spilled events, the system temporary directory when None
+    spill_dir: typing.Optional[str] = None
+    # Durable spool of the events shared by the consumers, replayed on restart. Threads
+    # runtime only, the events go through the in memory consumer queues when None
+    spool_dir: typing.Optional[str] = None
+    spool_segment_bytes: int = spool.SEGMENT_BYTES
+    spool_sync_interval: float = spool.SYNC_INTERVAL
+    # Threads runtime (consumer threads) or asyncio runtime (one event loop)
+    runtime: str = aio.RuntimeEnums.Threads
+    email_concurrency: int = aio.EMAIL_CONCURRENCY
+    persistence_concurrency: int = aio.PERSISTENCE_CONCURRENCY
+    # Log the statistics of the consumer queues this often, disabled when None
+    stats_period: typing.Optional[float] = STATS_PERIOD
 
 
-class Manager:
-    def __init__(self, config: Config):
+class Monitor:
+    """Owns the PV connections, evaluates the entries and puts the events into event_queue"""
 
-        self.event_queue: queue.Queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
-
-        self.entries: typing.Dict[str, entities.Entry] = {}
+    def __init__(
+        self,
+        config: Config,
+        db_manager: db.DBManager,
+        event_queue,
+        dispatcher: typing.Optional[aio.AsyncEvaluationDispatcher] = None,
+    ):
         self._tick: float = 15
         self._running: bool = True
 
-        self.db = db.make_db_manager(url=config.db_connection_string)
-        self.data_connector = data_connector.DataConnector(self.db, self.event_queue)
+        self.scheduler = DeadlineScheduler()
+        self.dispatcher: typing.Optional[coalescing.BaseDispatcher] = dispatcher
+        if dispatcher is None and config.evaluation_workers > 0:
+            self.dispatcher = coalescing.CoalescingDispatcher(
+                workers=config.evaluation_workers
+            )
+        self.source: data_connector.BaseDataSource = (
+            replay.ReplayDataSource(
+                replay.load_records(config.replay_file),
+                speedup=config.replay_speedup,
+            )
+            if config.replay_file
+            else data_connector.EpicsDataSource()
+        )
+        self.batch: typing.Optional[batch.BatchEvaluator] = (
+            batch.BatchEvaluator() if config.batch_period else None
+        )
+        self.data_connector = data_connector.DataConnector(
+            db_manager,
+            event_queue,
+            scheduler=self.scheduler,
+            tick_workers=config.sweep_workers,
+            dispatcher=self.dispatcher,
+            source=self.source,
+            batch=self.batch,
+        )
+        self._sweep_period = config.sweep_period
+        self._batch_period = config.batch_period
+        self._connection_timeout = config.connection_timeout
 
         self._tick_thread = threading.Thread(
             daemon=False,
-            name="EPICS Tick",
+            name="Cooldown Scheduler",
             target=self._do_tick,
         )
+        self._sweep_thread = threading.Thread(
+            daemon=True,
+            name="EPICS Sweep",
+            target=self._do_sweep,
+        )
+        self._batch_thread = threading.Thread(
+            daemon=True,
+            name="Batch Evaluator",
+            target=self._do_batch,
+        )
+
+    def initialize_entries(
+        self, entries_data: typing.Iterable[entities.EntryData]
+    ) -> data_connector.StartupReport:
+        return self.data_connector.create_entries(
+            entries_data, connection_timeout=self._connection_timeout
+        )
+
+    def start(self):
+        if self.dispatcher:
+            self.dispatcher.start()
+        self._tick_thread.start()
+        if self._sweep_period:
+            self._sweep_thread.start()
+        if self.batch is not None:
+            self._batch_thread.start()
+        self.source.start()
+
+    def stop(self):
+        self._running = False
+        self.source.stop()
+
+    def join(self):
+        self._tick_thread.join()
+
+    def _do_tick(self):
+        """Re-evaluate the entries whose email_timeout expired while in alarm"""
+        while self._running:
+            self.scheduler.wait(timeout=self._tick)
+            self.scheduler.run_pending()
+
+    def _do_sweep(self):
+        """Periodically re-dispatch the current value of every PV"""
+        while self._running:
+            time.sleep(self._sweep_period)
+            reports = self.data_connector.tick()
+            slowest = max(reports, key=lambda r: r.duration)
+            logger.info(
+                f"Sweep of {sum(r.connectors for r in reports)} PVs over {len(reports)} shards, slowest shard {slowest.shard} took {slowest.duration:.4f}s"
+            )
+
+    def _do_batch(self):
+        """Evaluate the thresholds of the values received since the previous flush"""
+        while self._running:
+            time.sleep(self._batch_period)
+            report = self.batch.flush()
+            logger.debug(
+                f"Batch of {report.pending} pending values, {report.violations} violations in {report.duration:.4f}s"
+            )
+
+
+class Manager:
+    def __init__(self, config: Config):
+        self._running: bool = True
+        self._stats_period = config.stats_period
+        self.entries: typing.Dict[str, entities.Entry] = {}
+
+        self.db = db.make_db_manager(url=config.db_connection_string)
+
+        mail_client_args = MailClientArgs(
+            port=config.email_server_port,
+            host=config.email_server_host,
+            login=config.email_login,
+            passwd=config.email_password,
+            tls=config.email_tls_enabled,
+        )
+        self.runtime: typing.Optional[aio.AsyncRuntime] = None
+        if config.runtime == aio.RuntimeEnums.Asyncio:
+            self.runtime = aio.AsyncRuntime(
+                db_manager=self.db,
+                mail_client_args=mail_client_args,
+                queue_size=EVENT_QUEUE_SIZE,
+                email_concurrency=config.email_concurrency,
+                persistence_concurrency=config.persistence_concurrency,
+            )
+        elif config.runtime != aio.RuntimeEnums.Threads:
+            raise ValueError(f"Invalid runtime '{config.runtime}'")
+        if self.runtime and config.spool_dir:
+            raise ValueError("The event spool is not supported by the asyncio runtime")
+
+        self.monitor: typing.Optional[Monitor] = None
+        self.monitor_pool: typing.Optional[multiprocess.MonitorProcessPool] = None
+        if config.monitor_processes > 0:
+            self.monitor_pool = multiprocess.MonitorProcessPool(
+                config=config, queue_size=EVENT_QUEUE_SIZE
+            )
+            # A queue.Queue, the process pool queue or the put side of the asyncio runtime
+            self.event_queue: typing.Any = self.monitor_pool.event_queue
+        elif self.runtime:
+            # The CA callbacks and the entries hand their work to the loop directly
+            self.event_queue = self.runtime.event_queue
+            self.monitor = Monitor(
+                config=config,
+                db_manager=self.db,
+                event_queue=self.event_queue,
+                dispatcher=self.runtime.dispatcher,
+            )
+        else:
+            self.event_queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+            self.monitor = Monitor(
+                config=config, db_manager=self.db, event_queue=self.event_queue
+            )
+
         self._event_dispatcher_thread = threading.Thread(
             daemon=True,
             name="Event Dispatcher",
             target=self._event_dispatcher,
         )
 
-        self.consumers: typing.List[consumer.BaseEventConsumer] = [
-            consumer.PersistenceConsumer(db_manager=self.db),
-            consumer.EmailConsumer(
-                mail_client_args=MailClientArgs(
-                    port=config.email_server_port,
-                    host=config.email_server_host,
-                    login=config.email_login,
-                    passwd=config.email_password,
-                    tls=config.email_tls_enabled,
+        self.bus: typing.Optional[bus.EventBus] = None
+        self.spool: typing.Optional[spool.EventSpool] = None
+        if self.runtime:
+            return
+
+        self.bus = bus.EventBus(
+            [
+                consumer.PersistenceConsumer(
+                    db_manager=self.db,
+                    maxsize=config.consumer_queue_size,
+                    policy=config.persistence_overflow_policy,
+                    spill_dir=config.spill_dir,
+                    workers=config.persistence_workers,
                 ),
-            ),
-        ]
+                consumer.EmailConsumer(
+                    mail_client_args=mail_client_args,
+                    maxsize=config.consumer_queue_size,
+                    policy=config.email_overflow_policy,
+                    workers=config.email_workers,
+                    session_max_messages=config.smtp_session_messages,
+                    session_max_idle=config.smtp_session_idle,
+                ),
+            ]
+        )
+        if config.spool_dir:
+            self.spool = spool.EventSpool(
+                directory=config.spool_dir,
+                segment_bytes=config.spool_segment_bytes,
+                sync_interval=config.spool_sync_interval,
+            )
+            # Each consumer resumes from its own committed offset
+            for c in self.bus.consumers:
+                c.attach_spool(self.spool.reader(c.name))
+
+    @property
+    def consumers(self) -> typing.List[consumer.BaseEventConsumer]:
+        return self.bus.consumers if self.bus else []
+
+    def queue_stats(self) -> typing.Dict[str, bus.ConsumerQueueStats]:
+        """Statistics of every consumer queue, empty with the asyncio runtime"""
+        return self.bus.stats() if self.bus else {}
+
+    def _log_stats(self):
+        for name, stats in self.queue_stats().items():
+            logger.info(
+                f"Consumer {name}: depth {stats.depth} ({stats.spilled} spilled), lag {stats.lag:.3f}s, "
+                f"published {stats.published}, delivered {stats.delivered}, dropped {stats.dropped}, coalesced {stats.coalesced}"
+            )
 
     def _start_consumers(self):
-        for c in self.consumers:
-            c.start()
+        if self.runtime:
+            self.runtime.start()
+        else:
+            self.bus.start()
 
     def _consume(self, obj):
-        for c in self.consumers:
-            c.add(obj)
+        if self.runtime:
+            self.runtime.publish(obj)
+        elif self.spool:
+            try:
+                self.spool.append(obj)
+            except (OSError, spool.SpoolException) as e:
+                # Disk full or spool closed. The consumers only read the spool, the event
+                # is lost but the dispatcher keeps going
+                logger.exception(
+                    f"Failed to append event {obj} to the spool. Error {e}"
+                )
+        else:
+            self.bus.publish(obj)
 
     def initialize_entries_from_database(self):
         """Load entries from database"""
         entries_data = self.db.get_entries()
-        for entry_data in entries_data:
-            self.data_connector.create_entry(entry_data=entry_data)
+        if self.monitor_pool:
+            self.monitor_pool.assign_entries(entries_data)
+            return None
+        return self.monitor.initialize_entries(entries_data)
 
     def start(self):
         self._start_consumers()
-        self._tick_thread.start()
-        self._event_dispatcher_thread.start()
+        if self.monitor_pool:
+            self.monitor_pool.start()
+        else:
+            self.monitor.start()
+        if self.event_queue is not getattr(self.runtime, "event_queue", None):
+            self._event_dispatcher_thread.start()
+
+    def stop(self):
+        """Stop the monitors, join returns once the consumers handled the pending events"""
+        if self.monitor_pool:
+            self.monitor_pool.stop()
+        else:
+            self.monitor.stop()
 
     def join(self):
-        self._tick_thread.join()
-        self._event_dispatcher_thread.join()
+        if self.monitor_pool:
+            self.monitor_pool.join()
+        else:
+            self.monitor.join()
 
-    def _do_tick(self):
-        """Trigger Entry processing"""
-        while self._running:
-            time.sleep(self._tick)
-            self.data_connector.tick()
+        # No event comes once the monitors are over
+        self._running = False
+        if self._event_dispatcher_thread.is_alive():
+            # Wakes the dispatcher up, it skips None
+            self.event_queue.put(None)
+            self._event_dispatcher_thread.join()
+        if self.bus:
+            self.bus.join()
+        if self.spool:
+            # Last fsync of the appended events and of the committed offsets
+            self.spool.close()
 
     def _event_dispatcher(self):
+        period = self._stats_period
+        next_stats = time.monotonic() + period if period else None
         while self._running:
-            event = self.event_queue.get(block=True, timeout=None)
+            try:
+                # Wakes up for the statistics even when no event comes
+                event = self.event_queue.get(block=True, timeout=period)
+            except queue.Empty:
+                event = None
+
+            if period and next_stats is not None and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + period
+                try:
+                    self._log_stats()
+                except Exception as e:
+                    logger.exception(
+                        f"Failed to log the consumer statistics. Error {e}"
+                    )
+
+            if event is None:
+                continue
 
             if type(event) != entities.AlarmEvent:
                 logger.warning(f"Unknown event type {event} obtained from queue.")
                 continue
 
-            self._consume(event)
+            try:
+                self._consume(event)
+            except Exception as e:
+                logger.exception(f"Failed to dispatch event {event}. Error {e}")
@@ -0,0 +1,100 @@
+import multiprocessing
+import typing
+import zlib
+
+import mailpy.logging as logging
+
+if typing.TYPE_CHECKING:
+    from mailpy.entities import EntryData
+    from mailpy.manager import Config
+
+logger = logging.getLogger()
+
+
+def partition_for(pvname: str, partitions: int) -> int:
+    """Stable across processes and runs, unlike hash() which is salted per interpreter"""
+    return zlib.crc32(pvname.encode()) % partitions
+
+
+def _run_monitor_process(
+    config: "Config",
+    partition: int,
+    entries_data: typing.List["EntryData"],
+    event_queue,
+    stop_event,
+):
+    """Entry point of a monitor process, owns its CA context, EpicsConnectors and scheduler"""
+    import mailpy.db as db
+    import mailpy.manager as manager
+
+    if config.logging_config:
+        logging.load_config(config.logging_config)
+    else:
+        # Processes cannot share the rotating log file
+        logging.load_config_console()
+
+    db_manager = db.make_db_manager(url=config.db_connection_string)
+    monitor = manager.Monitor(
+        config=config, db_manager=db_manager, event_queue=event_queue
+    )
+    report = monitor.initialize_entries(entries_data)
+    logger.info(
+        f"Monitor process {partition} owns {len(entries_data)} entries, {len(report.pending)} PVs pending connection"
+    )
+    monitor.start()
+    stop_event.wait()
+    monitor.stop()
+
+
+class MonitorProcessPool:
+    """
+    Hash partitions the entries by PV name across processes.
+    Each process evaluates its own entries and forwards the events to the parent
+    through event_queue, where they are handed to the consumers.
+    """
+
+    def __init__(self, config: "Config", queue_size: int):
+        if config.monitor_processes < 1:
+            raise ValueError(
+                f"Invalid number of monitor processes {config.monitor_processes}"
+            )
+
+        self._config = config
+        # pymongo clients and CA contexts must not be inherited by a fork
+        self._context = multiprocessing.get_context("spawn")
+        self.event_queue = self._context.Queue(maxsize=queue_size)
+        self._stop_event = self._context.Event()
+        self._partitions: typing.List[typing.List["EntryData"]] = [
+            [] for _ in range(config.monitor_processes)
+        ]
+        self._processes: typing.List[multiprocessing.process.BaseProcess] = []
+
+    def assign_entries(self, entries_data: typing.Iterable["EntryData"]):
+        for entry_data in entries_data:
+            partition = partition_for(entry_data.pvname, len(self._partitions))
+            self._partitions[partition].append(entry_data)
+
+    def start(self):
+        for i, entries_data in enumerate(self._partitions):
+            process = self._context.Process(
+                target=_run_monitor_process,
+                args=(
+                    self._config,
+                    i,
+                    entries_data,
+                    self.event_queue,
+                    self._stop_event,
+                ),
+                name=f"Monitor {i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            logger.info(f"Monitor process {process.name} started, pid {process.pid}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self):
+        for process in self._processes:
+            process.join()
@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+import typing
+
+import numpy
+
+import mailpy.entities as entities
+import mailpy.logging as logging
+from mailpy.coalescing import BaseDispatcher
+from mailpy.data_connector import BaseConnector, BaseDataSource
+
+logger = logging.getLogger()
+
+# Sleeps shorter than this are skipped, the replay catches up on the next record
+REPLAY_MIN_SLEEP = 0.001
+
+REPLAY_HOST = "replay"
+
+
+class ReplayRecord(typing.NamedTuple):
+    timestamp: float
+    pvname: str
+    value: typing.Any
+    severity: int = 0
+
+
+class ReplayStats(typing.NamedTuple):
+    replayed: int
+    unknown: int
+    duration: float
+
+
+def load_records(path: str) -> typing.List[ReplayRecord]:
+    """One JSON object per line with timestamp, pvname, value and optionally severity"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            value = obj["value"]
+            records.append(
+                ReplayRecord(
+                    timestamp=float(obj["timestamp"]),
+                    pvname=obj["pvname"],
+                    value=numpy.array(value) if type(value) == list else value,
+                    severity=int(obj.get("severity", 0)),
+                )
+            )
+    return records
+
+
+def save_records(records: typing.Iterable[ReplayRecord], path: str):
+    with open(path, "w") as f:
+        for record in records:
+            value = record.value
+            if isinstance(value, numpy.ndarray):
+                value = value.tolist()
+            f.write(
+                json.dumps(
+                    {
+                        "timestamp": record.timestamp,
+                        "pvname": record.pvname,
+                        "value": value,
+                        "severity": record.severity,
+                    }
+                )
+            )
+            f.write("\n")
+
+
+class ReplayConnector(BaseConnector):
+    """Always connected, receives its updates from ReplayDataSource"""
+
+    def __init__(
+        self,
+        pvname: str,
+        monitor: bool = True,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ):
+        super().__init__(pvname, dispatcher=dispatcher)
+        self._monitoring = monitor
+        self._last_data: typing.Optional[entities.ValueChangedInfo] = None
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def start_monitor(self):
+        self._monitoring = True
+
+    def replay(self, data: entities.ValueChangedInfo):
+        if not self._monitoring:
+            return
+
+        alarm_only = not self._mask & (
+            entities.MonitorMask.Value | entities.MonitorMask.Log
+        )
+        previous = self._last_data
+        self._last_data = data
+        if alarm_only and previous is not None and previous.severity == data.severity:
+            # Same as an IOC posting DBE_ALARM only on severity changes
+            return
+
+        self.dispatch_value_changed(data)
+
+    def tick(self):
+        if self._last_data is not None:
+            self.dispatch_value_changed(self._last_data)
+
+
+class ReplayDataSource(BaseDataSource):
+    """
+    Streams recorded updates into the connectors instead of Channel Access, used to load
+    test the evaluation pipeline. The record timestamps are replayed speedup times faster,
+    a speedup of 0 replays them as fast as possible.
+    """
+
+    def __init__(
+        self,
+        records: typing.Iterable[ReplayRecord],
+        speedup: float = 1.0,
+        loop: bool = False,
+    ):
+        if speedup < 0:
+            raise ValueError(f"Invalid replay speedup {speedup}")
+
+        self._speedup = speedup
+        self._loop = loop
+        self._connectors: typing.Dict[str, ReplayConnector] = {}
+
+        # Build the updates once so the replay only measures the pipeline
+        records = sorted(records, key=lambda r: r.timestamp)
+        start = records[0].timestamp if records else 0.0
+        self._updates: typing.List[typing.Tuple[float, entities.ValueChangedInfo]] = [
+            (
+                r.timestamp - start,
+                entities.ValueChangedInfo(
+                    pvname=r.pvname,
+                    value=r.value,
+                    status=0,
+                    host=REPLAY_HOST,
+                    severity=r.severity,
+                    timestamp=r.timestamp,
+                ),
+            )
+            for r in records
+        ]
+
+        self._stop_event = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self.stats = ReplayStats(replayed=0, unknown=0, duration=0.0)
+
+    def create_connector(
+        self,
+        pvname: str,
+        monitor: bool = True,
+        dispatcher: typing.Optional[BaseDispatcher] = None,
+    ) -> BaseConnector:
+        connector = ReplayConnector(pvname, monitor=monitor, dispatcher=dispatcher)
+        self._connectors[pvname] = connector
+        return connector
+
+    def run(self) -> ReplayStats:
+        """Replay the records in the calling thread"""
+        replayed = 0
+        unknown = 0
+        start = time.monotonic()
+        while not self._stop_event.is_set():
+            t0 = time.monotonic()
+            for offset, data in self._updates:
+                if self._stop_event.is_set():
+                    break
+
+                if self._speedup:
+                    ahead = t0 + offset / self._speedup - time.monotonic()
+                    if ahead > REPLAY_MIN_SLEEP:
+                        self._stop_event.wait(ahead)
+
+                connector = self._connectors.get(data.pvname)
+                if connector is None:
+                    unknown += 1
+                    continue
+                connector.replay(data)
+                replayed += 1
+
+            if not self._loop:
+                break
+
+        self.stats = ReplayStats(
+            replayed=replayed, unknown=unknown, duration=time.monotonic() - start
+        )
+        logger.info(
+            f"Replayed {replayed} updates in {self.stats.duration:.3f}s, {unknown} for unknown PVs"
+        )
+        return self.stats
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.run, daemon=True, name="Replay Source"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -60,9 +60,15 @@ db.createCollection(entries, {
       properties: {
         alarm_values: { bsonType: "string" },
         condition: { bsonType: "string" },
+        deadband: { bsonType: ["double", "int"] },
+        deadband_mode: { enum: ["absolute", "relative"] },
+        duration: { bsonType: ["double", "int"] },
         email_timeout: { bsonType: "int" },
         emails: { bsonType: "string" },
+        formula: { bsonType: "string" },
         group: { bsonType: "string" },
+        hysteresis: { bsonType: ["double", "int"] },
+        notify_normal: { bsonType: "bool" },
         pvname: { bsonType: "string" },
         subject: { bsonType: "string" },
         unit: { bsonType: "string" },
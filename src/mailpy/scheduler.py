@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import threading
+import time
+import typing
+
+import mailpy.logging as logging
+
+logger = logging.getLogger()
+
+# The heap is rebuilt without the cancelled calls once they are the majority
+COMPACT_MIN_SIZE = 64
+
+
+class ScheduledCall:
+    """Handle of a pending call, used to cancel it before its deadline"""
+
+    __slots__ = ("deadline", "callback", "cancelled", "_scheduler")
+
+    def __init__(
+        self,
+        deadline: float,
+        callback: typing.Callable[[], typing.Any],
+        scheduler: typing.Optional["DeadlineScheduler"] = None,
+    ):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+        # Cleared once the call leaves the heap
+        self._scheduler = scheduler
+
+    def cancel(self):
+        """Cancelled calls are lazily discarded when they reach the top of the heap"""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self._scheduler is not None:
+            self._scheduler._call_cancelled()
+
+
+class DeadlineScheduler:
+    """
+    Heap of deadlines shared by every entry.
+    A tick only pops the calls whose deadline has expired, so its cost grows with the
+    number of expiring calls instead of the total number of PVs.
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: typing.List[typing.Tuple[float, int, ScheduledCall]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        # Cancelled calls still in the heap
+        self._cancelled = 0
+
+    def __len__(self):
+        with self._condition:
+            return len(self._heap)
+
+    def now(self) -> float:
+        return self._clock()
+
+    def call_later(
+        self, delay: float, callback: typing.Callable[[], typing.Any]
+    ) -> ScheduledCall:
+        """Schedule callback to be executed after delay seconds"""
+        call = ScheduledCall(
+            deadline=self._clock() + max(delay, 0), callback=callback, scheduler=self
+        )
+        with self._condition:
+            heapq.heappush(self._heap, (call.deadline, next(self._counter), call))
+            if self._heap[0][2] is call:
+                # New earliest deadline, wake up the thread waiting for the previous one
+                self._condition.notify_all()
+        return call
+
+    def next_deadline(self) -> typing.Optional[float]:
+        with self._condition:
+            self._discard_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def _call_cancelled(self):
+        with self._condition:
+            self._cancelled += 1
+            if len(self._heap) >= COMPACT_MIN_SIZE and self._cancelled * 2 > len(
+                self._heap
+            ):
+                # Flapping values cancel and reschedule often, keep the heap bounded
+                self._heap = [item for item in self._heap if not item[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _pop(self) -> ScheduledCall:
+        _, _, call = heapq.heappop(self._heap)
+        call._scheduler = None
+        if call.cancelled:
+            self._cancelled -= 1
+        return call
+
+    def _discard_cancelled(self):
+        while self._heap and self._heap[0][2].cancelled:
+            self._pop()
+
+    def _pop_expired(self) -> typing.List[ScheduledCall]:
+        now = self._clock()
+        expired = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                call = self._pop()
+                if not call.cancelled:
+                    expired.append(call)
+        return expired
+
+    def run_pending(self) -> int:
+        """Execute every call whose deadline has expired, returns how many were executed"""
+        expired = self._pop_expired()
+        for call in expired:
+            try:
+                call.callback()
+            except Exception as e:
+                logger.exception(f"Failed to execute scheduled call {call}, error {e}")
+        return len(expired)
+
+    def wait(self, timeout: typing.Optional[float] = None):
+        """Block until the earliest deadline expires, a new earlier one is scheduled or timeout elapses"""
+        with self._condition:
+            self._discard_cancelled()
+            if self._heap:
+                delay = self._heap[0][0] - self._clock()
+                if delay <= 0:
+                    return
+                timeout = delay if timeout is None else min(timeout, delay)
+            self._condition.wait(timeout=timeout)
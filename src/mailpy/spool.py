@@ -0,0 +1,354 @@
+import bisect
+import os
+import pickle
+import queue
+import struct
+import threading
+import typing
+import zlib
+
+import mailpy.logging as logging
+
+logger = logging.getLogger()
+
+# A new segment is started once the current one grows past this size
+SEGMENT_BYTES = 64 * 1024 * 1024
+# Period of the fsync of the appended events and of the committed offsets
+SYNC_INTERVAL = 0.1
+
+SEGMENT_SUFFIX = ".seg"
+OFFSET_SUFFIX = ".offset"
+
+# Payload length and crc32 of every record
+_HEADER = struct.Struct("<II")
+
+
+class SpoolException(Exception):
+    pass
+
+
+class SpoolStats(typing.NamedTuple):
+    segments: int
+    # Offset of the next appended event
+    end: int
+    # Committed offset of every reader
+    committed: typing.Dict[str, int]
+
+
+def _segment_name(base: int) -> str:
+    return f"{base:020d}{SEGMENT_SUFFIX}"
+
+
+def _skip_record(f: typing.BinaryIO) -> bool:
+    """Move past the next record without checking its payload, False at the end of the file"""
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return False
+    length, _ = _HEADER.unpack(header)
+    f.seek(length, os.SEEK_CUR)
+    return True
+
+
+def _read_record(f: typing.BinaryIO) -> typing.Optional[bytes]:
+    """Payload of the next record, None at the end of the file or at a torn record"""
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    length, crc = _HEADER.unpack(header)
+    payload = f.read(length)
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        return None
+    return payload
+
+
+class EventSpool:
+    """
+    Append-only log of the events on local disk, shared by every consumer.
+    Events are appended to segment files named after the offset of their first record,
+    each consumer reads them through its own SpoolReader and commits the offset it
+    handled. The appends are written right away and fsynced every sync_interval along
+    with the committed offsets, a crash loses at most that window. Segments are deleted
+    once every reader committed past them, memory does not grow with the backlog.
+    Delivery is at least once, the events handled after the last commit are replayed.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = SEGMENT_BYTES,
+        sync_interval: float = SYNC_INTERVAL,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._segment_bytes = segment_bytes
+        self._sync_interval = sync_interval
+
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)
+        self._readers: typing.Dict[str, "SpoolReader"] = {}
+        self._dirty = False
+        self._closed = False
+
+        self._segments: typing.List[int] = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._segments.append(0)
+        self._end = self._recover(self._segments[-1])
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+
+        self._stop_event = threading.Event()
+        self._sync_thread = threading.Thread(
+            target=self._do_sync, daemon=True, name="Spool Sync"
+        )
+        self._sync_thread.start()
+
+    def _segment_path(self, base: int) -> str:
+        return os.path.join(self.directory, _segment_name(base))
+
+    def _recover(self, base: int) -> int:
+        """Count the records of the last segment and cut a torn record left by a crash"""
+        path = self._segment_path(base)
+        end = base
+        position = 0
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                while _read_record(f) is not None:
+                    end += 1
+                    position = f.tell()
+                if position != os.path.getsize(path):
+                    logger.warning(
+                        f"Truncating torn record at {position} of spool segment {path}"
+                    )
+                    f.truncate(position)
+        return end
+
+    @property
+    def end(self) -> int:
+        with self._lock:
+            return self._end
+
+    @property
+    def stats(self) -> SpoolStats:
+        with self._lock:
+            return SpoolStats(
+                segments=len(self._segments),
+                end=self._end,
+                committed={
+                    name: reader.committed for name, reader in self._readers.items()
+                },
+            )
+
+    def append(self, event: typing.Any) -> int:
+        """Returns the offset of the event"""
+        payload = pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL)
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._closed:
+                raise SpoolException(f"Spool {self.directory} is closed")
+            if self._file.tell() >= self._segment_bytes:
+                self._roll()
+            self._file.write(record)
+            # Visible to the readers right away, durable on the next sync
+            self._file.flush()
+            offset = self._end
+            self._end += 1
+            self._dirty = True
+            self._appended.notify_all()
+            return offset
+
+    def _roll(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._segments.append(self._end)
+        self._file = open(self._segment_path(self._end), "ab")
+
+    def reader(self, name: str) -> "SpoolReader":
+        """Reader of a consumer, starts at the offset it committed before a restart"""
+        with self._lock:
+            if name in self._readers:
+                return self._readers[name]
+            committed = self._segments[0]
+            try:
+                with open(self._offset_path(name)) as f:
+                    committed = max(int(f.read().strip() or 0), committed)
+            except FileNotFoundError:
+                pass
+            reader = SpoolReader(self, name, min(committed, self._end))
+            self._readers[name] = reader
+            return reader
+
+    def _offset_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}{OFFSET_SUFFIX}")
+
+    def _locate(self, offset: int) -> int:
+        """Base of the segment holding offset"""
+        with self._lock:
+            return self._segments[bisect.bisect_right(self._segments, offset) - 1]
+
+    def sync(self):
+        """fsync the appended events, persist the committed offsets and compact"""
+        with self._lock:
+            if self._dirty and not self._closed:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+            readers = list(self._readers.values())
+
+        for reader in readers:
+            reader._write_offset()
+        self.compact()
+
+    def compact(self) -> int:
+        """Delete the segments every reader committed past, returns how many"""
+        with self._lock:
+            if not self._readers:
+                return 0
+            low = min(reader.committed for reader in self._readers.values())
+            removed = []
+            # The last segment is the one being appended
+            while len(self._segments) > 1 and self._segments[1] <= low:
+                removed.append(self._segments.pop(0))
+
+        for base in removed:
+            try:
+                os.remove(self._segment_path(base))
+            except OSError as e:
+                logger.error(f"Failed to remove spool segment {base}. Error {e}")
+        return len(removed)
+
+    def _do_sync(self):
+        while not self._stop_event.wait(self._sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.exception(f"Failed to sync spool {self.directory}. Error {e}")
+
+    def close(self):
+        self._stop_event.set()
+        self._sync_thread.join()
+        self.sync()
+        with self._lock:
+            self._closed = True
+            self._file.close()
+            self._appended.notify_all()
+
+
+class SpoolReader:
+    """
+    Cursor of one consumer. get hands out (offset, event) in order to any number of
+    workers, ack marks an offset handled and the committed offset advances over the
+    contiguous handled ones. The same get/shutdown interface as BoundedEventQueue.
+    A record that cannot be read back is logged, acked and skipped, a corrupt record
+    must not stop the consumer nor be replayed on every restart.
+    """
+
+    def __init__(self, spool: EventSpool, name: str, offset: int):
+        self.name = name
+        self._spool = spool
+        # Held by get while it waits for appends, ack uses its own lock
+        self._lock = threading.Lock()
+        self._ack_lock = threading.Lock()
+        # Next offset handed out, the file is positioned at its record
+        self._offset = offset
+        self._file: typing.Optional[typing.BinaryIO] = None
+        # Every offset below committed was handled
+        self.committed = offset
+        self._written = None
+        self._acked: typing.Set[int] = set()
+        self._shutdown = False
+        self.skipped = 0
+
+    def _open(self, offset: int) -> typing.BinaryIO:
+        """Position the reader at the record of offset, returns the opened segment"""
+        base = self._spool._locate(offset)
+        if self._file is not None:
+            self._file.close()
+        f = self._file = open(self._spool._segment_path(base), "rb")
+        for _ in range(offset - base):
+            # Corrupt records before offset are skipped by their length
+            if not _skip_record(f):
+                raise SpoolException(
+                    f"Spool segment {base} ends before offset {offset}"
+                )
+        return f
+
+    def _read(self) -> typing.Any:
+        f = self._file if self._file is not None else self._open(self._offset)
+        payload = _read_record(f)
+        if payload is None:
+            # End of the segment, the record starts the following one
+            payload = _read_record(self._open(self._offset))
+            if payload is None:
+                raise SpoolException(
+                    f"Failed to read offset {self._offset} of spool {self._spool.directory}"
+                )
+        return pickle.loads(payload)
+
+    def get(self, block: bool = True, timeout: typing.Optional[float] = None):
+        """Raises queue.Empty on timeout, or once shut down with no appended events left"""
+        with self._lock:
+            spool = self._spool
+            while True:
+                with spool._lock:
+                    if block and not self._shutdown:
+                        spool._appended.wait_for(
+                            lambda: self._offset < spool._end
+                            or self._shutdown
+                            or spool._closed,
+                            timeout=timeout,
+                        )
+                    if self._offset >= spool._end:
+                        raise queue.Empty
+
+                offset = self._offset
+                try:
+                    obj = self._read()
+                except Exception as e:
+                    logger.error(
+                        f"Skipping unreadable offset {offset} of spool {spool.directory} for {self.name}. Error {e}"
+                    )
+                    self._offset += 1
+                    # Positioned again from the segment start on the next read
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    self.skipped += 1
+                    self.ack(offset)
+                    continue
+
+                self._offset += 1
+                return offset, obj
+
+    def ack(self, offset: int):
+        with self._ack_lock:
+            self._acked.add(offset)
+            while self.committed in self._acked:
+                self._acked.remove(self.committed)
+                self.committed += 1
+
+    def _write_offset(self):
+        """Atomic replace of the offset file, done by the spool sync"""
+        committed = self.committed
+        if committed == self._written:
+            return
+        path = self._spool._offset_path(self.name)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(committed))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._written = committed
+
+    def shutdown(self):
+        with self._spool._lock:
+            self._shutdown = True
+            self._spool._appended.notify_all()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
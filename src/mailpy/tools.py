@@ -7,6 +7,7 @@ import docker.client
 import docker.models.containers
 
 from mailpy.db import EntryData, GroupData
+from mailpy.entities.deadband import DeadbandEnums
 
 RESOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "./resources")
 
@@ -170,4 +171,10 @@ class MongoJsonLoader:
             subject=d["subject"].strip(),
             email_timeout=d["email_timeout"],
             group=d["group"].strip(),
+            deadband=float(d.get("deadband") or 0.0),
+            deadband_mode=(d.get("deadband_mode") or DeadbandEnums.Absolute).strip(),
+            hysteresis=float(d.get("hysteresis") or 0.0),
+            notify_normal=bool(d.get("notify_normal", False)),
+            duration=float(d.get("duration") or 0.0),
+            formula=(d.get("formula") or "").strip(),
         )
@@ -24,7 +24,11 @@ def start_test_database():
 
 
 def start_alarm_server():
+    import mailpy.aio
+    import mailpy.bus
+    import mailpy.mail.pool
     import mailpy.manager
+    import mailpy.spool
 
     parser = argparse.ArgumentParser(
         description="Monitor PV EPICS values and if any of them isn't in a specified range, "
@@ -43,6 +47,164 @@ def start_alarm_server():
         default="mongodb://localhost:27017/mailpy",
         help="MongoDB connection URL",
     )
+    parser.add_argument(
+        "--sweep-period",
+        dest="sweep_period",
+        help="Period in seconds of an optional re-dispatch of every PV value (default: disabled)",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--sweep-workers",
+        dest="sweep_workers",
+        help="Number of threads sharing the PVs during a sweep (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--connection-timeout",
+        dest="connection_timeout",
+        help="Overall deadline in seconds to connect every PV at startup (default: 5)",
+        type=float,
+        default=5.0,
+    )
+    parser.add_argument(
+        "--evaluation-workers",
+        dest="evaluation_workers",
+        help="Number of threads evaluating the coalesced PV updates, 0 evaluates them in the CA callback (default: 0)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--monitor-processes",
+        dest="monitor_processes",
+        help="Number of processes sharing the entries partitioned by PV name, 0 monitors in the main process (default: 0)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--replay-file",
+        dest="replay_file",
+        help="Replay the updates recorded in this JSON lines file instead of connecting to the PVs, for load testing",
+        default=None,
+    )
+    parser.add_argument(
+        "--replay-speedup",
+        dest="replay_speedup",
+        help="Speed-up factor of the replay, 0 replays as fast as possible (default: 1)",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "--batch-period",
+        dest="batch_period",
+        help="Period in seconds of the vectorized evaluation of the threshold conditions (default: disabled)",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--consumer-queue-size",
+        dest="consumer_queue_size",
+        help=f"Maximum number of pending events of each consumer (default: {mailpy.bus.CONSUMER_QUEUE_SIZE})",
+        type=int,
+        default=mailpy.bus.CONSUMER_QUEUE_SIZE,
+    )
+    parser.add_argument(
+        "--email-overflow-policy",
+        dest="email_overflow_policy",
+        help=f"What the full email queue does with new events (default: {mailpy.bus.OverflowPolicy.Coalesce})",
+        choices=mailpy.bus.OverflowPolicy.get_policies(),
+        default=mailpy.bus.OverflowPolicy.Coalesce,
+    )
+    parser.add_argument(
+        "--persistence-overflow-policy",
+        dest="persistence_overflow_policy",
+        help=f"What the full persistence queue does with new events (default: {mailpy.bus.OverflowPolicy.Spill})",
+        choices=mailpy.bus.OverflowPolicy.get_policies(),
+        default=mailpy.bus.OverflowPolicy.Spill,
+    )
+    parser.add_argument(
+        "--email-workers",
+        dest="email_workers",
+        help="Number of threads sending emails, the emails of a PV are always sent in order (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--smtp-session-messages",
+        dest="smtp_session_messages",
+        help=f"Emails sent over an SMTP session before it is replaced (default: {mailpy.mail.pool.SESSION_MAX_MESSAGES})",
+        type=int,
+        default=mailpy.mail.pool.SESSION_MAX_MESSAGES,
+    )
+    parser.add_argument(
+        "--smtp-session-idle",
+        dest="smtp_session_idle",
+        help=f"Seconds an unused SMTP session is kept open (default: {mailpy.mail.pool.SESSION_MAX_IDLE})",
+        type=float,
+        default=mailpy.mail.pool.SESSION_MAX_IDLE,
+    )
+    parser.add_argument(
+        "--persistence-workers",
+        dest="persistence_workers",
+        help="Number of threads persisting the events (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--spill-dir",
+        dest="spill_dir",
+        help="Directory of the events spilled by full consumer queues (default: system temporary directory)",
+        default=None,
+    )
+    parser.add_argument(
+        "--spool-dir",
+        dest="spool_dir",
+        help="Directory of the durable event spool, the consumers replay the events not yet handled on restart (default: disabled)",
+        default=None,
+    )
+    parser.add_argument(
+        "--spool-segment-bytes",
+        dest="spool_segment_bytes",
+        help=f"Size in bytes past which the event spool starts a new segment file (default: {mailpy.spool.SEGMENT_BYTES})",
+        type=int,
+        default=mailpy.spool.SEGMENT_BYTES,
+    )
+    parser.add_argument(
+        "--spool-sync-interval",
+        dest="spool_sync_interval",
+        help=f"Seconds between the fsyncs of the event spool (default: {mailpy.spool.SYNC_INTERVAL})",
+        type=float,
+        default=mailpy.spool.SYNC_INTERVAL,
+    )
+    parser.add_argument(
+        "--runtime",
+        dest="runtime",
+        help="Handle the events with consumer threads or with a single asyncio event loop (default: threads)",
+        choices=mailpy.aio.RuntimeEnums.get_runtimes(),
+        default=mailpy.aio.RuntimeEnums.Threads,
+    )
+    parser.add_argument(
+        "--email-concurrency",
+        dest="email_concurrency",
+        help=f"Maximum concurrent SMTP sessions of the asyncio runtime (default: {mailpy.aio.EMAIL_CONCURRENCY})",
+        type=int,
+        default=mailpy.aio.EMAIL_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--persistence-concurrency",
+        dest="persistence_concurrency",
+        help=f"Maximum concurrent database writes of the asyncio runtime (default: {mailpy.aio.PERSISTENCE_CONCURRENCY})",
+        type=int,
+        default=mailpy.aio.PERSISTENCE_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--stats-period",
+        dest="stats_period",
+        help=f"Seconds between the logs of the consumer queue statistics, 0 disables them (default: {mailpy.manager.STATS_PERIOD})",
+        type=float,
+        default=mailpy.manager.STATS_PERIOD,
+    )
     # --------- Mail Server Settings
     parser.add_argument(
         "--mail-server-port",
@@ -85,6 +247,8 @@ def start_alarm_server():
             f"logging_config '{logging_config}' setting is empty, using the default rotating file config"
         )
         logging.load_config_rotating_file()
+    else:
+        logging.load_config(logging_config)
 
     # SMS
     sms_app = mailpy.manager.Manager(
@@ -95,6 +259,30 @@ def start_alarm_server():
             email_login=args.login,
             email_password=args.passwd,
             db_connection_string=args.db_url,
+            sweep_period=args.sweep_period,
+            sweep_workers=args.sweep_workers,
+            connection_timeout=args.connection_timeout,
+            evaluation_workers=args.evaluation_workers,
+            monitor_processes=args.monitor_processes,
+            logging_config=logging_config,
+            replay_file=args.replay_file,
+            replay_speedup=args.replay_speedup,
+            batch_period=args.batch_period,
+            consumer_queue_size=args.consumer_queue_size,
+            email_overflow_policy=args.email_overflow_policy,
+            persistence_overflow_policy=args.persistence_overflow_policy,
+            spill_dir=args.spill_dir,
+            spool_dir=args.spool_dir,
+            spool_segment_bytes=args.spool_segment_bytes,
+            spool_sync_interval=args.spool_sync_interval,
+            email_workers=args.email_workers,
+            smtp_session_messages=args.smtp_session_messages,
+            smtp_session_idle=args.smtp_session_idle,
+            persistence_workers=args.persistence_workers,
+            runtime=args.runtime,
+            email_concurrency=args.email_concurrency,
+            persistence_concurrency=args.persistence_concurrency,
+            stats_period=args.stats_period or None,
         )
     )
     sms_app.initialize_entries_from_database()
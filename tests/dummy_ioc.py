@@ -1,3 +1,6 @@
+import argparse
+import random
+
 from pcaspy import Driver, SimpleServer
 
 prefix = ""
@@ -6,6 +9,23 @@ pvdb = {
 }
 
 
+def make_pvdb(count: int) -> dict:
+    """Extra float PVs with alarm limits and an archive deadband (adel) to exercise DBE_LOG"""
+    db = dict(pvdb)
+    for i in range(count):
+        db[f"MAILPY:DUMMY{i}"] = {
+            "prec": 3,
+            "type": "float",
+            "hihi": 90.0,
+            "high": 80.0,
+            "low": 10.0,
+            "lolo": 0.0,
+            "adel": 1.0,
+            "mdel": 0.0,
+        }
+    return db
+
+
 class myDriver(Driver):
     def __init__(self):
         super(myDriver, self).__init__()
@@ -16,12 +36,35 @@ class myDriver(Driver):
     def write(self, reason, value):
         self.setParam(reason, value)
 
+    def add_noise(self, reasons, noise: float):
+        for reason in reasons:
+            value = self.getParam(reason) or 50.0
+            self.setParam(reason, value + random.uniform(-noise, noise))
+        self.updatePVs()
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dummy IOC for the mailpy tests")
+    parser.add_argument(
+        "--count", type=int, default=0, help="number of extra noisy PVs"
+    )
+    parser.add_argument(
+        "--noise", type=float, default=0.5, help="noise amplitude per update"
+    )
+    parser.add_argument(
+        "--period", type=float, default=0.1, help="update period in seconds"
+    )
+    args = parser.parse_args()
+
+    db = make_pvdb(args.count)
+    noisy = [name for name in db if name.startswith("MAILPY:DUMMY")]
+
     server = SimpleServer()
-    server.createPV(prefix, pvdb)
+    server.createPV(prefix, db)
     driver = myDriver()
 
     # process CA transactions
     while True:
-        server.process(0.1)
+        server.process(args.period)
+        if noisy:
+            driver.add_noise(noisy, args.noise)
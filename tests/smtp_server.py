@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+
+class FakeSMTPServer:
+    """Plain SMTP responder running its own loop, keeps the received messages"""
+
+    def __init__(self, reject_rcpt: bool = False, drop_after: int = 0):
+        self.messages = []
+        self.sessions = 0
+        self.noops = 0
+        self.reject_rcpt = reject_rcpt
+        # Close the session without a reply after this many messages, kept open when 0
+        self.drop_after = drop_after
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.port = 0
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *args):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._session, "127.0.0.1", 0)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        server.close()
+
+    async def _session(self, reader, writer):
+        self.sessions += 1
+        received = 0
+        writer.write(b"220 fake ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.strip().upper()
+            if command.startswith(b"EHLO"):
+                writer.write(b"250-fake\r\n250 AUTH PLAIN\r\n")
+            elif command.startswith(b"AUTH"):
+                writer.write(b"235 ok\r\n")
+            elif command.startswith(b"RCPT") and self.reject_rcpt:
+                writer.write(b"550 no such user\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 go ahead\r\n")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages.append(data)
+                writer.write(b"250 queued\r\n")
+                received += 1
+                if received == self.drop_after:
+                    await writer.drain()
+                    break
+            elif command == b"NOOP":
+                self.noops += 1
+                writer.write(b"250 ok\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
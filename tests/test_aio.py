@@ -0,0 +1,133 @@
+import asyncio
+import queue
+import smtplib
+import threading
+import unittest
+
+from mailpy.aio import AsyncEvaluationDispatcher, AsyncRuntime
+from mailpy.entities.event import create_alarm_event
+from mailpy.mail.async_client import AsyncMailClient
+from mailpy.mail.client import MailClientArgs
+
+from .smtp_server import FakeSMTPServer
+
+
+def event(pvname: str = "PV"):
+    return create_alarm_event(
+        pvname=pvname,
+        condition="out of range",
+        emails=["a@example.com", "b@example.com"],
+        specified_value_message="from 0 to 1",
+        subject="subject",
+        unit="",
+        value_measured=2.0,
+        warning=".leading dot",
+    )
+
+
+def mail_client(port: int, concurrency: int = 1) -> AsyncMailClient:
+    return AsyncMailClient(
+        MailClientArgs(
+            login="mailpy@example.com",
+            passwd="pass",
+            port=port,
+            host="127.0.0.1",
+            tls=True,
+        ),
+        concurrency=concurrency,
+        encryption=False,
+    )
+
+
+class FakeDBManager:
+    def __init__(self):
+        self.events = []
+
+    def persist_event(self, event):
+        self.events.append(event)
+
+
+class TestAsyncMailClient(unittest.TestCase):
+    def test_send(self):
+        with FakeSMTPServer() as server:
+            client = mail_client(server.port, concurrency=2)
+
+            async def send():
+                await asyncio.gather(*(client.send_email(event()) for _ in range(4)))
+
+            asyncio.run(send())
+            client.close()
+        self.assertEqual(len(server.messages), 4)
+        self.assertIn(b"Subject: subject", server.messages[0])
+        # The sessions are pooled, not one per email
+        self.assertLessEqual(client.stats.connects, 2)
+        self.assertEqual(client.stats.sent, 4)
+
+    def test_rejected(self):
+        with FakeSMTPServer(reject_rcpt=True) as server:
+            client = mail_client(server.port)
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                asyncio.run(client.send_email(event()))
+            client.close()
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    def test_events(self):
+        db_manager = FakeDBManager()
+        with FakeSMTPServer() as server:
+            runtime = AsyncRuntime(
+                db_manager=db_manager,
+                mail_client_args=None,
+                queue_size=100,
+                email_concurrency=8,
+                persistence_concurrency=2,
+                mail_client=mail_client(server.port),
+            )
+            runtime.start()
+            for i in range(20):
+                runtime.event_queue.put(event(f"PV{i}"), block=False)
+            runtime.stop(timeout=10)
+
+        self.assertEqual(len(server.messages), 20)
+        self.assertEqual(len(db_manager.events), 20)
+        stats = runtime.stats
+        self.assertEqual((stats.sent, stats.persisted, stats.failed), (20, 20, 0))
+        self.assertEqual(stats.pending, 0)
+
+    def test_queue_full(self):
+        runtime = AsyncRuntime(
+            db_manager=FakeDBManager(),
+            mail_client_args=None,
+            queue_size=1,
+            mail_client=mail_client(1),
+        )
+        # Not started, the first event stays pending
+        runtime.event_queue.put(event(), block=False)
+        with self.assertRaises(queue.Full):
+            runtime.event_queue.put(event(), block=False)
+
+
+class Target:
+    def __init__(self):
+        self.values = []
+        self.done = threading.Event()
+
+    def evaluate(self, data):
+        self.values.append(data)
+        self.done.set()
+
+
+class TestAsyncEvaluationDispatcher(unittest.TestCase):
+    def test_coalesce(self):
+        loop = asyncio.new_event_loop()
+        dispatcher = AsyncEvaluationDispatcher(loop)
+        target = Target()
+        for i in range(10):
+            dispatcher.submit(target, i)
+
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        loop.close()
+
+        self.assertEqual(target.values, [9])
+        self.assertEqual(dispatcher.stats.coalesced, 9)
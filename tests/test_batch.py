@@ -0,0 +1,84 @@
+import queue
+import unittest
+
+from mailpy.batch import BatchEvaluator
+from mailpy.entities import ConditionEnums, Entry, EntryData, Group, ValueChangedInfo
+
+
+def create_entry(
+    pvname: str, condition: str, alarm_values: str, event_queue: queue.Queue
+) -> Entry:
+    g = Group("1", "gtest", True)
+    return Entry(
+        entry_data=EntryData(
+            alarm_values=alarm_values,
+            condition=condition,
+            email_timeout=0,
+            emails=[""],
+            group=g,
+            id=pvname,
+            pvname=pvname,
+            subject="",
+            unit="",
+            warning_message="",
+        ),
+        group=g,
+        event_queue=event_queue,
+    )
+
+
+def value_changed(pvname: str, value) -> ValueChangedInfo:
+    return ValueChangedInfo(
+        pvname=pvname, value=value, status=0, host="host", severity=0
+    )
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    def test_thresholds(self):
+        q: queue.Queue = queue.Queue()
+        batch = BatchEvaluator(capacity=2)
+        entries = [
+            create_entry("PV:RANGE", ConditionEnums.OutOfRange, "0:10", q),
+            create_entry("PV:SUPERIOR", ConditionEnums.SuperiorThan, "5", q),
+            create_entry("PV:INFERIOR", ConditionEnums.InferiorThan, "5", q),
+            create_entry("PV:STEP", ConditionEnums.IncreasingStep, "1:2", q),
+        ]
+        batched = [batch.add_entry(e) for e in entries]
+        self.assertEqual(batched, [True, True, True, False])
+        self.assertEqual(len(batch), 3)
+
+        for entry, value in zip(entries[:3], [11.0, 4, 4.0]):
+            entry.handle_value_change(value_changed(entry.pvname, value))
+        # Nothing is evaluated before the flush
+        self.assertTrue(q.empty())
+
+        report = batch.flush()
+        self.assertEqual(report.pending, 3)
+        self.assertEqual(report.violations, 2)
+        self.assertEqual(
+            sorted(q.get_nowait().pvname for _ in range(2)),
+            ["PV:INFERIOR", "PV:RANGE"],
+        )
+
+        # Only the latest value of each slot counts
+        entries[1].handle_value_change(value_changed("PV:SUPERIOR", 6.0))
+        entries[1].handle_value_change(value_changed("PV:SUPERIOR", 1.0))
+        report = batch.flush()
+        self.assertEqual((report.pending, report.violations), (1, 0))
+        self.assertEqual(batch.flush().pending, 0)
+
+    def test_non_scalar_and_removal(self):
+        q: queue.Queue = queue.Queue()
+        batch = BatchEvaluator()
+        entry = create_entry("PV:RANGE", ConditionEnums.OutOfRange, "0:10", q)
+        batch.add_entry(entry)
+
+        # Values that do not fit the arrays are evaluated right away
+        entry.handle_value_change(value_changed("PV:RANGE", None))
+        self.assertEqual(batch.flush().pending, 0)
+
+        batch.remove_entry(entry)
+        self.assertEqual(len(batch), 0)
+        entry.handle_value_change(value_changed("PV:RANGE", 20.0))
+        self.assertEqual(q.qsize(), 1)
+        self.assertEqual(batch.flush().pending, 0)
@@ -0,0 +1,207 @@
+import queue
+import tempfile
+import threading
+import time
+import typing
+import unittest
+
+from mailpy.bus import BoundedEventQueue, EventBus, OverflowPolicy
+from mailpy.consumer import BaseEventConsumer
+
+
+class Event(typing.NamedTuple):
+    pvname: str
+    value: int
+
+
+def drain(q: BoundedEventQueue) -> typing.List[Event]:
+    events = []
+    while True:
+        try:
+            events.append(q.get(block=False))
+        except queue.Empty:
+            return events
+
+
+class RecordingConsumer(BaseEventConsumer):
+    def __init__(self, name: str, release: threading.Event, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self.release = release
+        self.events = []
+        self.received = threading.Event()
+
+    def handle(self, obj):
+        self.release.wait()
+        self.events.append(obj)
+        self.received.set()
+
+
+class TestBoundedEventQueue(unittest.TestCase):
+    def test_drop_oldest(self):
+        q = BoundedEventQueue(maxsize=3, policy=OverflowPolicy.DropOldest)
+        for i in range(5):
+            q.put(Event("PV", i))
+
+        self.assertEqual([e.value for e in drain(q)], [2, 3, 4])
+        stats = q.stats
+        self.assertEqual((stats.published, stats.delivered, stats.dropped), (5, 3, 2))
+
+    def test_coalesce(self):
+        q = BoundedEventQueue(maxsize=2, policy=OverflowPolicy.Coalesce)
+        q.put(Event("A", 0))
+        q.put(Event("B", 0))
+        # Replaces the pending A in place
+        q.put(Event("A", 1))
+        # No pending C, the oldest event is dropped
+        q.put(Event("C", 0))
+
+        self.assertEqual(drain(q), [Event("B", 0), Event("C", 0)])
+        self.assertEqual((q.stats.coalesced, q.stats.dropped), (1, 1))
+
+    def test_spill_keeps_order(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            q = BoundedEventQueue(
+                maxsize=2, policy=OverflowPolicy.Spill, spill_dir=spill_dir
+            )
+            for i in range(10):
+                q.put(Event("PV", i))
+            self.assertEqual((q.stats.depth, q.stats.spilled), (10, 8))
+
+            self.assertEqual(q.get().value, 0)
+            q.put(Event("PV", 10))
+            self.assertEqual([e.value for e in drain(q)], list(range(1, 11)))
+            self.assertEqual(q.stats.spilled, 0)
+            q.close()
+
+    def test_block_timeout(self):
+        q = BoundedEventQueue(
+            maxsize=1, policy=OverflowPolicy.Block, block_timeout=0.01
+        )
+        q.put(Event("PV", 0))
+        q.put(Event("PV", 1))
+        self.assertEqual(q.stats.dropped, 1)
+
+        self.assertEqual(q.get(timeout=0.01).value, 0)
+        with self.assertRaises(queue.Empty):
+            q.get(timeout=0.01)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            BoundedEventQueue(maxsize=0)
+        with self.assertRaises(ValueError):
+            BoundedEventQueue(policy="asd")
+
+
+class TestEventBus(unittest.TestCase):
+    def test_slow_consumer(self):
+        stalled, running = threading.Event(), threading.Event()
+        running.set()
+        slow = RecordingConsumer(
+            "slow", stalled, maxsize=10, policy=OverflowPolicy.DropOldest
+        )
+        fast = RecordingConsumer("fast", running, maxsize=1000)
+        bus = EventBus([slow, fast])
+        bus.start()
+
+        for i in range(500):
+            bus.publish(Event(f"PV{i}", i))
+
+        # The stalled consumer holds one event and at most maxsize pending
+        stats = bus.stats()
+        self.assertLessEqual(stats["slow"].depth, 10)
+        self.assertGreaterEqual(stats["slow"].dropped, 489)
+        self.assertGreaterEqual(stats["slow"].lag, 0)
+        self.assertEqual(stats["fast"].dropped, 0)
+
+        for _ in range(50):
+            if len(fast.events) == 500:
+                break
+            fast.received.wait(timeout=0.1)
+            fast.received.clear()
+        self.assertEqual(len(fast.events), 500)
+        stalled.set()
+
+
+class SleepingConsumer(BaseEventConsumer):
+    """I/O bound sink"""
+
+    def __init__(self, delay: float, **kwargs):
+        super().__init__(name="sleeping", **kwargs)
+        self.delay = delay
+        self.events = []
+        self.lock = threading.Lock()
+
+    def handle(self, obj):
+        time.sleep(self.delay)
+        with self.lock:
+            self.events.append(obj)
+
+
+class TestConsumerWorkers(unittest.TestCase):
+    def test_graceful_join(self):
+        consumer = SleepingConsumer(0.001, workers=3)
+        consumer.start()
+        for i in range(30):
+            consumer.add(Event("PV", i))
+
+        # Returns once the pending events are handled instead of blocking in get
+        consumer.join(timeout=5)
+        self.assertEqual(len(consumer.events), 30)
+        self.assertFalse(any(t.is_alive() for t in consumer._threads))
+
+    def test_order_per_key(self):
+        first_handled = threading.Event()
+
+        def slow_key(e):
+            # Gives another worker the chance to take and handle the next events of
+            # the key before the first one is claimed
+            if e.value == 0:
+                first_handled.wait(timeout=0.2)
+            return e.pvname
+
+        consumer = SleepingConsumer(0, workers=2, order_key=slow_key)
+        handle = consumer.handle
+
+        def handle_and_signal(obj):
+            handle(obj)
+            first_handled.set()
+
+        consumer.handle = handle_and_signal
+        for i in range(3):
+            consumer.add(Event("PV", i))
+        consumer.start()
+        consumer.join(timeout=5)
+
+        self.assertEqual([e.value for e in consumer.events], [0, 1, 2])
+
+    def test_order_with_bounded_parking(self):
+        # One parking slot, the other workers wait to park with the key still owned
+        consumer = SleepingConsumer(
+            0.001, workers=4, order_key=lambda e: e.pvname, maxsize=1000
+        )
+        consumer._max_parked = 1
+        for i in range(60):
+            consumer.add(Event(f"PV{i % 2}", i))
+        consumer.start()
+        consumer.join(timeout=5)
+
+        self.assertEqual(len(consumer.events), 60)
+        for pv in range(2):
+            values = [e.value for e in consumer.events if e.pvname == f"PV{pv}"]
+            self.assertEqual(values, sorted(values))
+
+    def test_workers_scale(self):
+        elapsed = {}
+        for workers in (1, 4):
+            consumer = SleepingConsumer(0.01, workers=workers)
+            for i in range(40):
+                consumer.add(Event(f"PV{i}", i))
+            t0 = time.perf_counter()
+            consumer.start()
+            consumer.join(timeout=5)
+            elapsed[workers] = time.perf_counter() - t0
+        self.assertLess(elapsed[4], elapsed[1] / 2)
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            SleepingConsumer(0, workers=0)
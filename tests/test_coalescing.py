@@ -0,0 +1,41 @@
+import threading
+import unittest
+
+from mailpy.coalescing import CoalescingDispatcher
+
+
+class RecordingTarget:
+    def __init__(self):
+        self.values = []
+        self.evaluated = threading.Event()
+
+    def evaluate(self, data):
+        self.values.append(data)
+        self.evaluated.set()
+
+
+class TestCoalescingDispatcher(unittest.TestCase):
+    def test_burst_collapses(self):
+        dispatcher = CoalescingDispatcher(workers=2)
+        first, second = RecordingTarget(), RecordingTarget()
+
+        for i in range(100):
+            dispatcher.submit(first, i)
+        dispatcher.submit(second, "value")
+
+        dispatcher.start()
+        self.assertTrue(first.evaluated.wait(timeout=5))
+        self.assertTrue(second.evaluated.wait(timeout=5))
+        dispatcher.stop()
+
+        self.assertEqual(first.values, [99])
+        self.assertEqual(second.values, ["value"])
+
+        stats = dispatcher.stats
+        self.assertEqual(stats.received, 101)
+        self.assertEqual(stats.coalesced, 99)
+        self.assertEqual(stats.evaluated, 2)
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            CoalescingDispatcher(workers=0)
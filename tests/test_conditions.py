@@ -1,15 +1,25 @@
 import unittest
 
+import numpy
+
 from mailpy.entities.condition import (
+    AlarmSeverity,
     Condition,
+    ConditionAlarmSeverity,
+    ConditionCheckResponse,
+    ConditionDecreasingStep,
     ConditionEnums,
     ConditionException,
     ConditionIncreasingStep,
     ConditionInferiorThan,
     ConditionOutOfRange,
+    ConditionRegistry,
     ConditionSuperiorThan,
+    MonitorMask,
     create_condition,
 )
+from mailpy.entities.entry import ValueChangedInfo
+from mailpy.entities.expression import ConditionExpression
 
 
 class AlarmConditionTest(unittest.TestCase):
@@ -95,6 +105,46 @@ class AlarmConditionTest(unittest.TestCase):
                 self.assertIsNone(_alarm_check)
             self.assertEqual(expected_level, condition.step_level)
 
+    def test_decreasing_step(self):
+        condition: ConditionDecreasingStep = self._create_condition(
+            ConditionEnums.DecreasingStep, "0:1:2:3", ConditionDecreasingStep
+        )
+        self.check_condition_inputs(condition)
+
+        self.assertEqual(condition.step_level, 4)
+        sequence = [
+            (5, 4, False),
+            (2.5, 3, True),
+            (3, 4, False),
+            (0.5, 1, True),
+            (1.5, 2, False),
+            (-1, 0, True),
+            (-10, 0, False),
+        ]
+        for input, expected_level, has_alarmed in sequence:
+            _alarm_check = condition.check_alarm(input)
+            if has_alarmed:
+                self.assertIsNotNone(_alarm_check)
+            else:
+                self.assertIsNone(_alarm_check)
+            self.assertEqual(expected_level, condition.step_level)
+
+        # The lowest element sets the level of an array
+        condition.check_alarm(5.0)
+        response = condition.check_alarm(numpy.array([3.5, 1.5, 2.5]))
+        self.assertIsNotNone(response)
+        self.assertEqual(response.extras["worst_index"], 1)
+        self.assertEqual(condition.step_level, 2)
+
+    def test_step_level_lookup(self):
+        step_values = ":".join(str(v) for v in range(-250, 250))
+        condition = create_condition(
+            condition=ConditionEnums.IncreasingStep, alarm_values=step_values
+        )
+        for value in [-1000, -250, -249.5, 0, 0.1, 249, 249.9, 1000]:
+            linear = sum(1 for v in condition.step_values if v <= value)
+            self.assertEqual(condition.find_level_for_value(value), linear)
+
     def test_inferior_than(self):
         alarm = 10
         condition = self._create_condition(
@@ -145,3 +195,209 @@ class AlarmConditionTest(unittest.TestCase):
 
         self.assertIsNotNone(condition.check_alarm(alarm_min - 1))
         self.assertIsNotNone(condition.check_alarm(alarm_max + 1))
+
+    def test_array_inputs(self):
+        condition = create_condition(
+            condition=ConditionEnums.OutOfRange, alarm_values="0:10"
+        )
+        with self.assertRaises(ConditionException):
+            condition.check_alarm(numpy.array(["a", "b"]))
+
+        self.assertIsNone(condition.check_alarm(numpy.array([], dtype=float)))
+        self.assertIsNone(condition.check_alarm(numpy.linspace(0, 10, 100)))
+
+    def test_array_out_of_range(self):
+        condition = create_condition(
+            condition=ConditionEnums.OutOfRange, alarm_values="0:10"
+        )
+        value = numpy.array([1.0, -1.0, 5.0, 12.0, 30.0, 9.0])
+        response = condition.check_alarm(value)
+        self.assertIsNotNone(response)
+        self.assertEqual(response.extras["indices"], [1, 3, 4])
+        self.assertEqual(response.extras["violations"], 3)
+        self.assertEqual(response.extras["worst_index"], 4)
+        self.assertEqual(response.extras["worst_value"], 30.0)
+
+        # Only a limited amount of indices is reported
+        response = condition.check_alarm(numpy.full(1000, -1, dtype=numpy.int32))
+        self.assertEqual(response.extras["violations"], 1000)
+        self.assertLess(len(response.extras["indices"]), 1000)
+
+    def test_array_thresholds(self):
+        superior = create_condition(
+            condition=ConditionEnums.SuperiorThan, alarm_values="10"
+        )
+        inferior = create_condition(
+            condition=ConditionEnums.InferiorThan, alarm_values="10"
+        )
+        value = numpy.array([11, 10, 2, 15])
+
+        response = superior.check_alarm(value)
+        self.assertEqual(response.extras["indices"], [0, 3])
+        self.assertEqual(response.extras["worst_value"], 15)
+
+        response = inferior.check_alarm(value)
+        self.assertEqual(response.extras["indices"], [2])
+        self.assertEqual(response.extras["worst_value"], 2)
+
+        self.assertIsNone(superior.check_alarm(numpy.zeros(10)))
+        self.assertIsNone(inferior.check_alarm(numpy.full(10, 20.0)))
+
+    def test_array_increasing_step(self):
+        condition = create_condition(
+            condition=ConditionEnums.IncreasingStep, alarm_values="0:1:2:3"
+        )
+        self.assertIsNone(condition.check_alarm(numpy.array([-1.0, -0.5])))
+        response = condition.check_alarm(numpy.array([-1.0, 2.5, 0.5]))
+        self.assertIsNotNone(response)
+        self.assertEqual(condition.step_level, 3)
+        self.assertEqual(response.extras["worst_index"], 1)
+        self.assertIsNone(condition.check_alarm(numpy.array([2.1, 2.2])))
+
+    def test_alarm_severity(self):
+        condition = self._create_condition(
+            ConditionEnums.AlarmSeverity, "MAJOR", ConditionAlarmSeverity
+        )
+        self.assertEqual(condition.alarm_severity, AlarmSeverity.Major)
+        self.assertEqual(condition.monitor_mask, MonitorMask.Alarm)
+        self.check_condition_inputs(condition)
+
+        for limits in ["NO_ALARM", "0", "4", "HIGH"]:
+            with self.assertRaises(ConditionException):
+                create_condition(
+                    condition=ConditionEnums.AlarmSeverity, alarm_values=limits
+                )
+
+        def data(severity: int) -> ValueChangedInfo:
+            return ValueChangedInfo(
+                pvname="TestPV", value=1.0, status=0, host="host", severity=severity
+            )
+
+        self.assertIsNone(condition.evaluate(data(AlarmSeverity.NoAlarm)))
+        self.assertIsNone(condition.evaluate(data(AlarmSeverity.Minor)))
+        self.assertIsNotNone(condition.evaluate(data(AlarmSeverity.Major)))
+        self.assertIsNotNone(condition.evaluate(data(AlarmSeverity.Invalid)))
+
+        # Value based conditions keep the default subscription
+        superior = create_condition(
+            condition=ConditionEnums.SuperiorThan, alarm_values="10"
+        )
+        self.assertEqual(superior.monitor_mask, MonitorMask.Default)
+        self.assertIsNotNone(
+            superior.evaluate(data(AlarmSeverity.NoAlarm)._replace(value=11.0))
+        )
+
+    def test_registry_sharing(self):
+        first = create_condition(
+            condition=ConditionEnums.OutOfRange, alarm_values="0:10"
+        )
+        second = create_condition(
+            condition=ConditionEnums.OutOfRange, alarm_values="0:10"
+        )
+        other = create_condition(
+            condition=ConditionEnums.OutOfRange, alarm_values="0:5"
+        )
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertFalse(hasattr(first, "__dict__"))
+
+        # Stateful conditions are never shared
+        step = create_condition(
+            condition=ConditionEnums.IncreasingStep, alarm_values="1:2"
+        )
+        self.assertIsNot(
+            step,
+            create_condition(
+                condition=ConditionEnums.IncreasingStep, alarm_values="1:2"
+            ),
+        )
+
+    def test_registry_plugin(self):
+        class ConditionEqual(Condition):
+            __slots__ = ("alarm_value",)
+
+            def __init__(self, limits: str) -> None:
+                super().__init__(limits)
+                self.alarm_value = float(limits)
+
+            @property
+            def name(self) -> str:
+                return "equal"
+
+            def check_alarm(self, value):
+                if value == self.alarm_value:
+                    return ConditionCheckResponse(
+                        message=f"equal to {self.alarm_value}"
+                    )
+                return None
+
+        registry = ConditionRegistry()
+        registry.register("equal", ConditionEqual)
+        self.assertEqual(registry.names, ["equal"])
+
+        condition = registry.create("equal", "3")
+        self.assertIs(condition, registry.create("equal", "3"))
+        self.assertEqual(registry.shared, 1)
+        self.assertIsNotNone(condition.check_alarm(3.0))
+        self.assertIsNone(condition.check_alarm(2.0))
+
+        with self.assertRaises(ConditionException):
+            registry.register("equal", ConditionOutOfRange)
+        with self.assertRaises(ConditionException):
+            registry.create(ConditionEnums.OutOfRange, "0:1")
+
+    def test_expression(self):
+        text = "value < 3 or value > 7.5 and severity >= MAJOR"
+        condition = self._create_condition(
+            ConditionEnums.Expression, text, ConditionExpression
+        )
+        self.check_condition_inputs(condition)
+        self.assertIs(
+            condition,
+            create_condition(condition=ConditionEnums.Expression, alarm_values=text),
+        )
+
+        def data(value, severity: int) -> ValueChangedInfo:
+            return ValueChangedInfo(
+                pvname="TestPV", value=value, status=0, host="host", severity=severity
+            )
+
+        self.assertIsNotNone(condition.evaluate(data(2.0, AlarmSeverity.NoAlarm)))
+        self.assertIsNone(condition.evaluate(data(5, AlarmSeverity.Invalid)))
+        self.assertIsNone(condition.evaluate(data(8.0, AlarmSeverity.Minor)))
+        self.assertIsNotNone(condition.evaluate(data(8.0, AlarmSeverity.Major)))
+        self.assertIsNone(condition.check_alarm(8.0))
+        self.assertEqual(condition.monitor_mask, MonitorMask.Default)
+
+        severity_only = create_condition(
+            condition=ConditionEnums.Expression, alarm_values="severity == INVALID"
+        )
+        self.assertEqual(severity_only.monitor_mask, MonitorMask.Alarm)
+
+        arithmetic = create_condition(
+            condition=ConditionEnums.Expression, alarm_values="abs(value - 10) > 2"
+        )
+        self.assertIsNotNone(arithmetic.check_alarm(7.5))
+        self.assertIsNone(arithmetic.check_alarm(11))
+
+        division = create_condition(
+            condition=ConditionEnums.Expression, alarm_values="1 / value > 2"
+        )
+        with self.assertRaises(ConditionException):
+            division.check_alarm(0)
+
+        for invalid in [
+            "value >",
+            "__import__('os').system('ls')",
+            "value.real > 1",
+            "[value][0] > 1",
+            "value ** 2 > 1",
+            "temperature > 1",
+            "value > 'a'",
+            "lambda: 1",
+            "print(value)",
+        ]:
+            with self.assertRaises(ConditionException):
+                create_condition(
+                    condition=ConditionEnums.Expression, alarm_values=invalid
+                )
@@ -0,0 +1,211 @@
+import queue
+import time
+import unittest
+
+from mailpy.data_connector import (
+    BaseConnector,
+    BaseDataSource,
+    DataConnector,
+    EpicsConnector,
+)
+from mailpy.entities import ConditionEnums, Entry, EntryData, Group, MonitorMask
+from mailpy.entities.group import GroupData
+from mailpy.replay import ReplayDataSource, ReplayRecord
+
+
+class DummyConnector:
+    def __init__(self):
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+
+class TestDataConnectorTick(unittest.TestCase):
+    def test_sharded_tick(self):
+        connector = DataConnector(db=None, event_queue=queue.Queue(), tick_workers=3)
+        connector._connectors = {f"PV{i}": DummyConnector() for i in range(10)}
+
+        reports = connector.tick()
+        self.assertEqual(len(reports), 3)
+        self.assertEqual(sorted(r.shard for r in reports), [0, 1, 2])
+        self.assertEqual(sum(r.connectors for r in reports), 10)
+        for c in connector._connectors.values():
+            self.assertEqual(c.ticks, 1)
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            DataConnector(db=None, event_queue=queue.Queue(), tick_workers=0)
+
+
+class FakeDB:
+    def get_group(self, name: str) -> GroupData:
+        return GroupData(id=name, name=name, enabled=True, description="")
+
+
+class PendingConnector(BaseConnector):
+    def __init__(self, pvname: str, source: "PendingSource"):
+        super().__init__(pvname)
+        self._source = source
+        self.monitor_started_after_wait = None
+
+    @property
+    def connected(self) -> bool:
+        return self.pvname in self._source.reachable
+
+    def start_monitor(self):
+        self.monitor_started_after_wait = self._source.waited
+
+
+class PendingSource(BaseDataSource):
+    """Only the reachable PVs connect, the others stay pending until the deadline"""
+
+    def __init__(self, reachable):
+        self.reachable = set(reachable)
+        self.connectors = []
+        self.waited = False
+        self.deadline = None
+
+    def create_connector(self, pvname, monitor=True, dispatcher=None):
+        connector = PendingConnector(pvname, self)
+        self.connectors.append(connector)
+        return connector
+
+    def wait_connections(self, connectors, deadline):
+        self.deadline = deadline
+        pending = [c for c in connectors if not c.connected]
+        while pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.waited = True
+        return pending
+
+
+class TestDataConnectorStartup(unittest.TestCase):
+    def _entry_data(self, pvname: str) -> EntryData:
+        return EntryData(
+            alarm_values="1",
+            condition=ConditionEnums.SuperiorThan,
+            email_timeout=0,
+            emails=[""],
+            group="gtest",
+            id=pvname,
+            pvname=pvname,
+            subject="",
+            unit="",
+            warning_message="",
+        )
+
+    def test_startup_report(self):
+        source = PendingSource(reachable=["PV:A", "PV:C"])
+        connector = DataConnector(db=FakeDB(), event_queue=queue.Queue(), source=source)
+
+        start = time.monotonic()
+        report = connector.create_entries(
+            [self._entry_data(pvname) for pvname in ["PV:A", "PV:B", "PV:C", "PV:D"]],
+            connection_timeout=0.2,
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(sorted(report.connected), ["PV:A", "PV:C"])
+        self.assertEqual(report.pending, ["PV:B", "PV:D"])
+        # One deadline for every PV, the pending ones are waited for connection_timeout
+        self.assertAlmostEqual(source.deadline - start, 0.2, delta=0.05)
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 2.0)
+        self.assertGreaterEqual(report.duration, 0.2)
+        # The monitors are only attached once the wait is over
+        self.assertEqual(len(source.connectors), 4)
+        for c in source.connectors:
+            self.assertTrue(c.monitor_started_after_wait)
+
+    def test_startup_all_connected(self):
+        source = PendingSource(reachable=["PV:A", "PV:B"])
+        connector = DataConnector(db=FakeDB(), event_queue=queue.Queue(), source=source)
+
+        report = connector.create_entries(
+            [self._entry_data(pvname) for pvname in ["PV:A", "PV:B"]],
+            connection_timeout=5.0,
+        )
+        self.assertEqual(sorted(report.connected), ["PV:A", "PV:B"])
+        self.assertEqual(report.pending, [])
+        # Nothing pending, the deadline is not waited for
+        self.assertLess(report.duration, 1.0)
+
+
+class TestEpicsConnectorMask(unittest.TestCase):
+    def test_mask_from_entries(self):
+        g = Group("1", "gtest", True)
+        data = EntryData(
+            alarm_values="MINOR",
+            condition=ConditionEnums.AlarmSeverity,
+            email_timeout=0,
+            emails=[""],
+            group=g,
+            id="e1",
+            pvname="MAILPY:TEST:MASK",
+            subject="",
+            unit="",
+            warning_message="",
+        )
+        severity = Entry(entry_data=data, group=g, event_queue=queue.Queue())
+        value = Entry(
+            entry_data=data._replace(
+                id="e2", condition=ConditionEnums.SuperiorThan, alarm_values="1"
+            ),
+            group=g,
+            event_queue=queue.Queue(),
+        )
+
+        connector = EpicsConnector(data.pvname, monitor=False)
+        connector.add_entry(severity)
+        self.assertEqual(connector.monitor_mask, MonitorMask.Alarm)
+
+        connector.add_entry(value)
+        self.assertEqual(connector.monitor_mask, MonitorMask.Default)
+
+        connector.remove_entry(value)
+        self.assertEqual(connector.monitor_mask, MonitorMask.Alarm)
+
+
+class TestDerivedFanOut(unittest.TestCase):
+    def test_dependency_index(self):
+        g = Group("1", "gtest", True)
+        q: queue.Queue = queue.Queue()
+
+        def derived(id: str, formula: str) -> Entry:
+            return Entry(
+                entry_data=EntryData(
+                    alarm_values="10",
+                    condition=ConditionEnums.SuperiorThan,
+                    email_timeout=0,
+                    emails=[""],
+                    group=g,
+                    id=id,
+                    pvname=id,
+                    subject="",
+                    unit="",
+                    warning_message="",
+                    formula=formula,
+                ),
+                group=g,
+                event_queue=q,
+            )
+
+        records = [
+            ReplayRecord(timestamp=0, pvname="PV:A", value=4.0),
+            ReplayRecord(timestamp=1, pvname="PV:B", value=4.0),
+            ReplayRecord(timestamp=2, pvname="PV:C", value=1.0),
+            # Only the sum depends on PV:C
+            ReplayRecord(timestamp=3, pvname="PV:C", value=8.0),
+        ]
+        source = ReplayDataSource(records, speedup=0)
+        connector = DataConnector(db=None, event_queue=q, source=source)
+        connector.add_entry(derived("SUM", "{PV:A} + {PV:B} + {PV:C}"))
+        connector.add_entry(derived("DIFF", "{PV:A} - {PV:B}"))
+
+        self.assertEqual(sorted(connector._connectors), ["PV:A", "PV:B", "PV:C"])
+        self.assertEqual(len(connector._connectors["PV:A"]._dependents), 2)
+        self.assertEqual(len(connector._connectors["PV:C"]._dependents), 1)
+
+        source.run()
+        self.assertEqual([q.get_nowait().pvname for _ in range(q.qsize())], ["SUM"])
@@ -71,3 +71,30 @@ class TestDatabaseInteraction(unittest.TestCase):
 
     def tearDown(self):
         self.container.stop()
+
+
+class TestParseEntry(unittest.TestCase):
+    def test_null_optional_fields(self):
+        entry = DBManager(connector=None)._parse_entry(
+            {
+                "_id": "id",
+                "pvname": "PV",
+                "emails": "a@example.com",
+                "condition": "superior than",
+                "alarm_values": "1",
+                "unit": "V",
+                "warning_message": "",
+                "subject": "",
+                "email_timeout": 10,
+                "group": "group",
+                "deadband": None,
+                "deadband_mode": None,
+                "hysteresis": None,
+                "formula": None,
+                "duration": None,
+            }
+        )
+        self.assertEqual((entry.deadband, entry.deadband_mode), (0.0, "absolute"))
+        self.assertEqual(entry.hysteresis, 0.0)
+        self.assertEqual(entry.formula, "")
+        self.assertEqual(entry.duration, 0.0)
@@ -1,9 +1,25 @@
+import pickle
 import queue
 import unittest
+from unittest import mock
 
-from mailpy.entities.condition import ConditionEnums
-from mailpy.entities.entry import AlarmEvent, Entry, EntryData, ValueChangedInfo
-from mailpy.entities.event import create_alarm_event
+import numpy
+
+from mailpy.entities.condition import ConditionEnums, ConditionException, MonitorMask
+from mailpy.entities.deadband import (
+    Deadband,
+    DeadbandEnums,
+    DeadbandException,
+    create_deadband,
+)
+from mailpy.entities.entry import (
+    AlarmEvent,
+    AlarmState,
+    Entry,
+    EntryData,
+    ValueChangedInfo,
+)
+from mailpy.entities.event import EventType, create_alarm_event
 from mailpy.entities.group import Group
 
 
@@ -43,6 +59,28 @@ class TestEntry(unittest.TestCase):
         self.assertIsNotNone(e1.ts)
         self.assertNotEqual(e1.ts, e2.ts)
 
+    def test_alarm_event_slots(self):
+        event = create_alarm_event(
+            pvname="name",
+            condition="cond",
+            emails=["a@example.com"],
+            specified_value_message="",
+            subject="",
+            unit="",
+            value_measured=1.5,
+            warning="",
+            extras={"indices": [1]},
+        )
+        self.assertFalse(hasattr(event, "__dict__"))
+        self.assertEqual(event.to_dict()["extras"], {"indices": [1]})
+        self.assertEqual(event.to_dict()["value_measured"], "1.5")
+
+        # Sent pickled from the monitor processes
+        copy = pickle.loads(pickle.dumps(event))
+        self.assertEqual(copy.to_dict().keys(), event.to_dict().keys())
+        self.assertEqual(copy.pvname, event.pvname)
+        self.assertEqual(copy.ts.utc_str, event.ts.utc_str)
+
     def test_validations(self):
         q = queue.Queue()
         g = Group("1", "gtest", True)
@@ -124,3 +162,299 @@ class TestEntry(unittest.TestCase):
             )
         )
         self.assertEqual(q.qsize(), 0)
+
+    def test_entry_array_value(self):
+        q = queue.Queue()
+
+        g = Group("1", "gtest", True)
+        entry = Entry(
+            entry_data=EntryData(
+                alarm_values="1:2",
+                condition=ConditionEnums.OutOfRange,
+                email_timeout=0,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+            ),
+            group=g,
+            event_queue=q,
+        )
+        entry.handle_value_change(
+            ValueChangedInfo(
+                pvname="TestPV",
+                value=numpy.array([1.5, 1.5, 7.0, 0.0]),
+                status=1,
+                host="host",
+                severity=0,
+            )
+        )
+        event = q.get_nowait()
+        self.assertEqual(event.value_measured, "7.0")
+        self.assertEqual(event.extras["indices"], [2, 3])
+
+    def test_entry_deadband(self):
+        q = queue.Queue()
+
+        g = Group("1", "gtest", True)
+        entry = Entry(
+            entry_data=EntryData(
+                alarm_values="1:2",
+                condition=ConditionEnums.OutOfRange,
+                email_timeout=0,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+                deadband=0.5,
+            ),
+            group=g,
+            event_queue=q,
+        )
+
+        for value in [0, 0.1, 0.2, 0.49, 0.6]:
+            entry.handle_value_change(
+                ValueChangedInfo(
+                    pvname="TestPV",
+                    value=value,
+                    status=1,
+                    host="host",
+                    severity=0,
+                )
+            )
+        self.assertEqual(q.qsize(), 2)
+        self.assertEqual(entry.deadband_skipped, 3)
+        self.assertEqual(entry.deadband.passed, 2)
+
+    def test_entry_monitor_mask(self):
+        g = Group("1", "gtest", True)
+        data = EntryData(
+            alarm_values="1:2",
+            condition=ConditionEnums.OutOfRange,
+            email_timeout=0,
+            emails=[""],
+            group=g,
+            id="e1",
+            pvname="TestPV",
+            subject="",
+            unit="",
+            warning_message="",
+        )
+        entry = Entry(entry_data=data, group=g, event_queue=queue.Queue())
+        self.assertEqual(entry.monitor_mask, MonitorMask.Default)
+
+        # The client side deadband is honoured by the IOC archive deadband
+        entry = Entry(
+            entry_data=data._replace(deadband=0.5), group=g, event_queue=queue.Queue()
+        )
+        self.assertEqual(entry.monitor_mask, MonitorMask.Log | MonitorMask.Alarm)
+
+        entry = Entry(
+            entry_data=data._replace(
+                condition=ConditionEnums.AlarmSeverity, alarm_values="MINOR"
+            ),
+            group=g,
+            event_queue=queue.Queue(),
+        )
+        self.assertEqual(entry.monitor_mask, MonitorMask.Alarm)
+
+    def test_entry_hysteresis(self):
+        q = queue.Queue()
+        g = Group("1", "gtest", True)
+        data = EntryData(
+            alarm_values="10",
+            condition=ConditionEnums.SuperiorThan,
+            email_timeout=0,
+            emails=[""],
+            group=g,
+            id="e1",
+            pvname="TestPV",
+            subject="subject",
+            unit="",
+            warning_message="",
+            hysteresis=1.0,
+            notify_normal=True,
+        )
+        entry = Entry(entry_data=data, group=g, event_queue=q)
+        self.assertEqual(entry.state, AlarmState.Ok)
+
+        # Chatter around the limit only alarms once
+        for value in [9.0, 10.5, 9.5, 10.2, 9.8, 10.9]:
+            entry.handle_value_change(
+                ValueChangedInfo(
+                    pvname="TestPV", value=value, status=1, host="host", severity=0
+                )
+            )
+        self.assertEqual(q.qsize(), 1)
+        self.assertEqual(q.get_nowait().type, EventType.ALARM)
+        self.assertEqual(entry.state, AlarmState.Alarm)
+
+        entry.handle_value_change(
+            ValueChangedInfo(
+                pvname="TestPV", value=8.5, status=1, host="host", severity=0
+            )
+        )
+        self.assertEqual(entry.state, AlarmState.Cleared)
+        event = q.get_nowait()
+        self.assertEqual(event.type, EventType.NORMAL)
+        self.assertEqual(event.subject, "[Normal] subject")
+
+        with self.assertRaises(ConditionException):
+            Entry(
+                entry_data=data._replace(
+                    condition=ConditionEnums.IncreasingStep, alarm_values="1:2"
+                ),
+                group=g,
+                event_queue=q,
+            )
+
+    def test_alarm_evaluated_once(self):
+        q = queue.Queue()
+        g = Group("1", "gtest", True)
+        entry = Entry(
+            entry_data=EntryData(
+                alarm_values="10",
+                condition=ConditionEnums.SuperiorThan,
+                email_timeout=0,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+            ),
+            group=g,
+            event_queue=q,
+        )
+        value = ValueChangedInfo(
+            pvname="TestPV", value=11.0, status=1, host="host", severity=0
+        )
+        entry.handle_value_change(value)
+        self.assertEqual(entry.state, AlarmState.Alarm)
+        q.get_nowait()
+
+        # Still in alarm past the cooldown, the clear check and the event share one evaluation
+        condition = type(entry._condition)
+        with mock.patch.object(
+            condition, "evaluate", autospec=True, side_effect=condition.evaluate
+        ) as evaluate:
+            entry.handle_value_change(value)
+        self.assertEqual(evaluate.call_count, 1)
+        self.assertEqual(q.get_nowait().value_measured, "11.0")
+        self.assertEqual(entry.state, AlarmState.Alarm)
+
+    def test_derived_entry(self):
+        q = queue.Queue()
+        g = Group("1", "gtest", True)
+        entry = Entry(
+            entry_data=EntryData(
+                alarm_values="5",
+                condition=ConditionEnums.SuperiorThan,
+                email_timeout=0,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="LA-CN:DeltaT",
+                subject="",
+                unit="",
+                warning_message="",
+                formula="{LA-CN:Supply} - {LA-CN:Return}",
+            ),
+            group=g,
+            event_queue=q,
+        )
+        self.assertEqual(entry.inputs, ["LA-CN:Supply", "LA-CN:Return"])
+
+        def update(pvname: str, value: float, severity: int = 0):
+            entry.handle_input_change(
+                ValueChangedInfo(
+                    pvname=pvname, value=value, status=0, host="host", severity=severity
+                )
+            )
+
+        # Nothing is evaluated until every input is known
+        update("LA-CN:Supply", 30.0)
+        self.assertTrue(q.empty())
+
+        update("LA-CN:Return", 28.0)
+        self.assertTrue(q.empty())
+        update("LA-CN:Return", 20.0, severity=1)
+        event = q.get_nowait()
+        self.assertEqual(event.pvname, "LA-CN:DeltaT")
+        self.assertEqual(event.value_measured, "10.0")
+
+        for formula in ["no inputs", "{A} ** 2", "{A} +"]:
+            with self.assertRaises(ConditionException):
+                Entry(
+                    entry_data=EntryData(
+                        alarm_values="5",
+                        condition=ConditionEnums.SuperiorThan,
+                        email_timeout=0,
+                        emails=[""],
+                        group=g,
+                        id="e2",
+                        pvname="Derived",
+                        subject="",
+                        unit="",
+                        warning_message="",
+                        formula=formula,
+                    ),
+                    group=g,
+                    event_queue=q,
+                )
+
+
+class TestGroup(unittest.TestCase):
+    def test_group_state(self):
+        g = Group("1", "gtest", True, "desc")
+        snapshot = g.state
+        self.assertEqual(snapshot.version, 0)
+
+        g.enabled = False
+        self.assertFalse(g.enabled)
+        self.assertEqual(g.description, "desc")
+        self.assertEqual(g.state.version, 1)
+
+        # Snapshots taken before are left untouched
+        self.assertTrue(snapshot.enabled)
+
+        state = g.update(enabled=True, description="other")
+        self.assertIs(state, g.state)
+        self.assertEqual(
+            (state.version, state.enabled, state.description), (2, True, "other")
+        )
+
+
+class TestDeadband(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(DeadbandException):
+            Deadband(deadband=1, mode="asd")
+        with self.assertRaises(DeadbandException):
+            Deadband(deadband=-1)
+        self.assertIsNone(create_deadband(0, DeadbandEnums.Absolute))
+
+    def test_relative(self):
+        deadband = create_deadband(0.1, " Relative ")
+        self.assertTrue(deadband.accept(100.0))
+        self.assertFalse(deadband.accept(109.0))
+        self.assertTrue(deadband.accept(111.0))
+        self.assertFalse(deadband.accept(101.0))
+        self.assertTrue(deadband.accept(numpy.zeros(3)))
+        self.assertEqual(deadband.skipped, 2)
+
+    def test_numpy_scalars(self):
+        deadband = create_deadband(numpy.float64(1.0), DeadbandEnums.Absolute)
+        self.assertTrue(deadband.accept(numpy.float64(10.0)))
+        self.assertFalse(deadband.accept(numpy.int32(10)))
+        self.assertFalse(deadband.accept(numpy.float32(10.5)))
+        # Not a measurement, always goes through
+        self.assertTrue(deadband.accept(True))
+        with self.assertRaises(DeadbandException):
+            Deadband(deadband=True)
@@ -1,10 +1,14 @@
 import smtplib
+import threading
 import unittest
 
 from mailpy.entities.condition import ConditionEnums
 from mailpy.entities.event import create_alarm_event
 from mailpy.mail.client import MailClient, MailClientArgs, Settings
 from mailpy.mail.message import MessageContent, compose_msg_content
+from mailpy.mail.pool import SMTPConnectionPool
+
+from .smtp_server import FakeSMTPServer
 
 
 class TestMailClient(unittest.TestCase):
@@ -56,6 +60,97 @@ class TestMailClient(unittest.TestCase):
                 client.send_email(event=self.event_fixture)
 
 
+class TestSMTPConnectionPool(unittest.TestCase):
+    event_fixture = TestMailClient.event_fixture
+
+    def pool(self, port: int, **kwargs) -> SMTPConnectionPool:
+        args = MailClientArgs(
+            login="mailpy@example.com",
+            passwd="pass",
+            tls=True,
+            host="127.0.0.1",
+            port=port,
+        )
+        return SMTPConnectionPool(args=args, encryption=False, **kwargs)
+
+    def test_session_reused(self):
+        with FakeSMTPServer() as server:
+            pool = self.pool(server.port)
+            for _ in range(10):
+                pool.send_email(self.event_fixture)
+            pool.close()
+
+        self.assertEqual(len(server.messages), 10)
+        self.assertEqual(server.sessions, 1)
+        self.assertEqual(pool.stats.sent, 10)
+
+    def test_recycle_after_max_messages(self):
+        with FakeSMTPServer() as server:
+            pool = self.pool(server.port, max_messages=3)
+            for _ in range(7):
+                pool.send_email(self.event_fixture)
+            pool.close()
+
+        self.assertEqual(server.sessions, 3)
+        self.assertEqual(pool.stats.recycled, 2)
+
+    def test_reconnect_on_disconnect(self):
+        with FakeSMTPServer(drop_after=2) as server:
+            pool = self.pool(server.port)
+            for _ in range(5):
+                pool.send_email(self.event_fixture)
+            pool.close()
+
+        self.assertEqual(len(server.messages), 5)
+        self.assertEqual(pool.stats.reconnects, 2)
+
+    def test_keepalive(self):
+        with FakeSMTPServer() as server:
+            pool = self.pool(server.port)
+            pool.send_email(self.event_fixture)
+            # Every idle session is due, the background thread still waits
+            pool._keepalive_interval = 0
+            pool.keepalive()
+            self.assertEqual((server.noops, pool.stats.idle), (1, 1))
+
+            # Idle for too long, replaced by a new session
+            pool._max_idle = 0
+            pool.send_email(self.event_fixture)
+            pool.close()
+
+        self.assertEqual(server.sessions, 2)
+
+    def test_concurrent_sessions(self):
+        with FakeSMTPServer() as server:
+            pool = self.pool(server.port, size=3)
+            threads = [
+                threading.Thread(
+                    target=lambda: [
+                        pool.send_email(self.event_fixture) for _ in range(10)
+                    ]
+                )
+                for _ in range(6)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            pool.close()
+
+        self.assertEqual(len(server.messages), 60)
+        self.assertLessEqual(server.sessions, 3)
+
+    def test_refused_keeps_session(self):
+        with FakeSMTPServer(reject_rcpt=True) as server:
+            pool = self.pool(server.port)
+            for _ in range(2):
+                with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                    pool.send_email(self.event_fixture)
+            pool.close()
+
+        self.assertEqual(server.sessions, 1)
+
+
 #  def test_send_email(self):
 #     event = AlarmEvent(
 #          pvname="MailpyContinuousIntegrationTest",
@@ -0,0 +1,78 @@
+import unittest
+
+from mailpy.entities.entry import EntryData
+from mailpy.entities.event import AlarmEvent, create_alarm_event
+from mailpy.manager import Config
+from mailpy.multiprocess import MonitorProcessPool, partition_for
+
+
+class TestMonitorProcessPool(unittest.TestCase):
+    config = Config(
+        db_connection_string="mongodb://localhost:27017/mailpy",
+        email_login="",
+        email_password="",
+        email_server_host="",
+        email_server_port=0,
+        monitor_processes=3,
+    )
+
+    def test_partition(self):
+        for name in ["LA-CN:H1MPS-1:A2Temp2", "TestPV", ""]:
+            partition = partition_for(name, 3)
+            self.assertEqual(partition, partition_for(name, 3))
+            self.assertIn(partition, range(3))
+
+    def test_assign_entries(self):
+        pool = MonitorProcessPool(config=self.config, queue_size=10)
+        entries = [
+            EntryData(
+                id=str(i),
+                pvname=f"PV{i}",
+                emails=[""],
+                condition="out of range",
+                alarm_values="0:1",
+                unit="",
+                warning_message="",
+                subject="",
+                email_timeout=0,
+                group="g",
+            )
+            for i in range(30)
+        ]
+        pool.assign_entries(entries)
+
+        self.assertEqual(sum(len(p) for p in pool._partitions), len(entries))
+        for i, partition in enumerate(pool._partitions):
+            for entry_data in partition:
+                self.assertEqual(partition_for(entry_data.pvname, 3), i)
+
+    def test_event_queue(self):
+        pool = MonitorProcessPool(config=self.config, queue_size=10)
+        event = create_alarm_event(
+            pvname="PV",
+            condition="cond",
+            emails=[""],
+            specified_value_message="",
+            subject="",
+            unit="",
+            value_measured=1.0,
+            warning="",
+        )
+        pool.event_queue.put(event, block=False, timeout=None)
+        received = pool.event_queue.get(timeout=5)
+        self.assertIsInstance(received, AlarmEvent)
+        self.assertEqual(received.pvname, event.pvname)
+        self.assertEqual(received.ts.ts, event.ts.ts)
+
+    def test_invalid_processes(self):
+        with self.assertRaises(ValueError):
+            MonitorProcessPool(
+                config=Config(
+                    db_connection_string="",
+                    email_login="",
+                    email_password="",
+                    email_server_host="",
+                    email_server_port=0,
+                ),
+                queue_size=10,
+            )
@@ -0,0 +1,78 @@
+import os
+import queue
+import tempfile
+import time
+import unittest
+
+import numpy
+
+from mailpy.data_connector import DataConnector
+from mailpy.entities import ConditionEnums, Entry, EntryData, Group
+from mailpy.replay import ReplayDataSource, ReplayRecord, load_records, save_records
+
+
+def create_entry(pvname: str, event_queue: queue.Queue, **kwargs) -> Entry:
+    g = Group("1", "gtest", True)
+    data = EntryData(
+        alarm_values="0:10",
+        condition=ConditionEnums.OutOfRange,
+        email_timeout=0,
+        emails=[""],
+        group=g,
+        id=pvname,
+        pvname=pvname,
+        subject="",
+        unit="",
+        warning_message="",
+    )._replace(**kwargs)
+    return Entry(entry_data=data, group=g, event_queue=event_queue)
+
+
+class TestReplay(unittest.TestCase):
+    def test_records_file(self):
+        records = [
+            ReplayRecord(timestamp=1.0, pvname="PV:A", value=1.5, severity=0),
+            ReplayRecord(timestamp=2.0, pvname="PV:B", value=numpy.arange(3.0)),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "records.jsonl")
+            save_records(records, path)
+            loaded = load_records(path)
+
+        self.assertEqual(loaded[0], records[0])
+        self.assertEqual(loaded[1].pvname, "PV:B")
+        numpy.testing.assert_array_equal(loaded[1].value, records[1].value)
+
+    def test_replay_pipeline(self):
+        records = [
+            ReplayRecord(timestamp=float(i), pvname=f"PV:{i % 3}", value=float(i))
+            for i in range(30)
+        ]
+        source = ReplayDataSource(records, speedup=0)
+        event_queue: queue.Queue = queue.Queue()
+        connector = DataConnector(db=None, event_queue=event_queue, source=source)
+        for pvname in ["PV:0", "PV:1"]:
+            connector.add_entry(create_entry(pvname, event_queue))
+
+        stats = source.run()
+        self.assertEqual(stats.replayed, 20)
+        self.assertEqual(stats.unknown, 10)
+        # Six values above 10 for each of PV:0 and PV:1
+        self.assertEqual(event_queue.qsize(), 12)
+
+    def test_speedup(self):
+        records = [
+            ReplayRecord(timestamp=i / 10, pvname="PV:A", value=1.0) for i in range(11)
+        ]
+        source = ReplayDataSource(records, speedup=10)
+        source.create_connector("PV:A")
+
+        start = time.monotonic()
+        source.start()
+        source._thread.join(timeout=5)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(source.stats.replayed, 11)
+        source.stop()
+
+        with self.assertRaises(ValueError):
+            ReplayDataSource(records, speedup=-1)
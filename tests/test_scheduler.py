@@ -0,0 +1,248 @@
+import queue
+import unittest
+
+from mailpy.entities.condition import ConditionEnums, ConditionException
+from mailpy.entities.entry import AlarmEvent, Entry, EntryData, ValueChangedInfo
+from mailpy.entities.group import Group
+from mailpy.scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_run_pending(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        calls = []
+
+        scheduler.call_later(10, lambda: calls.append(10))
+        scheduler.call_later(5, lambda: calls.append(5))
+        cancelled = scheduler.call_later(7, lambda: calls.append(7))
+        cancelled.cancel()
+
+        self.assertEqual(scheduler.next_deadline(), 5)
+        self.assertEqual(scheduler.run_pending(), 0)
+
+        clock.now = 7
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(calls, [5])
+        self.assertEqual(scheduler.next_deadline(), 10)
+
+        clock.now = 100
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(calls, [5, 10])
+        self.assertIsNone(scheduler.next_deadline())
+
+    def test_failing_callback(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        calls = []
+
+        def fail():
+            raise RuntimeError("failed")
+
+        scheduler.call_later(0, fail)
+        scheduler.call_later(0, lambda: calls.append(True))
+        self.assertEqual(scheduler.run_pending(), 2)
+        self.assertEqual(calls, [True])
+
+
+class TestEntryCooldownExpiry(unittest.TestCase):
+    def _create_entry(self, scheduler, event_queue):
+        g = Group("1", "gtest", True)
+        return Entry(
+            entry_data=EntryData(
+                alarm_values="1:2",
+                condition=ConditionEnums.OutOfRange,
+                email_timeout=60,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+            ),
+            group=g,
+            event_queue=event_queue,
+            scheduler=scheduler,
+        )
+
+    def _value(self, value):
+        return ValueChangedInfo(
+            pvname="TestPV", value=value, status=1, host="host", severity=0
+        )
+
+    def test_reevaluate_when_in_alarm(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        clock.now = 1.5
+        entry.handle_value_change(self._value(0))
+        event = q.get_nowait()
+        self.assertIsInstance(event, AlarmEvent)
+        self.assertEqual(len(scheduler), 1)
+        # The clock is read once for the cooldown gate, the event and its dispatch
+        self.assertEqual(event.ts.monotonic, 1.5)
+        self.assertEqual(entry.last_event_time, 1.5)
+
+        # Still in alarm during the cooldown, nothing is dispatched
+        entry.handle_value_change(self._value(5))
+        self.assertEqual(q.qsize(), 0)
+
+        clock.now = 62
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertIsInstance(q.get_nowait(), AlarmEvent)
+        self.assertEqual(len(scheduler), 1)
+
+    def test_no_event_when_recovered(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        entry.handle_value_change(self._value(0))
+        self.assertIsInstance(q.get_nowait(), AlarmEvent)
+
+        entry.handle_value_change(self._value(1.5))
+
+        clock.now = 61
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(q.qsize(), 0)
+        self.assertEqual(len(scheduler), 0)
+
+    def test_reevaluate_after_group_enabled(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        entry.handle_value_change(self._value(0))
+        self.assertIsInstance(q.get_nowait(), AlarmEvent)
+
+        # Disabled at the expiry, the check is rescheduled instead of dropped
+        entry.group.enabled = False
+        clock.now = 61
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertEqual(q.qsize(), 0)
+        self.assertEqual(len(scheduler), 1)
+
+        entry.group.enabled = True
+        clock.now = 122
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.assertIsInstance(q.get_nowait(), AlarmEvent)
+
+
+class TestSchedulerCompaction(unittest.TestCase):
+    def test_compact_cancelled_calls(self):
+        scheduler = DeadlineScheduler(clock=FakeClock())
+        calls = [scheduler.call_later(10 + i, lambda: None) for i in range(100)]
+
+        for call in calls[:50]:
+            call.cancel()
+        self.assertEqual(len(scheduler), 100)
+
+        # Cancelling twice is not counted twice
+        calls[0].cancel()
+        calls[50].cancel()
+        self.assertEqual(len(scheduler), 49)
+        self.assertEqual(scheduler.next_deadline(), 61)
+
+
+class TestEntryDuration(unittest.TestCase):
+    def _create_entry(
+        self, scheduler, event_queue, condition=ConditionEnums.OutOfRange
+    ):
+        g = Group("1", "gtest", True)
+        return Entry(
+            entry_data=EntryData(
+                alarm_values=(
+                    "1:2" if condition == ConditionEnums.OutOfRange else "1:2:3"
+                ),
+                condition=condition,
+                email_timeout=60,
+                emails=[""],
+                group=g,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+                duration=5.0,
+            ),
+            group=g,
+            event_queue=event_queue,
+            scheduler=scheduler,
+        )
+
+    def _value(self, value):
+        return ValueChangedInfo(
+            pvname="TestPV", value=value, status=1, host="host", severity=0
+        )
+
+    def test_alarm_after_duration(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        entry.handle_value_change(self._value(0))
+        self.assertEqual(q.qsize(), 0)
+        self.assertEqual(len(scheduler), 1)
+
+        # No further update, the deadline raises the alarm with the latest violation
+        clock.now = 3
+        entry.handle_value_change(self._value(3))
+        self.assertEqual(q.qsize(), 0)
+
+        clock.now = 5
+        self.assertEqual(scheduler.run_pending(), 1)
+        event = q.get_nowait()
+        self.assertIsInstance(event, AlarmEvent)
+        self.assertEqual(event.value_measured, "3")
+        # The cooldown starts at the deadline, not when the violation was captured
+        self.assertEqual(event.ts.monotonic, 3)
+        self.assertEqual(entry.last_event_time, 5)
+
+    def test_update_past_duration(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        entry.handle_value_change(self._value(0))
+        clock.now = 6
+        entry.handle_value_change(self._value(0))
+        self.assertIsInstance(q.get_nowait(), AlarmEvent)
+
+        # The deadline call was cancelled once the update raised the alarm
+        scheduler.run_pending()
+        self.assertEqual(q.qsize(), 0)
+
+    def test_flapping_cancels(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        entry = self._create_entry(scheduler, q)
+
+        for i in range(10):
+            clock.now = i
+            entry.handle_value_change(self._value(0 if i % 2 == 0 else 1.5))
+
+        clock.now = 100
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.assertEqual(q.qsize(), 0)
+
+    def test_edge_triggered_rejected(self):
+        with self.assertRaises(ConditionException):
+            self._create_entry(
+                DeadlineScheduler(), queue.Queue(), ConditionEnums.IncreasingStep
+            )
@@ -0,0 +1,196 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import typing
+import unittest
+
+from mailpy.consumer import BaseEventConsumer
+from mailpy.spool import _HEADER, SEGMENT_SUFFIX, EventSpool, _read_record
+
+
+class Event(typing.NamedTuple):
+    pvname: str
+    value: int
+
+
+def drain(reader) -> typing.List[typing.Tuple[int, Event]]:
+    records = []
+    while True:
+        try:
+            records.append(reader.get(block=False))
+        except queue.Empty:
+            return records
+
+
+def segments(directory: str) -> int:
+    return len([n for n in os.listdir(directory) if n.endswith(SEGMENT_SUFFIX)])
+
+
+class TestEventSpool(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.directory = self._dir.name
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_readers_keep_their_offsets(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        email, persistence = spool.reader("email"), spool.reader("persistence")
+        for i in range(10):
+            self.assertEqual(spool.append(Event("PV", i)), i)
+
+        self.assertEqual([e.value for _, e in drain(email)], list(range(10)))
+        offset, event = persistence.get(block=False)
+        self.assertEqual((offset, event.value), (0, 0))
+
+        # Out of order acks only commit the contiguous ones
+        for offset in (2, 0, 1, 5):
+            email.ack(offset)
+        self.assertEqual(email.committed, 3)
+        spool.close()
+
+    def test_replay_on_restart(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        reader = spool.reader("email")
+        for i in range(5):
+            spool.append(Event("PV", i))
+        for offset, _ in drain(reader)[:3]:
+            reader.ack(offset)
+        spool.close()
+
+        spool = EventSpool(self.directory, sync_interval=60)
+        self.assertEqual(spool.end, 5)
+        self.assertEqual([e.value for _, e in drain(spool.reader("email"))], [3, 4])
+        self.assertEqual(spool.append(Event("PV", 5)), 5)
+        spool.close()
+
+    def test_torn_record(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        for i in range(3):
+            spool.append(Event("PV", i))
+        spool.close()
+        path = os.path.join(self.directory, f"{0:020d}{SEGMENT_SUFFIX}")
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00partial")
+
+        spool = EventSpool(self.directory, sync_interval=60)
+        self.assertEqual(spool.end, 3)
+        spool.append(Event("PV", 3))
+        self.assertEqual([e.value for _, e in drain(spool.reader("a"))], [0, 1, 2, 3])
+        spool.close()
+
+    def test_corrupt_record_skipped(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        for i in range(3):
+            spool.append(Event("PV", i))
+        path = os.path.join(self.directory, f"{0:020d}{SEGMENT_SUFFIX}")
+        with open(path, "r+b") as f:
+            # Flip the last payload byte of the second record
+            _read_record(f)
+            length, _ = _HEADER.unpack(f.read(_HEADER.size))
+            f.seek(length - 1, os.SEEK_CUR)
+            f.write(b"\x00")
+
+        reader = spool.reader("a")
+        self.assertEqual([e.value for _, e in drain(reader)], [0, 2])
+        self.assertEqual(reader.skipped, 1)
+        reader.ack(0)
+        reader.ack(2)
+        # Not replayed on restart
+        self.assertEqual(reader.committed, 3)
+        spool.close()
+
+    def test_ack_while_get_waits(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        reader = spool.reader("a")
+        spool.append(Event("PV", 0))
+        offset, _ = reader.get()
+
+        def get():
+            with self.assertRaises(queue.Empty):
+                reader.get(timeout=2)
+
+        waiting = threading.Thread(target=get)
+        waiting.start()
+        time.sleep(0.05)
+
+        t0 = time.perf_counter()
+        reader.ack(offset)
+        self.assertLess(time.perf_counter() - t0, 1)
+        self.assertEqual(reader.committed, 1)
+        reader.shutdown()
+        waiting.join()
+        spool.close()
+
+    def test_compaction(self):
+        spool = EventSpool(self.directory, segment_bytes=256, sync_interval=60)
+        fast, slow = spool.reader("fast"), spool.reader("slow")
+        for i in range(50):
+            spool.append(Event("PV", i))
+        self.assertGreater(segments(self.directory), 3)
+
+        for offset, _ in drain(fast):
+            fast.ack(offset)
+        # The slow reader still needs every segment
+        self.assertEqual(spool.compact(), 0)
+
+        records = drain(slow)
+        self.assertEqual([e.value for _, e in records], list(range(50)))
+        for offset, _ in records:
+            slow.ack(offset)
+        self.assertGreater(spool.compact(), 0)
+        # The segment being appended is kept
+        self.assertEqual(segments(self.directory), 1)
+        spool.close()
+
+    def test_blocking_get(self):
+        spool = EventSpool(self.directory, sync_interval=60)
+        reader = spool.reader("a")
+        threading.Timer(0.05, spool.append, args=(Event("PV", 0),)).start()
+        self.assertEqual(reader.get(timeout=5)[1].value, 0)
+
+        with self.assertRaises(queue.Empty):
+            reader.get(timeout=0.01)
+        reader.shutdown()
+        with self.assertRaises(queue.Empty):
+            reader.get()
+        spool.close()
+
+
+class RecordingConsumer(BaseEventConsumer):
+    def __init__(self, **kwargs):
+        super().__init__(name="recording", **kwargs)
+        self.events = []
+        self.lock = threading.Lock()
+
+    def handle(self, obj):
+        time.sleep(0.001)
+        with self.lock:
+            self.events.append(obj)
+
+
+class TestSpoolConsumer(unittest.TestCase):
+    def test_consumer_commits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spool = EventSpool(directory, sync_interval=60)
+            consumer = RecordingConsumer(workers=3, order_key=lambda e: e.pvname)
+            consumer.attach_spool(spool.reader(consumer.name))
+            consumer.start()
+            for i in range(60):
+                spool.append(Event(f"PV{i % 2}", i))
+            consumer.join(timeout=5)
+
+            self.assertEqual(len(consumer.events), 60)
+            for pv in range(2):
+                values = [e.value for e in consumer.events if e.pvname == f"PV{pv}"]
+                self.assertEqual(values, sorted(values))
+            self.assertEqual(spool.stats.committed, {"recording": 60})
+            spool.close()
+
+            # Nothing left to replay
+            spool = EventSpool(directory, sync_interval=60)
+            self.assertEqual(drain(spool.reader("recording")), [])
+            spool.close()
@@ -1,4 +1,6 @@
 import datetime
+import pickle
+import time
 import unittest
 
 from mailpy.entities.timestamp import Timestamp
@@ -11,6 +13,29 @@ class TestToolsMongodb(unittest.TestCase):
         self.assertIsNotNone(loader.load_entries())
         self.assertIsNotNone(loader.load_groups())
 
+    def test_null_optional_fields(self):
+        entry = MongoJsonLoader()._create_entry(
+            {
+                "_id": {"$oid": "id"},
+                "pvname": "PV",
+                "emails": "a@example.com",
+                "condition": "superior than",
+                "alarm_values": "1",
+                "unit": "V",
+                "warning_message": "",
+                "subject": "",
+                "email_timeout": 10,
+                "group": "group",
+                "deadband": None,
+                "deadband_mode": None,
+                "hysteresis": None,
+                "duration": None,
+                "formula": None,
+            }
+        )
+        self.assertEqual((entry.deadband, entry.hysteresis, entry.duration), (0, 0, 0))
+        self.assertEqual((entry.deadband_mode, entry.formula), ("absolute", ""))
+
     def test_init_database(self):
         manager = MongoContainerManager()
         self.assertIsNotNone(manager._volumes())
@@ -32,3 +57,25 @@ class TestTimestamps(unittest.TestCase):
         self.assertIsInstance(now.local_str, str)
 
         self.assertNotEqual(Timestamp().ts, now.ts)
+
+    def test_timestamp_lazy(self):
+        now = Timestamp()
+        self.assertIsNone(now._ts)
+        self.assertIsNone(now._utc_str)
+        # datetime only keeps microseconds
+        self.assertAlmostEqual(now.ts.timestamp(), now.time, places=5)
+        self.assertIs(now.utc_str, now.utc_str)
+
+        given = datetime.datetime(2021, 3, 4, 5, 6, 7, 8000, datetime.timezone.utc)
+        self.assertEqual(Timestamp(given).utc_str, "2021-03-04T05:06:07.008Z")
+        with self.assertRaises(ValueError):
+            Timestamp(given.date())
+
+    def test_timestamp_monotonic(self):
+        before = time.monotonic()
+        self.assertGreaterEqual(Timestamp().monotonic, before)
+
+        # A reading the caller already took is stored as is
+        ts = Timestamp(monotonic=12.5)
+        self.assertEqual(ts.monotonic, 12.5)
+        self.assertEqual(pickle.loads(pickle.dumps(ts)).monotonic, 12.5)
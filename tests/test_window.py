@@ -0,0 +1,174 @@
+import queue
+import random
+import unittest
+
+import numpy
+
+from mailpy.entities import Entry, EntryData, Group, ValueChangedInfo
+from mailpy.entities.condition import (
+    ConditionEnums,
+    ConditionException,
+    create_condition,
+)
+from mailpy.entities.window import (
+    MAX_WINDOW_SIZE,
+    ConditionMovingAverage,
+    ConditionRateOfChange,
+    ConditionRollingStd,
+    RollingWindow,
+)
+from mailpy.scheduler import DeadlineScheduler
+
+
+def data(value: float, timestamp: float) -> ValueChangedInfo:
+    return ValueChangedInfo(
+        pvname="TestPV",
+        value=value,
+        status=0,
+        host="host",
+        severity=0,
+        timestamp=timestamp,
+    )
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_running_statistics(self):
+        window = RollingWindow(7)
+        values = [random.gauss(1e6, 3.0) for _ in range(100)]
+        for i, value in enumerate(values):
+            window.push(value, float(i))
+            expected = values[max(0, i - 6) : i + 1]
+            self.assertAlmostEqual(window.mean, numpy.mean(expected), places=6)
+            if len(expected) > 1:
+                self.assertAlmostEqual(
+                    window.variance, numpy.var(expected, ddof=1), places=4
+                )
+        self.assertTrue(window.full)
+        self.assertEqual(window.oldest, (values[-7], 93.0))
+
+
+class TestWindowConditions(unittest.TestCase):
+    def test_invalid_limits(self):
+        for condition, alarm_values in [
+            (ConditionEnums.MovingAverage, "10:5"),
+            (ConditionEnums.MovingAverage, "10:5:1"),
+            (ConditionEnums.MovingAverage, "1:0:1"),
+            (ConditionEnums.RateOfChange, f"{MAX_WINDOW_SIZE + 1}:1"),
+            (ConditionEnums.RollingStd, "a:1"),
+            (ConditionEnums.RollingStd, None),
+        ]:
+            with self.assertRaises(ConditionException):
+                create_condition(condition=condition, alarm_values=alarm_values)
+
+    def test_moving_average(self):
+        condition = create_condition(
+            condition=ConditionEnums.MovingAverage, alarm_values="4:0:10"
+        )
+        self.assertIsInstance(condition, ConditionMovingAverage)
+        # Window conditions keep history, never shared
+        self.assertIsNot(
+            condition,
+            create_condition(
+                condition=ConditionEnums.MovingAverage, alarm_values="4:0:10"
+            ),
+        )
+
+        # A single spike does not move the average out of range
+        for i, value in enumerate([5, 5, 5, 25]):
+            self.assertIsNone(condition.evaluate(data(value, i)))
+        self.assertIsNotNone(condition.evaluate(data(25, 4)))
+
+        with self.assertRaises(ConditionException):
+            condition.check_alarm("text")
+
+    def test_rate_of_change(self):
+        condition = create_condition(
+            condition=ConditionEnums.RateOfChange, alarm_values="3:2"
+        )
+        self.assertIsInstance(condition, ConditionRateOfChange)
+
+        self.assertIsNone(condition.evaluate(data(0.0, 0.0)))
+        self.assertIsNone(condition.evaluate(data(1.0, 1.0)))
+        self.assertIsNone(condition.evaluate(data(3.0, 2.0)))
+        # 10 - 1 over 2 seconds
+        response = condition.evaluate(data(10.0, 3.0))
+        self.assertIsNotNone(response)
+        self.assertAlmostEqual(response.extras["rate"], 4.5)
+        self.assertIsNotNone(condition.evaluate(data(-10.0, 4.0)))
+
+    def test_rolling_std(self):
+        condition = create_condition(
+            condition=ConditionEnums.RollingStd, alarm_values="5:1"
+        )
+        self.assertIsInstance(condition, ConditionRollingStd)
+
+        for i in range(10):
+            self.assertIsNone(condition.evaluate(data(10 + (i % 2) * 0.5, i)))
+        for i in range(10, 15):
+            response = condition.evaluate(data(10 + (i % 2) * 5.0, i))
+        self.assertIsNotNone(response)
+        self.assertGreater(response.extras["stddev"], 1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestWindowEntry(unittest.TestCase):
+    def test_samples_during_cooldown(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(clock=clock)
+        q = queue.Queue()
+        group = Group("1", "gtest", True)
+        entry = Entry(
+            entry_data=EntryData(
+                alarm_values="4:0:10",
+                condition=ConditionEnums.MovingAverage,
+                email_timeout=60,
+                emails=[""],
+                group=group,
+                id="e1",
+                pvname="TestPV",
+                subject="",
+                unit="",
+                warning_message="",
+            ),
+            group=group,
+            event_queue=q,
+            scheduler=scheduler,
+        )
+
+        for i in range(4):
+            entry.handle_value_change(data(20, i))
+        self.assertEqual(q.qsize(), 1)
+        q.get_nowait()
+
+        # Back in range while the email_timeout is active, the window keeps up
+        for i in range(4, 104):
+            entry.handle_value_change(data(5, i))
+        self.assertEqual(entry._condition.window.mean, 5)
+
+        # The latest sample is re-evaluated once and not pushed again
+        clock.now = 61
+        scheduler.run_pending()
+        self.assertEqual(q.qsize(), 0)
+        self.assertEqual(entry._condition.window.count, 4)
+        entry.handle_value_change(data(5, 103))
+        self.assertEqual(entry._condition.window.mean, 5)
+
+    def test_sweep_does_not_push_twice(self):
+        condition = create_condition(
+            condition=ConditionEnums.MovingAverage, alarm_values="2:0:10"
+        )
+        condition.observe(data(5, 0))
+        condition.observe(data(5, 0))
+        self.assertEqual(condition.window.count, 1)
+        # Same update without a source timestamp
+        sample = data(5, None)
+        condition.observe(sample)
+        condition.evaluate(sample)
+        self.assertEqual(condition.window.count, 2)